@@ -1,4 +1,3 @@
-aw@katharsis-llm:~/confmeta$ cat __init__.py 
 """
 Conference metadata parsing package.
 
@@ -6,7 +5,35 @@ Modules:
 - config: paths, model, limits
 - db_io: DuckDB I/O helpers
 - regex_utils: regex-based parsing utilities
-- llm_parse: LLM-based parsing of raw conference strings
+- llm_parse: LLM-based parsing of raw conference strings (full prompt)
+- prompt_rules: rule sections of the llm_parse prompt and their regex triggers
+- fast_llm_parse: LLM-based parsing with the short INSTRUCTION_FAST prompt
+- validate: consistency checks of parsed rows against the raw string
+- cascade: fast prompt first, escalate to the full prompt on failed checks
+- routing: difficulty score -> model of MODEL_POOL, routing decisions per run
+- near_dup: MinHash/LSH clustering of near-duplicate raw strings
+- templates: template cache learned from stored LLM answers
+- parsers: parser mode -> parse function
+- llm_client: pooled Ollama session, health probe and model warm-up
+- transport: live / record / replay transport under stream_llm_json
+- breaker: LLM circuit breaker and deferred-retry pass
+- metrics: per-stage timings and Ollama eval stats, persisted per run
+- profiling: --profile hooks (cProfile / stack sampling, per-stage memory peaks)
+- progress: quiet-mode progress line and buffered per-row JSONL log
 - llm_series: dblp series matching and LLM re-ranking
+- series_link: series linking stage over distinct conf_name values
+- series_vectors: memory-mapped embedding index of dblp series names (cosine top-k)
 - pipeline: main orchestration entry point
+- service: long-running HTTP / Unix-socket parser service with warm caches
+- shards: shard naming and the shard merge step
+- stages: staged streaming pipeline with bounded queues and write-behind
+- tune: sweep of parse concurrency and Ollama options -> per-host tuning profile
+- estimate: --dry-run estimate of LLM calls, tokens and wall time of a pass
+- budget: budgeted runs over distinct strings ordered by record coverage
+- renormalize: re-run normalization over stored raw LLM answers
+- stub_ollama: minimal Ollama stand-in for offline runs and benchmarks
+- synthetic: synthetic names_conference DuckDB with realistic skew for scale tests
+- benchmark: end-to-end benchmark against a fixture DB and the stub server
+- microbench: ns/op and allocation microbenchmarks of the normalization helpers
+- import_check: -X importtime check that entry modules stay light
 """
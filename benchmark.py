@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark against a fixture DuckDB and a stub Ollama.
+
+    python -m confmeta.benchmark --latency-ms 50 --out bench.json
+
+For each parser mode it runs the pipeline stages (fetch, heuristics + parse,
+row building, write) and reports rows/s, per-row latency percentiles,
+LLM calls per row, cache hit rate and accuracy against the golden set.
+Compare the JSON output of two commits to spot regressions.
+Needs duckdb, pandas and the GeoNames file, like the pipeline itself.
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from .stub_ollama import GOLDEN_PATH, load_golden, start_in_thread
+
+FIELDS = ("conf_name", "conf_place", "conf_dates")
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    s = sorted(values)
+    k = max(0, math.ceil(p / 100.0 * len(s)) - 1)
+    return s[k]
+
+
+def build_fixture_db(path, golden, copies):
+    """
+    names_conference with every golden string repeated `copies` times under
+    distinct pids, so repeated strings exercise the parse caches.
+    """
+    import duckdb
+    import pandas as pd
+
+    rows = []
+    pid = 1
+    for _ in range(copies):
+        for rec in golden:
+            rows.append({"pid": pid, "name_seq": 1, "conference": rec["conference"]})
+            pid += 1
+    df = pd.DataFrame(rows)
+    con = duckdb.connect(str(path))
+    con.execute("DROP TABLE IF EXISTS names_conference")
+    con.sql("CREATE TABLE names_conference AS SELECT * FROM df")
+    con.close()
+    return len(rows)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _clear_caches():
+    from . import fast_llm_parse, llm_parse
+    llm_parse._llm_cache.clear()
+    fast_llm_parse._llm_cache.clear()
+
+
+def run_mode(mode, n_rows, expected, stub_state):
+    from .db_io import connect, fetch_conferences, write_parsed_table
+    from .parsers import get_parser
+    from .pipeline import build_row, heuristic_parse, needs_llm
+    import pandas as pd
+
+    _clear_caches()
+    stub_state.reset()
+    parse = get_parser(mode)
+    if mode == "cascade":
+        from .cascade import reset_cascade_stats
+        reset_cascade_stats()
+    if mode == "routed":
+        from .routing import reset_routing
+        reset_routing()
+
+    t_run = time.perf_counter()
+    con = connect()
+    t0 = time.perf_counter()
+    df = fetch_conferences(con, n_rows)
+    fetch_s = time.perf_counter() - t0
+
+    latencies = []
+    llm_rows = 0
+    cache_hits = 0
+    correct_rows = 0
+    correct_fields = {f: 0 for f in FIELDS}
+    rows = []
+
+    for _, row in df.iterrows():
+        raw = row["conference"]
+        t0 = time.perf_counter()
+        calls_before = stub_state.generate_requests
+        if needs_llm(raw):
+            llm_rows += 1
+            try:
+                parsed = parse(raw, show_stream=False)
+            except Exception as e:
+                parsed = heuristic_parse(raw, note=f"LLM error: {e}")
+            if stub_state.generate_requests == calls_before:
+                cache_hits += 1
+        else:
+            parsed = heuristic_parse(raw)
+        out_row = build_row(int(row["pid"]), int(row["name_seq"]), raw, parsed)
+        latencies.append(time.perf_counter() - t0)
+        rows.append(out_row)
+
+        exp = expected.get(raw)
+        if exp is not None:
+            ok = [out_row[f] == exp[f] for f in FIELDS]
+            for f, good in zip(FIELDS, ok):
+                correct_fields[f] += good
+            correct_rows += all(ok)
+
+    t0 = time.perf_counter()
+    out = pd.DataFrame(rows)
+    write_parsed_table(con, out, "names_conference_parsed")
+    write_s = time.perf_counter() - t0
+    con.close()
+    wall_s = time.perf_counter() - t_run
+
+    n = len(rows)
+    result = {
+        "mode": mode,
+        "rows": n,
+        "llm_rows": llm_rows,
+        "wall_s": round(wall_s, 4),
+        "fetch_s": round(fetch_s, 4),
+        "write_s": round(write_s, 4),
+        "rows_per_s": round(n / wall_s, 2) if wall_s else None,
+        "latency_ms": {
+            f"p{p}": round(percentile(latencies, p) * 1000, 3) if latencies else None
+            for p in (50, 95, 99)
+        },
+        "llm_calls": stub_state.generate_requests,
+        "llm_calls_per_row": round(stub_state.generate_requests / n, 4) if n else None,
+        "cache_hit_rate": round(cache_hits / llm_rows, 4) if llm_rows else None,
+        "accuracy": {
+            "rows": round(correct_rows / n, 4) if n else None,
+            **{f: round(c / n, 4) if n else None for f, c in correct_fields.items()},
+        },
+    }
+    if mode == "cascade":
+        from .cascade import escalation_rate
+        result["escalation_rate"] = round(escalation_rate(), 4)
+    if mode == "routed":
+        from .routing import drain_decisions, model_stats
+        result["routing"] = model_stats(drain_decisions())
+    return result
+
+
+def main(argv=None):
+    from .parsers import PARSER_MODES
+
+    ap = argparse.ArgumentParser(description="confmeta pipeline benchmark")
+    ap.add_argument("--modes", nargs="+", default=list(PARSER_MODES), choices=PARSER_MODES)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="stub LLM latency per request")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--copies", type=int, default=3, help="copies of each golden string")
+    ap.add_argument("--golden", default=str(GOLDEN_PATH))
+    ap.add_argument("--out", default="bench_results.json")
+    args = ap.parse_args(argv)
+
+    golden = load_golden(args.golden)
+    expected = {rec["conference"]: rec["expected"] for rec in golden}
+
+    server, url = start_in_thread(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, golden_path=args.golden
+    )
+    tmpdir = tempfile.mkdtemp(prefix="confmeta_bench_")
+    db_path = Path(tmpdir) / "bench.duckdb"
+    n_rows = build_fixture_db(db_path, golden, args.copies)
+
+    # Must be set before config is first imported by the pipeline modules
+    os.environ["CONFMETA_DB_PATH"] = str(db_path)
+    os.environ["CONFMETA_OLLAMA_URL"] = url
+
+    results = []
+    try:
+        for mode in args.modes:
+            res = run_mode(mode, n_rows, expected, server.state)
+            results.append(res)
+            print(
+                f"{mode:8s} rows/s={res['rows_per_s']} "
+                f"p50={res['latency_ms']['p50']}ms p95={res['latency_ms']['p95']}ms "
+                f"p99={res['latency_ms']['p99']}ms calls/row={res['llm_calls_per_row']} "
+                f"cache_hit={res['cache_hit_rate']} acc={res['accuracy']['rows']}"
+            )
+    finally:
+        server.shutdown()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stub_latency_ms": args.latency_ms,
+        "stub_jitter_ms": args.jitter_ms,
+        "fixture_rows": n_rows,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote benchmark results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Circuit breaker for the LLM endpoint and the deferred-retry pass.
+
+After BREAKER_FAILURE_THRESHOLD consecutive connection failures the circuit
+opens and calls fail fast with CircuitOpen for BREAKER_RESET_S seconds; then
+a single probe call is let through (half-open). The pipeline stores
+heuristic-only rows for LLM-unavailable errors, remembers them, and
+re-parses just those rows in retry_deferred at the end of the run.
+"""
+import random
+import threading
+import time
+
+from .config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_S,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY_S,
+    RETRY_MAX_DELAY_S,
+)
+
+
+class CircuitOpen(RuntimeError):
+    """The LLM endpoint is considered down; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                wait = self.opened_at + self.reset_timeout - time.monotonic()
+                if wait > 0:
+                    raise CircuitOpen(f"LLM circuit open, retry in {wait:.0f}s")
+                self.state = "half_open"
+                return
+            # half_open: one probe is already in flight
+            raise CircuitOpen("LLM circuit half-open, probe in flight")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def retry_after(self):
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+
+BREAKER = CircuitBreaker()
+
+
+def is_breaker_failure(exc) -> bool:
+    """Errors that mean the endpoint is unhealthy (not a bad answer)."""
+    from requests.exceptions import ConnectionError, HTTPError, Timeout
+
+    if isinstance(exc, (ConnectionError, Timeout)):
+        return True
+    if isinstance(exc, HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500
+    return False
+
+
+def is_llm_unavailable(exc) -> bool:
+    return isinstance(exc, CircuitOpen) or is_breaker_failure(exc)
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY_S, cap=RETRY_MAX_DELAY_S):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_deferred(raws, parse_fn, max_attempts=RETRY_MAX_ATTEMPTS, log=print):
+    """
+    Re-parse deferred raw strings with jittered backoff.
+    Returns (parsed, errors, still_pending):
+      parsed         {raw: parsed dict} for the strings that succeeded
+      errors         {raw: exception} for non-retryable failures
+      still_pending  strings the endpoint never answered
+    """
+    pending = list(dict.fromkeys(raws))
+    parsed = {}
+    errors = {}
+    for attempt in range(max_attempts):
+        if not pending:
+            break
+        if attempt:
+            delay = max(backoff_delay(attempt), BREAKER.retry_after())
+            log(f"[retry] {len(pending)} deferred strings, attempt {attempt + 1}/{max_attempts} in {delay:.1f}s")
+            time.sleep(delay)
+        still = []
+        for raw in pending:
+            try:
+                parsed[raw] = parse_fn(raw, show_stream=False)
+            except Exception as e:
+                if is_llm_unavailable(e):
+                    still.append(raw)
+                else:
+                    errors[raw] = e
+        pending = still
+    return parsed, errors, pending
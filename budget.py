@@ -0,0 +1,102 @@
+"""
+Budgeted run mode: spend a wall-clock or token budget on the distinct
+conference strings that cover the most DiVA records.
+
+Only uncached strings are parsed (those without a row, or whose rows carry
+an LLM error or deferred note), by how many (pid, name_seq) records share
+them. Each string is parsed once and the result is written to every record
+that shares it. Rows of later runs are upserted, so successive budgeted runs
+fill names_conference_parsed incrementally. A string deferred because the LLM
+endpoint is down is not written, and ends the run.
+"""
+import time
+
+import pandas as pd
+
+from .db_io import fetch_distinct_conferences, fetch_records_for, upsert_parsed_rows
+from .metrics import stage
+
+
+class Budget:
+    def __init__(self, seconds=None, tokens=None):
+        self.seconds = seconds
+        self.tokens = tokens
+        self.started = time.monotonic()
+
+    def tokens_used(self, run):
+        return run.ollama["prompt_eval_count"] + run.ollama["eval_count"]
+
+    def exhausted(self, run):
+        if self.seconds is not None and time.monotonic() - self.started >= self.seconds:
+            return "time"
+        if self.tokens is not None and self.tokens_used(run) >= self.tokens:
+            return "tokens"
+        return None
+
+    def describe(self):
+        parts = []
+        if self.seconds is not None:
+            parts.append(f"{self.seconds:.0f}s")
+        if self.tokens is not None:
+            parts.append(f"{self.tokens} tokens")
+        return " / ".join(parts) or "unlimited"
+
+
+def run_budgeted(con, parse_string, budget, run, table_name="names_conference_parsed", log=print):
+    """
+    parse_string(raw) -> (parsed dict, deferred); build rows with
+    pipeline.build_row. Returns a summary dict.
+    """
+    from .pipeline import build_row
+
+    distinct = fetch_distinct_conferences(con, cached_table=table_name)
+    total_records = int(distinct["n_records"].sum()) if len(distinct) else 0
+    log(
+        f"Budgeted run ({budget.describe()}): {len(distinct)} distinct strings, "
+        f"{int((~distinct['cached']).sum())} uncached, {total_records} records"
+    )
+
+    parsed_by_raw = {}
+    covered = 0
+    stop_reason = "all strings processed"
+    for _, d in distinct[~distinct["cached"]].iterrows():
+        reason = budget.exhausted(run)
+        if reason:
+            stop_reason = f"{reason} budget exhausted"
+            break
+        raw = d["conference"]
+        parsed, deferred = parse_string(raw)
+        if deferred:
+            # keep whatever row the string has; the next budgeted run retries it
+            stop_reason = "LLM endpoint unavailable"
+            break
+        parsed_by_raw[raw] = parsed
+        covered += int(d["n_records"])
+        run.incr("distinct_strings")
+
+    if not parsed_by_raw:
+        log(f"Nothing processed ({stop_reason}).")
+        return {"strings": 0, "records": 0, "stop_reason": stop_reason}
+
+    records = fetch_records_for(con, parsed_by_raw.keys())
+    rows = []
+    with stage("normalize"):
+        for _, r in records.iterrows():
+            raw = r["conference"]
+            rows.append(build_row(int(r["pid"]), int(r["name_seq"]), raw, parsed_by_raw[raw]))
+    run.incr("rows", len(rows))
+
+    out = pd.DataFrame(rows)
+    upsert_parsed_rows(con, out, table_name)
+
+    summary = {
+        "strings": len(parsed_by_raw),
+        "records": covered,
+        "records_share": round(covered / total_records, 4) if total_records else None,
+        "stop_reason": stop_reason,
+    }
+    log(
+        f"Budgeted run: {summary['strings']} strings covering {covered} records "
+        f"({summary['records_share']:.1%} of all) - {stop_reason}"
+    )
+    return summary
@@ -0,0 +1,60 @@
+from . import fast_llm_parse, llm_parse
+from .metrics import current
+from .validate import validate_parsed
+
+# Per-run counters; reset with reset_cascade_stats()
+CASCADE_STATS = {"fast_ok": 0, "escalated": 0, "failed_checks": {}}
+
+
+def reset_cascade_stats():
+    CASCADE_STATS["fast_ok"] = 0
+    CASCADE_STATS["escalated"] = 0
+    CASCADE_STATS["failed_checks"] = {}
+
+
+def escalation_rate():
+    total = CASCADE_STATS["fast_ok"] + CASCADE_STATS["escalated"]
+    if not total:
+        return 0.0
+    return CASCADE_STATS["escalated"] / total
+
+
+def parse_with_cascade(conf_string: str, show_stream: bool = True):
+    """
+    Parse with the short INSTRUCTION_FAST prompt first and validate the result.
+    Only rows failing a check in validate_parsed are sent to the full
+    llm_parse rulebook prompt.
+    Returns the same dict shape as llm_parse.parse_with_llm.
+    """
+    parsed = fast_llm_parse.parse_with_llm(conf_string, show_stream=show_stream)
+    failures = validate_parsed(conf_string, parsed)
+    if not failures:
+        CASCADE_STATS["fast_ok"] += 1
+        current().incr("cascade_fast_ok")
+        return parsed
+
+    CASCADE_STATS["escalated"] += 1
+    current().incr("cascade_escalated")
+    for name in failures:
+        counts = CASCADE_STATS["failed_checks"]
+        counts[name] = counts.get(name, 0) + 1
+
+    if show_stream:
+        print(f"[cascade] escalating to full prompt: {', '.join(failures)}")
+    parsed = llm_parse.parse_with_llm(conf_string, show_stream=show_stream)
+    note = parsed.get("note", "")
+    extra = f"escalated ({', '.join(failures)})"
+    parsed = dict(parsed)
+    parsed["note"] = f"{note}; {extra}" if note else extra
+    return parsed
+
+
+def format_cascade_report():
+    total = CASCADE_STATS["fast_ok"] + CASCADE_STATS["escalated"]
+    checks = ", ".join(
+        f"{k}={v}" for k, v in sorted(CASCADE_STATS["failed_checks"].items())
+    )
+    return (
+        f"Cascade: {total} LLM rows, {CASCADE_STATS['escalated']} escalated "
+        f"({escalation_rate():.1%})" + (f" [{checks}]" if checks else "")
+    )
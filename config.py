@@ -1,8 +1,157 @@
-DB_PATH = "kth_metadata.duckdb"
+import os
+
+# CONFMETA_* environment variables override the defaults (used by the
+# benchmark to point the pipeline at a fixture DB and a stub LLM server).
+DB_PATH = os.environ.get("CONFMETA_DB_PATH", "kth_metadata.duckdb")
 
 MODEL = "llama3:8b"
-OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
+OLLAMA_URL = os.environ.get("CONFMETA_OLLAMA_URL", "http://127.0.0.1:11434/api/generate")
 
 MAX_ROWS = 1000
 SHOW_EVERY = 1
+
+# Quiet mode: one progress line, per-row details to ROW_LOG_PATH (JSONL),
+# LLM token streaming only for every STREAM_SAMPLE_EVERY-th row (0 = never)
+QUIET = False
+ROW_LOG_PATH = "pipeline_rows.jsonl"
+STREAM_SAMPLE_EVERY = 0
 MAX_SERIES_CANDIDATES = 5
+
+# Parser used for rows passing the heuristics: "full", "fast", "cascade" or "routed"
+PARSER_MODE = "cascade"
+
+
+def _model_pool(spec):
+    # "llama3.2:3b@2,llama3:8b" -> first model whose max_score covers the
+    # difficulty score of a string; no "@" = catch-all
+    pool = []
+    for item in spec.split(","):
+        name, sep, max_score = item.strip().partition("@")
+        pool.append({"model": name, "max_score": int(max_score) if sep else None})
+    return pool
+
+
+# Difficulty-based routing ("routed"): easy strings go to a smaller model
+MODEL_POOL = _model_pool(os.environ.get("CONFMETA_MODEL_POOL", f"llama3.2:3b@2,{MODEL}"))
+
+# GeoNames cities file, loaded on first use (geonames_cities.get_city_country)
+GEONAMES_CITIES_PATH = os.environ.get("CONFMETA_GEONAMES_CITIES", "~/geonames/cities5000.txt")
+
+# Ollama client: keep the model loaded between requests, pooled connections
+OLLAMA_KEEP_ALIVE = os.environ.get("CONFMETA_OLLAMA_KEEP_ALIVE", "30m")
+LLM_POOL_SIZE = 4
+
+# Ollama "options" of the parse requests (num_ctx, num_batch, ... when tuned)
+LLM_OPTIONS = {"temperature": 0.0, "num_predict": 256}
+
+# Send only the rulebook sections a raw string triggers (prompt_rules);
+# CONFMETA_PROMPT_ASSEMBLY=0 sends the full instruction for comparison
+PROMPT_ASSEMBLY = os.environ.get("CONFMETA_PROMPT_ASSEMBLY", "1") != "0"
+
+# LLM transport: "live", "record" (live + capture to LLM_RECORDING_PATH)
+# or "replay" (serve recorded responses offline)
+LLM_TRANSPORT = os.environ.get("CONFMETA_LLM_TRANSPORT", "live")
+LLM_RECORDING_PATH = os.environ.get("CONFMETA_LLM_RECORDING", "llm_recording.jsonl.gz")
+# Replay latency = recorded latency * scale (0 = as fast as possible)
+LLM_REPLAY_LATENCY_SCALE = float(os.environ.get("CONFMETA_REPLAY_LATENCY_SCALE", "1.0"))
+
+# Prometheus text file with the metrics of the last pipeline run
+METRICS_PROM_PATH = os.environ.get("CONFMETA_METRICS_PROM", "confmeta_metrics.prom")
+
+# Circuit breaker for the LLM endpoint and the deferred-retry pass
+BREAKER_FAILURE_THRESHOLD = 3   # consecutive failures before opening
+BREAKER_RESET_S = 30.0          # open -> half-open after this many seconds
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY_S = 2.0
+RETRY_MAX_DELAY_S = 60.0
+
+# Near-duplicate clustering (MinHash/LSH) of raw strings before parsing
+NEAR_DUP = True
+NEAR_DUP_THRESHOLD = 0.8  # min token-set Jaccard similarity
+NEAR_DUP_NUM_PERM = 64
+NEAR_DUP_BANDS = 8        # 8 bands x 8 rows
+
+# Template cache learned from stored LLM answers (python -m confmeta.templates learn)
+TEMPLATES = True
+TEMPLATE_STORE_PATH = "confmeta_templates.json"
+TEMPLATE_MIN_SUPPORT = 3        # LLM answers a template was induced from
+TEMPLATE_MIN_AGREEMENT = 0.95   # share of checked LLM answers it reproduced
+
+# Series-linking stage: links written to conf_series_links per batch
+SERIES_LINK_BATCH = 50
+
+# Embedding index of dblp series names (python -m confmeta.series_vectors build);
+# when it exists, series linking adds its cosine top-k to ILIKE hits that do not resolve
+SERIES_VECTORS = True
+EMBED_MODEL = os.environ.get("CONFMETA_EMBED_MODEL", "nomic-embed-text")
+SERIES_INDEX_DIR = os.environ.get("CONFMETA_SERIES_INDEX", "series_index")
+SERIES_EMBED_BATCH = 64
+SERIES_VECTOR_K = 5
+SERIES_VECTOR_MIN_SCORE = 0.5
+
+# Staged pipeline (--staged): worker threads per stage, bounded queues
+STAGED = False
+STAGE_WORKERS = {"prefilter": 1, "parse": 4, "normalize": 1}  # write is always 1
+STAGE_QUEUE_SIZE = 256
+WRITE_BATCH_ROWS = 500
+
+# Profiling (--profile cprofile|sample): collapsed stacks, per-stage memory
+PROFILE_DIR = "profiles"
+PROFILE_SAMPLE_INTERVAL_S = 0.005
+PROFILE_TRACEMALLOC = True
+
+# Microbenchmarks (python -m confmeta.microbench): per-machine baseline
+MICROBENCH_BASELINE_PATH = os.environ.get(
+    "CONFMETA_MICROBENCH_BASELINE", "confmeta_microbench_baseline.json"
+)
+MICROBENCH_THRESHOLD = 0.25   # fail when ns/op or peak B/op grew by more than 25%
+MICROBENCH_REPEATS = 5
+MICROBENCH_MIN_TIME_S = 0.05  # per timed pass
+
+# Dry-run cost estimate (--dry-run): calibration sample of distinct strings,
+# throughput from the most recent pipeline_runs
+DRY_RUN_SAMPLE = 5000
+DRY_RUN_HISTORY_RUNS = 10
+
+# Parser service (python -m confmeta.service): strings of requests arriving
+# within SERVICE_BATCH_WAIT_MS are batched, deduplicated and parsed by
+# STAGE_WORKERS["parse"] threads; past SERVICE_CACHE_MAX entries the oldest
+# tenth of a parser cache is evicted
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = int(os.environ.get("CONFMETA_SERVICE_PORT", "8765"))
+SERVICE_SOCKET = os.environ.get("CONFMETA_SERVICE_SOCKET", "")  # Unix socket path instead of TCP
+SERVICE_BATCH_MAX = 64
+SERVICE_BATCH_WAIT_MS = 5
+SERVICE_MAX_STRINGS = 1000      # per request
+SERVICE_CACHE_MAX = 200_000
+SERVICE_LATENCY_WINDOW = 10_000  # recent requests per endpoint for percentiles
+
+# Throughput tuning (python -m confmeta.tune): the profile written for this
+# host overrides LLM_OPTIONS and the parse concurrency below; "" = ignore it
+TUNE_PROFILE_PATH = os.environ.get("CONFMETA_TUNE_PROFILE", "confmeta_tuning.json")
+TUNE_SAMPLE = 200
+TUNE_MAX_FAILURE_DELTA = 0.02  # accepted rise of the failed-check + truncated rate
+TUNE_MIN_GAIN = 0.05           # rows/s gain needed to move off the current value
+TUNE_GRID = {
+    "num_predict": [192, 256, 384],
+    "num_ctx": [2048, 4096, 8192],
+    "num_batch": [256, 512],
+    "parallel": [1, 2, 4, 8],
+}
+
+
+def _load_tune_profile(path):
+    if not path or not os.path.exists(path):
+        return None
+    import json
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+TUNE_PROFILE = _load_tune_profile(TUNE_PROFILE_PATH)
+if TUNE_PROFILE:
+    LLM_OPTIONS.update(TUNE_PROFILE.get("options", {}))
+    if TUNE_PROFILE.get("parallel"):
+        STAGE_WORKERS["parse"] = int(TUNE_PROFILE["parallel"])
+        LLM_POOL_SIZE = max(LLM_POOL_SIZE, STAGE_WORKERS["parse"])
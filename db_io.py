@@ -1,23 +1,240 @@
 import duckdb
 import pandas as pd
 from .config import DB_PATH
+from .metrics import stage
 
-def connect():
-    return duckdb.connect(DB_PATH)
+def connect(read_only=False):
+    """read_only: several processes may hold such a connection at once."""
+    return duckdb.connect(DB_PATH, read_only=read_only)
+
+# Multiplicative (Knuth) hash of pid, identical in SQL and Python and across
+# DuckDB versions, so every machine selects the same rows for a shard.
+SHARD_HASH_SQL = "((pid::HUGEINT * 2654435761) % 4294967296) % {n} = {i}"
+
+
+def shard_of(pid: int, n: int) -> int:
+    return ((int(pid) * 2654435761) % 4294967296) % n
+
+
+def conference_selection_sql(limit, shard=None):
+    """
+    Without shard: a random sample of `limit` rows.
+    With shard=(i, n): all rows of shard i of n (first `limit` if given).
+    """
+    if shard is None:
+        sql = f"""
+            SELECT
+                pid,
+                name_seq,
+                conference
+            FROM names_conference
+            WHERE conference IS NOT NULL
+            USING SAMPLE {limit} ROWS
+        """
+    else:
+        i, n = shard
+        sql = f"""
+            SELECT
+                pid,
+                name_seq,
+                conference
+            FROM names_conference
+            WHERE conference IS NOT NULL
+              AND {SHARD_HASH_SQL.format(i=int(i), n=int(n))}
+            ORDER BY pid, name_seq
+        """
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+    return sql
+
+
+def fetch_conferences(con, limit, shard=None):
+    with stage("fetch"):
+        return con.execute(conference_selection_sql(limit, shard)).fetch_df()
 
-def fetch_conferences(con, limit):
-    return con.execute(f"""
-        SELECT
-            pid,
-            name_seq,
-            conference
-        FROM names_conference
-        WHERE conference IS NOT NULL
-        USING SAMPLE {limit} ROWS
-    """).fetch_df()
+
+def iter_rows(con, sql, batch_size=1000):
+    """Stream the rows of `sql` as tuples on a separate cursor."""
+    cur = con.cursor()
+    try:
+        cur.execute(sql)
+        while True:
+            with stage("fetch"):
+                batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        cur.close()
+
+
+# Explicit types: a first write-behind batch may hold only NULLs in a column
+PARSED_TABLE_DDL = """
+CREATE TABLE {table} (
+    pid BIGINT,
+    name_seq BIGINT,
+    raw_conference VARCHAR,
+    conf_name VARCHAR,
+    conf_place VARCHAR,
+    conf_dates VARCHAR,
+    conf_start_date VARCHAR,
+    conf_end_date VARCHAR,
+    conf_year_start BIGINT,
+    conf_year_end BIGINT,
+    conf_order BIGINT,
+    conf_series_slug VARCHAR,
+    conf_series_stream_iri VARCHAR,
+    conf_series_name VARCHAR,
+    conf_series_match_reason VARCHAR,
+    note VARCHAR
+)
+"""
+
+
+def create_parsed_table(con, table_name):
+    with stage("write"):
+        con.execute(f"DROP TABLE IF EXISTS {table_name}")
+        con.execute(PARSED_TABLE_DDL.format(table=table_name))
+
+
+def append_rows(con, df, table_name):
+    """Write-behind batch: append df to table_name by column name."""
+    with stage("write"):
+        con.sql(f"INSERT INTO {table_name} BY NAME SELECT * FROM df")
 
 def write_parsed_table(con, df, table_name="names_conference_parsed"):
-    con.execute(f"DROP TABLE IF EXISTS {table_name}")
-    # DuckDB replacement scan on pandas df
-    con.sql(f"CREATE TABLE {table_name} AS SELECT * FROM df")
+    with stage("write"):
+        con.execute(f"DROP TABLE IF EXISTS {table_name}")
+        # DuckDB replacement scan on pandas df
+        con.sql(f"CREATE TABLE {table_name} AS SELECT * FROM df")
+
+
+def write_parquet(con, df, path):
+    with stage("write"):
+        path = str(path).replace("'", "''")
+        con.sql(f"COPY (SELECT * FROM df) TO '{path}' (FORMAT PARQUET)")
 
+
+
+def table_exists(con, table_name):
+    return con.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?",
+        [table_name],
+    ).fetchone()[0] > 0
+
+
+def cached_conferences_sql(con, cached_table="names_conference_parsed"):
+    """SELECT of the strings already parsed into cached_table without an LLM error."""
+    if not table_exists(con, cached_table):
+        return "SELECT NULL::VARCHAR AS conference WHERE false"
+    return f"""
+        SELECT DISTINCT raw_conference AS conference FROM {cached_table}
+        WHERE note IS NULL
+           OR (note NOT LIKE 'LLM error%' AND note NOT LIKE 'deferred%')
+    """
+
+
+def fetch_distinct_conferences(con, cached_table="names_conference_parsed"):
+    """
+    Distinct conference strings with the number of (pid, name_seq) records
+    sharing them. Strings already parsed into `cached_table` (without an LLM
+    error) are flagged cached. Uncached first, then by record count.
+    """
+    cached_sql = cached_conferences_sql(con, cached_table)
+    with stage("fetch"):
+        return con.execute(f"""
+            WITH counts AS (
+                SELECT conference, count(*) AS n_records
+                FROM names_conference
+                WHERE conference IS NOT NULL
+                GROUP BY conference
+            ),
+            cached AS ({cached_sql})
+            SELECT
+                c.conference,
+                c.n_records,
+                (k.conference IS NOT NULL) AS cached
+            FROM counts c
+            LEFT JOIN cached k USING (conference)
+            ORDER BY cached, n_records DESC, conference
+        """).fetch_df()
+
+
+def fetch_records_for(con, conferences):
+    """All (pid, name_seq, conference) records whose string is in `conferences`."""
+    wanted = pd.DataFrame({"conference": list(conferences)})
+    with stage("fetch"):
+        return con.execute("""
+            SELECT n.pid, n.name_seq, n.conference
+            FROM names_conference n
+            JOIN wanted w USING (conference)
+            ORDER BY n.pid, n.name_seq
+        """).fetch_df()
+
+
+def upsert_parsed_rows(con, df, table_name="names_conference_parsed"):
+    """Replace the rows of `df` (by pid, name_seq) in table_name, keeping the rest."""
+    with stage("write"):
+        if not table_exists(con, table_name):
+            con.sql(f"CREATE TABLE {table_name} AS SELECT * FROM df")
+            return
+        con.execute(f"""
+            DELETE FROM {table_name} t
+            WHERE EXISTS (
+                SELECT 1 FROM df d
+                WHERE d.pid = t.pid AND d.name_seq = t.name_seq
+            )
+        """)
+        con.sql(f"INSERT INTO {table_name} BY NAME SELECT * FROM df")
+
+
+RAW_OUTPUTS_DDL = """
+CREATE TABLE IF NOT EXISTS llm_raw_outputs (
+    conference VARCHAR,
+    parser VARCHAR,
+    model VARCHAR,
+    prompt_version VARCHAR,
+    raw_text VARCHAR,
+    created_at TIMESTAMP
+)
+"""
+
+
+def write_raw_outputs(con, records, table_name="llm_raw_outputs"):
+    """
+    Store raw LLM answers, one row per (conference, parser, model,
+    prompt_version); a newer answer replaces an older one.
+    """
+    if not records:
+        return 0
+    df = pd.DataFrame(records)
+    with stage("write"):
+        con.execute(RAW_OUTPUTS_DDL.replace("llm_raw_outputs", table_name))
+        con.execute(f"""
+            DELETE FROM {table_name} t
+            WHERE EXISTS (
+                SELECT 1 FROM df d
+                WHERE d.conference = t.conference
+                  AND d.parser = t.parser
+                  AND d.model = t.model
+                  AND d.prompt_version = t.prompt_version
+            )
+        """)
+        con.execute(f"""
+            INSERT INTO {table_name}
+            SELECT conference, parser, model, prompt_version, raw_text, now()
+            FROM df
+        """)
+    return len(df)
+
+
+def fetch_latest_raw_outputs(con, table_name="llm_raw_outputs"):
+    """Most recent stored answer per conference string."""
+    return con.execute(f"""
+        SELECT conference, parser, model, prompt_version, raw_text
+        FROM {table_name}
+        QUALIFY row_number() OVER (
+            PARTITION BY conference
+            ORDER BY created_at DESC, (parser = 'full') DESC
+        ) = 1
+    """).fetch_df()
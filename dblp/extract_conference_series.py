@@ -1,17 +1,40 @@
 #!/usr/bin/env python3
+import argparse
 import gzip
+import importlib
 import csv
+import json
 import re
+import sys
+import uuid
+from contextlib import nullcontext
+from pathlib import Path
 from urllib.parse import urlparse
 
 NT_PATH = "dblp.nt.gz"
 OUT_CSV = "dblp_conference_series.csv"
+OUT_EDITIONS_CSV = "dblp_conference_editions.csv"
 
 TYPE_PRED = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
 CONF_OBJ = "<https://dblp.org/rdf/schema#Conference>"
 LABEL_PRED = "<http://www.w3.org/2000/01/rdf-schema#label>"
 
+# Proceedings volumes (one per conference edition) and their properties
+EDITORSHIP_OBJ = "<https://dblp.org/rdf/schema#Editorship>"
+EDITION_PREDS = {
+    "https://dblp.org/rdf/schema#publishedInStream": "stream_iri",
+    "https://dblp.org/rdf/schema#yearOfPublication": "year",
+    "https://dblp.org/rdf/schema#publishedIn": "venue",
+    "https://dblp.org/rdf/schema#title": "title",
+}
+
+# Acronym shape of regex_utils.ACRONYM_YEAR_RE, which looks editions up by
+# ("ACRONYM", year); publisher prefixes of venues ("ACM Multimedia") are skipped
+ACRONYM_TOKEN_RE = re.compile(r"\b[A-Z]{2,}\b")
+PUBLISHER_PREFIXES = {"ACM", "IEEE", "IFIP", "IAPR", "SIAM", "USENIX", "LNCS", "CEUR"}
+
 uri_re = re.compile(r"^<([^>]+)>\s+<([^>]+)>\s+(.*)\s\.\s*$")
+literal_re = re.compile(r'^"((?:[^"\\]|\\.)*)"')
 
 
 def iri_to_slug(iri: str) -> str:
@@ -21,30 +44,124 @@ def iri_to_slug(iri: str) -> str:
     return parts[-1] if parts else ""
 
 
-def main():
+def literal_value(obj: str):
+    # '"2022"^^<...#gYear>' -> '2022'; None for IRIs
+    m = literal_re.match(obj)
+    if not m:
+        return None
+    text = m.group(1)
+    if "\\" in text:
+        try:
+            text = json.loads(f'"{text}"')
+        except ValueError:
+            pass
+    return text
+
+
+def venue_acronym(venue: str) -> str:
+    for token in ACRONYM_TOKEN_RE.findall(venue):
+        if token not in PUBLISHER_PREFIXES:
+            return token
+    return ""
+
+
+def edition_rows(editions, conference_subjects):
+    """
+    One row per proceedings volume of a conference series:
+    (acronym, year, series_slug, stream_iri, edition_iri, title).
+    The acronym is the first uppercase token of the publishedIn venue that is
+    not a publisher ("ICASSP (1)" -> ICASSP), else the upper-cased series
+    slug ("ACM Multimedia" -> MM).
+    """
+    rows = []
+    for iri, props in editions.items():
+        stream = props.get("stream_iri")
+        year = props.get("year")
+        if stream not in conference_subjects or not year:
+            continue
+        slug = iri_to_slug(stream)
+        acronym = venue_acronym(props.get("venue") or "") or slug.upper()
+        rows.append((acronym, year, slug, stream, iri, props.get("title", "")))
+    rows.sort()
+    return rows
+
+
+def _profiler(mode, out_dir):
+    """Profiler from the package this script lives in (confmeta/dblp/)."""
+    package_dir = Path(__file__).absolute().parents[1]
+    if str(package_dir.parent) not in sys.path:
+        sys.path.insert(0, str(package_dir.parent))
+    profiling = importlib.import_module(f"{package_dir.name}.profiling")
+    return profiling.Profiler(mode, "dblp_extract", out_dir=out_dir)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Extract dblp conference series labels")
+    ap.add_argument("--nt", default=NT_PATH)
+    ap.add_argument("--out", default=OUT_CSV)
+    ap.add_argument("--editions-out", default=OUT_EDITIONS_CSV)
+    ap.add_argument("--profile", choices=("cprofile", "sample"))
+    ap.add_argument("--profile-dir", default="profiles")
+    args = ap.parse_args(argv)
+
+    if not args.profile:
+        extract(args.nt, args.out, args.editions_out)
+        return
+    profiler = _profiler(args.profile, args.profile_dir).start()
+    try:
+        extract(args.nt, args.out, args.editions_out, profiler)
+    finally:
+        profiler.stop(uuid.uuid4().hex[:12], meta={
+            "nt_path": args.nt, "out_csv": args.out, "editions_csv": args.editions_out,
+        })
+
+
+def extract(nt_path=NT_PATH, out_csv=OUT_CSV, editions_csv=OUT_EDITIONS_CSV, profiler=None):
+    def stage(name):
+        return profiler.stage(name) if profiler else nullcontext()
+
     conference_subjects = set()
+    editions = {}  # proceedings IRI -> {stream_iri, year, venue, title}
 
-    # Pass 1: find all conference series IRIs
-    with gzip.open(NT_PATH, "rt", encoding="utf-8", errors="replace") as f:
+    # Pass 1: find all conference series and proceedings volume IRIs
+    with stage("pass1_series"), gzip.open(nt_path, "rt", encoding="utf-8", errors="replace") as f:
         for line in f:
-            if TYPE_PRED in line and CONF_OBJ in line:
+            if TYPE_PRED in line and (CONF_OBJ in line or EDITORSHIP_OBJ in line):
                 m = uri_re.match(line)
                 if not m:
                     continue
                 subj = m.group(1)
-                conference_subjects.add(subj)
+                if CONF_OBJ in m.group(3):
+                    conference_subjects.add(subj)
+                else:
+                    editions[subj] = {}
 
-    print(f"Found {len(conference_subjects)} conference series")
+    print(f"Found {len(conference_subjects)} conference series, {len(editions)} proceedings volumes")
 
-    # Pass 2: get labels for those series
-    with gzip.open(NT_PATH, "rt", encoding="utf-8", errors="replace") as f, \
-         open(OUT_CSV, "w", newline="", encoding="utf-8") as out_f:
+    # Pass 2: get labels for those series and properties of the volumes
+    with stage("pass2_labels"), \
+         gzip.open(nt_path, "rt", encoding="utf-8", errors="replace") as f, \
+         open(out_csv, "w", newline="", encoding="utf-8") as out_f:
 
         writer = csv.writer(out_f, delimiter=";")
         writer.writerow(["series_slug", "stream_iri", "series_name"])
 
         for line in f:
             if LABEL_PRED not in line:
+                # cheap subject check before the regex: most lines are not volumes
+                props = editions.get(line[1:line.find(">")])
+                if props is None:
+                    continue
+                m = uri_re.match(line)
+                if not m:
+                    continue
+                key = EDITION_PREDS.get(m.group(2))
+                if key is None or key in props:
+                    continue
+                obj = m.group(3)
+                value = obj[1:-1] if obj.startswith("<") else literal_value(obj)
+                if value:
+                    props[key] = value
                 continue
 
             m = uri_re.match(line)
@@ -67,7 +184,15 @@ def main():
             slug = iri_to_slug(subj)
             writer.writerow([slug, subj, label])
 
-    print(f"Wrote conference series labels to {OUT_CSV}")
+    print(f"Wrote conference series labels to {out_csv}")
+
+    rows = edition_rows(editions, conference_subjects)
+    with stage("write_editions"), open(editions_csv, "w", newline="", encoding="utf-8") as out_f:
+        writer = csv.writer(out_f, delimiter=";")
+        writer.writerow(["acronym", "year", "series_slug", "stream_iri", "edition_iri", "title"])
+        writer.writerows(rows)
+
+    print(f"Wrote {len(rows)} conference editions to {editions_csv}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Dry-run cost estimate of a full-table pass; never calls the LLM.
+
+  SQL aggregates   rows, distinct strings, rows/strings passing needs_llm
+                   (looks_like_conference_string and looks_like_has_date
+                   translated to DuckDB regexes), strings already parsed
+                   (names_conference_parsed) or with a stored raw answer
+  calibration      a sample of distinct strings checks the SQL heuristics
+                   against the Python ones and measures prompt tokens per
+                   call and the template hit rate
+  history          seconds per LLM call, non-LLM seconds per row,
+                   prompt/eval tokens per call and the share of LLM strings
+                   answered by a near-duplicate's parse from recent
+                   pipeline_runs
+
+    python -m confmeta.pipeline --dry-run [--shard 1/8]
+    python -m confmeta.estimate --shards 8 --target-hours 12
+"""
+import argparse
+import json
+import math
+
+from .config import (
+    NEAR_DUP,
+    PARSER_MODE,
+    PROMPT_ASSEMBLY,
+    TEMPLATES,
+    DRY_RUN_SAMPLE,
+    DRY_RUN_HISTORY_RUNS,
+    STAGE_WORKERS,
+)
+from .regex_utils import (
+    MIN_LEN_FOR_LLM,
+    MAX_LEN_FOR_LLM,
+    HAS_YEAR,
+    HAS_MONTH,
+    HTML_TAG_RE,
+    MANY_DIGITS_RE,
+)
+
+PROMPT_WRAPPER = "\n\nRaw conference string:\n{raw}\n\nJSON:"
+
+
+def needs_llm_sql(expr="conference"):
+    """pipeline.needs_llm as a DuckDB boolean expression (RE2 regexes)."""
+    t = f"trim({expr})"
+    return f"""(
+        length({t}) BETWEEN {MIN_LEN_FOR_LLM} AND {MAX_LEN_FOR_LLM}
+        AND NOT regexp_matches({t}, '{HTML_TAG_RE.pattern}')
+        AND NOT regexp_matches({t}, '{MANY_DIGITS_RE.pattern}')
+        AND (regexp_matches({t}, '{HAS_YEAR.pattern}')
+             OR regexp_matches({t}, '(?i){HAS_MONTH.pattern}'))
+    )"""
+
+
+def _strings_sql(shard=None):
+    from .db_io import SHARD_HASH_SQL
+
+    where = "conference IS NOT NULL"
+    if shard:
+        i, n = shard
+        where += f" AND {SHARD_HASH_SQL.format(i=int(i), n=int(n))}"
+    return f"""
+        SELECT conference, count(*) AS n_records, {needs_llm_sql()} AS llm
+        FROM names_conference
+        WHERE {where}
+        GROUP BY conference
+    """
+
+
+def table_counts(con, shard=None):
+    from .db_io import cached_conferences_sql, table_exists
+
+    if table_exists(con, "llm_raw_outputs"):
+        stored_sql = "SELECT DISTINCT conference FROM llm_raw_outputs"
+    else:
+        stored_sql = "SELECT NULL::VARCHAR AS conference WHERE false"
+    row = con.execute(f"""
+        WITH strings AS ({_strings_sql(shard)}),
+        cached AS ({cached_conferences_sql(con)}),
+        stored AS ({stored_sql})
+        SELECT
+            coalesce(sum(n_records), 0),
+            count(*),
+            coalesce(sum(n_records) FILTER (WHERE llm), 0),
+            count(*) FILTER (WHERE llm),
+            count(*) FILTER (WHERE llm AND conference IN (SELECT conference FROM cached)),
+            count(*) FILTER (WHERE llm AND conference IN (SELECT conference FROM stored)),
+            avg(length(conference)) FILTER (WHERE llm)
+        FROM strings
+    """).fetchone()
+    keys = ("rows", "distinct", "llm_rows", "llm_distinct", "llm_distinct_cached",
+            "llm_distinct_raw_stored", "llm_mean_chars")
+    return dict(zip(keys, row))
+
+
+def calibration_sample(con, shard=None, n=DRY_RUN_SAMPLE):
+    """Up to n distinct strings as (conference, SQL needs_llm flag)."""
+    return con.execute(f"""
+        SELECT conference, llm FROM ({_strings_sql(shard)})
+        USING SAMPLE reservoir({int(n)} ROWS) REPEATABLE (42)
+    """).fetchall()
+
+
+def prompt_tokens(raw, parser_mode=PARSER_MODE, escalation=0.0):
+    """Rough prompt tokens (prompt_rules.count_tokens units) of one LLM call."""
+    from .prompt_rules import FULL_INSTRUCTION, assemble_instruction, count_tokens
+
+    wrapper = count_tokens(PROMPT_WRAPPER.format(raw=raw))
+    if parser_mode in ("full", "routed"):
+        instruction = assemble_instruction(raw)[0] if PROMPT_ASSEMBLY else FULL_INSTRUCTION
+        return count_tokens(instruction) + wrapper
+    from .fast_llm_parse import INSTRUCTION as FAST_INSTRUCTION
+
+    fast = count_tokens(FAST_INSTRUCTION) + wrapper
+    if parser_mode == "fast":
+        return fast
+    # cascade: every string gets the fast prompt, escalated ones also the full one
+    return fast + escalation * prompt_tokens(raw, "full")
+
+
+def calibrate(sample, parser_mode=PARSER_MODE, escalation=0.0):
+    from .pipeline import needs_llm
+
+    agree = 0
+    llm_strings = []
+    for raw, sql_flag in sample:
+        py_flag = needs_llm(raw)
+        agree += py_flag == bool(sql_flag)
+        if py_flag:
+            llm_strings.append(raw)
+
+    template_hits = None
+    if TEMPLATES and llm_strings:
+        from .templates import TemplateStore
+
+        store = TemplateStore.load()
+        if len(store):
+            template_hits = sum(store.match(raw) is not None for raw in llm_strings) / len(llm_strings)
+
+    tokens = [prompt_tokens(raw, parser_mode, escalation) for raw in llm_strings]
+    return {
+        "sample": len(sample),
+        "sample_llm": len(llm_strings),
+        "sql_agreement": round(agree / len(sample), 4) if sample else None,
+        "prompt_tokens_per_call": round(sum(tokens) / len(tokens), 1) if tokens else None,
+        "template_hit_rate": round(template_hits, 4) if template_hits is not None else None,
+    }
+
+
+def throughput_history(con, parser_mode=PARSER_MODE, runs=DRY_RUN_HISTORY_RUNS):
+    """
+    Measured rates over the most recent runs with LLM calls, same parser
+    mode when there are any; None without pipeline_runs.
+    """
+    from .db_io import table_exists
+
+    if not table_exists(con, "pipeline_runs"):
+        return None
+    sql = """
+        SELECT parser_mode, rows, llm_calls, wall_s, llm_s, prompt_eval_count, eval_count, extra_json
+        FROM pipeline_runs
+        WHERE llm_calls > 0 {mode}
+        ORDER BY started_at DESC
+        LIMIT ?
+    """
+    rows = con.execute(sql.format(mode="AND parser_mode = ?"), [parser_mode, runs]).fetchall()
+    same_mode = bool(rows)
+    if not rows:
+        rows = con.execute(sql.format(mode=""), [runs]).fetchall()
+    if not rows:
+        return None
+
+    n_rows = sum(r[1] for r in rows)
+    calls = sum(r[2] for r in rows)
+    wall = sum(r[3] for r in rows)
+    llm_s = sum(r[4] for r in rows)
+    fast_ok = escalated = aliases = alias_candidates = 0
+    for r in rows:
+        counters = json.loads(r[7] or "{}").get("counters", {})
+        fast_ok += counters.get("cascade_fast_ok", 0)
+        escalated += counters.get("cascade_escalated", 0)
+        aliases += counters.get("near_dup_aliases", 0)
+        alias_candidates += counters.get("near_dup_candidates", 0)
+    return {
+        "runs": len(rows),
+        "same_parser_mode": same_mode,
+        "s_per_llm_call": llm_s / calls,
+        "other_s_per_row": max(0.0, wall - llm_s) / n_rows if n_rows else 0.0,
+        "prompt_tokens_per_call": sum(r[5] for r in rows) / calls,
+        "eval_tokens_per_call": sum(r[6] for r in rows) / calls,
+        "escalation_rate": escalated / (fast_ok + escalated) if fast_ok + escalated else None,
+        "near_dup_rate": aliases / alias_candidates if alias_candidates else None,
+    }
+
+
+def estimate(con, shard=None, sample=DRY_RUN_SAMPLE, parser_mode=PARSER_MODE):
+    counts = table_counts(con, shard)
+    history = throughput_history(con, parser_mode)
+    escalation = (history or {}).get("escalation_rate") or 0.0
+    cal = calibrate(calibration_sample(con, shard, sample), parser_mode, escalation)
+
+    uncached = counts["llm_distinct"] - counts["llm_distinct_cached"]
+    template_share = cal["template_hit_rate"] or 0.0
+    calls_per_string = 1.0 + escalation if parser_mode == "cascade" else 1.0
+    # near-duplicates reuse their representative's parse; the rate is measured
+    # on earlier (usually smaller) runs, so the saving is if anything understated
+    near_dup_rate = (history or {}).get("near_dup_rate") if NEAR_DUP else None
+    calls_per_string *= 1.0 - (near_dup_rate or 0.0)
+    # a full pass parses every row: in-process caches dedupe strings, the
+    # parsed table only helps budgeted runs (reported as cached)
+    llm_calls = counts["llm_distinct"] * (1.0 - template_share) * calls_per_string
+    llm_calls_uncached = uncached * (1.0 - template_share) * calls_per_string
+
+    if history and history["same_parser_mode"]:
+        prompt_per_call = history["prompt_tokens_per_call"]
+        prompt_source = f"measured over {history['runs']} runs"
+    else:
+        prompt_per_call = cal["prompt_tokens_per_call"] or 0.0
+        prompt_source = "rough estimate from the calibration sample"
+    eval_per_call = history["eval_tokens_per_call"] if history else None
+
+    est = {
+        "parser_mode": parser_mode,
+        "shard": f"{shard[0]}/{shard[1]}" if shard else None,
+        **counts,
+        "calibration": cal,
+        "history": history,
+        "near_dup": NEAR_DUP,
+        "near_dup_rate": near_dup_rate,
+        "llm_calls": round(llm_calls),
+        "llm_calls_uncached": round(llm_calls_uncached),
+        "prompt_tokens": round(llm_calls * prompt_per_call),
+        "prompt_tokens_source": prompt_source,
+        "eval_tokens": round(llm_calls * eval_per_call) if eval_per_call is not None else None,
+        "wall_s": None,
+        "wall_s_staged": None,
+    }
+    if history:
+        other = counts["rows"] * history["other_s_per_row"]
+        llm = llm_calls * history["s_per_llm_call"]
+        est["wall_s"] = round(other + llm, 1)
+        est["wall_s_staged"] = round(other + llm / max(1, STAGE_WORKERS.get("parse", 1)), 1)
+    return est
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "unknown (no pipeline_runs with LLM calls yet)"
+    h, rest = divmod(int(seconds), 3600)
+    return f"{h}h{rest // 60:02d}m ({seconds:,.0f}s)"
+
+
+def _near_dup_text(est):
+    if not est["near_dup"]:
+        return "off (NEAR_DUP = False)"
+    if est["near_dup_rate"] is None:
+        return "not applied (no measured runs): LLM calls and tokens are an upper bound"
+    return f"{est['near_dup_rate']:.1%} of LLM strings reuse a parse (measured), applied above"
+
+
+def format_estimate(est, shards=None, target_hours=None):
+    cal = est["calibration"]
+    hist = est["history"]
+    shard_txt = f", shard {est['shard']}" if est["shard"] else ""
+    eval_tokens = "unknown" if est["eval_tokens"] is None else f"{est['eval_tokens']:,}"
+    lines = [
+        f"Dry run (parser: {est['parser_mode']}{shard_txt}); no LLM calls made",
+        f"  rows               {est['rows']:>12,}   distinct strings {est['distinct']:,}",
+        f"  rows to the LLM    {est['llm_rows']:>12,}   distinct {est['llm_distinct']:,}"
+        f" (mean {est['llm_mean_chars'] or 0:.0f} chars)",
+        f"  already parsed     {est['llm_distinct_cached']:>12,}   raw answer stored {est['llm_distinct_raw_stored']:,}",
+        f"  calibration        {cal['sample']:,} strings, SQL/Python heuristics agree on "
+        f"{(cal['sql_agreement'] or 0):.1%}"
+        + (f", template hits {cal['template_hit_rate']:.1%}" if cal["template_hit_rate"] is not None else ""),
+        f"  LLM calls          {est['llm_calls']:>12,}   ({est['llm_calls_uncached']:,} for strings not parsed yet)",
+        "  near-duplicates    " + _near_dup_text(est),
+        f"  prompt tokens      {est['prompt_tokens']:>12,}   {est['prompt_tokens_source']}",
+        f"  output tokens      {eval_tokens:>12}",
+    ]
+    if hist:
+        src = "same parser mode" if hist["same_parser_mode"] else "other parser modes"
+        lines.append(
+            f"  throughput         {hist['s_per_llm_call']:.3f}s per LLM call, "
+            f"{hist['other_s_per_row'] * 1000:.1f}ms other per row ({hist['runs']} runs, {src})"
+        )
+    lines.append(f"  wall time          {_duration(est['wall_s'])} sequential")
+    if est["wall_s_staged"] is not None:
+        lines.append(f"                     {_duration(est['wall_s_staged'])} --staged "
+                     f"({STAGE_WORKERS.get('parse', 1)} parse workers)")
+    if est["wall_s"] is not None and shards:
+        lines.append(f"  per shard          {_duration(est['wall_s'] / shards)} with {shards} shards")
+    if est["wall_s"] is not None and target_hours:
+        need = math.ceil(est["wall_s"] / (target_hours * 3600))
+        lines.append(f"  shards needed      {need} to finish within {target_hours:g}h (sequential per shard)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from .shards import parse_shard
+
+    ap = argparse.ArgumentParser(description="Dry-run cost estimate of a full-table pass")
+    ap.add_argument("--shard", type=parse_shard, metavar="I/N")
+    ap.add_argument("--sample", type=int, default=DRY_RUN_SAMPLE, help="calibration sample size")
+    ap.add_argument("--shards", type=int, help="also show wall time per shard")
+    ap.add_argument("--target-hours", type=float, help="shards needed to finish within this time")
+    ap.add_argument("--json", action="store_true", help="print the estimate as JSON")
+    args = ap.parse_args(argv)
+
+    from .db_io import connect
+
+    con = connect(read_only=True)
+    try:
+        est = estimate(con, args.shard, args.sample)
+    finally:
+        con.close()
+    if args.json:
+        print(json.dumps(est, indent=2, default=str))
+    else:
+        print(format_estimate(est, args.shards, args.target_hours))
+
+
+if __name__ == "__main__":
+    main()
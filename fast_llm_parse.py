@@ -1,6 +1,6 @@
+import hashlib
 import json
-import requests
-from .config import MODEL, OLLAMA_URL
+from .config import MODEL, LLM_OPTIONS
 from .regex_utils import (
     normalize_conf_name,
     normalize_place,
@@ -10,11 +10,15 @@ from .regex_utils import (
     maybe_add_acronym_year_from_raw,
     maybe_keep_parenthesized_acronym_from_raw,
 )
-from .geonames_cities import load_city_country
+from .geonames_cities import get_city_country
+from .transport import get_transport
+from .llm_client import build_payload
+from .metrics import stage, record_ollama_stats
 
-CITY_COUNTRY = load_city_country("~/geonames/cities5000.txt")
 
 _llm_cache = {}
+# raw LLM answers of this process, drained by parsers.drain_raw_outputs()
+_raw_outputs = {}
 
 # ---------------------------------------------------------------------
 # Toggle: include note (LLM reasoning) or not
@@ -91,6 +95,10 @@ Respond with only this JSON, no explanations or extra text.
 """
 
 
+INSTRUCTION = INSTRUCTION_WITH_NOTE if INCLUDE_NOTE else INSTRUCTION_FAST
+PROMPT_VERSION = hashlib.sha1(INSTRUCTION.encode("utf-8")).hexdigest()[:12]
+
+
 def maybe_add_country_from_city(place: str):
     if not place:
         return place, False
@@ -106,7 +114,7 @@ def maybe_add_country_from_city(place: str):
     if any(len(p) == 2 and p.isupper() for p in parts[1:]):
         return place, False
 
-    countries = CITY_COUNTRY.get(key)
+    countries = get_city_country().get(key)
     if not countries or len(countries) != 1:
         return place, False
 
@@ -117,28 +125,18 @@ def maybe_add_country_from_city(place: str):
 
 
 def stream_llm_json(prompt: str, show_stream: bool = True) -> str:
-    resp = requests.post(
-        OLLAMA_URL,
-        json={
-            "model": MODEL,
-            "prompt": prompt,
-            "stream": True,
-        },
-        stream=True,
-    )
-    resp.raise_for_status()
+    payload = build_payload(prompt, stream=True, **LLM_OPTIONS)
 
     full_text = []
-    for line in resp.iter_lines():
-        if not line:
-            continue
-        data = json.loads(line.decode("utf-8"))
-        chunk = data.get("response", "")
-        if show_stream and chunk:
-            print(chunk, end="", flush=True)
-        full_text.append(chunk)
-        if data.get("done"):
-            break
+    with stage("llm"):
+        for data in get_transport().generate(payload):
+            chunk = data.get("response", "")
+            if show_stream and chunk:
+                print(chunk, end="", flush=True)
+            full_text.append(chunk)
+            if data.get("done"):
+                record_ollama_stats(data)
+                break
 
     if show_stream:
         print()
@@ -160,14 +158,30 @@ def parse_with_llm(conf_string: str, show_stream: bool = True):
             "note": "",
         }
 
-    if conf_string in _llm_cache:
-        return _llm_cache[conf_string].copy()
+    cached = _llm_cache.get(conf_string)  # one read: the service evicts concurrently
+    if cached is not None:
+        return cached.copy()
 
-    instruction = INSTRUCTION_WITH_NOTE if INCLUDE_NOTE else INSTRUCTION_FAST
-    prompt = instruction + f"\n\nRaw conference string:\n{conf_string}\n\nJSON:"
+    prompt = INSTRUCTION + f"\n\nRaw conference string:\n{conf_string}\n\nJSON:"
 
     text = stream_llm_json(prompt, show_stream=show_stream)
+    _raw_outputs[conf_string] = {
+        "parser": "fast",
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "raw_text": text,
+    }
+
+    result = normalize_llm_text(conf_string, text)
+    _llm_cache[conf_string] = result
+    return result
+
 
+def normalize_llm_text(conf_string: str, text: str):
+    """
+    JSON extraction and normalization chain for a raw LLM answer.
+    Pure CPU work, so stored answers can be re-normalized without the LLM.
+    """
     # ---- robust JSON object extraction ----
     start = text.find("{")
     if start == -1:
@@ -177,7 +191,6 @@ def parse_with_llm(conf_string: str, show_stream: bool = True):
             "conf_dates": "",
             "note": "fallback: could not find JSON object" if INCLUDE_NOTE else "",
         }
-        _llm_cache[conf_string] = result
         return result
 
     depth = 0
@@ -198,7 +211,6 @@ def parse_with_llm(conf_string: str, show_stream: bool = True):
             "conf_dates": "",
             "note": "fallback: could not parse JSON" if INCLUDE_NOTE else "",
         }
-        _llm_cache[conf_string] = result
         return result
 
     json_str = text[start : end + 1]
@@ -211,7 +223,6 @@ def parse_with_llm(conf_string: str, show_stream: bool = True):
             "conf_dates": "",
             "note": "fallback: JSON decode error" if INCLUDE_NOTE else "",
         }
-        _llm_cache[conf_string] = result
         return result
 
     # ---- normalization pipeline ----
@@ -220,16 +231,18 @@ def parse_with_llm(conf_string: str, show_stream: bool = True):
     conf_dates = str(obj.get("conf_dates", "") or "")
 
     name_source = raw_name or conf_string
-    name_norm = normalize_conf_name(name_source)
-    name_norm = strip_proceedings_noise(name_norm)
-    name_norm = ensure_keep_full_name_for_as_part_of(conf_string, name_norm)
-    name_norm = maybe_add_acronym_year_from_raw(conf_string, name_norm)
-    name_norm = maybe_keep_parenthesized_acronym_from_raw(conf_string, name_norm)
-
-    place_source = raw_place.replace(";", ",") if raw_place else raw_place
-    place_norm = normalize_place(place_source)
-    place_norm = normalize_us_place(place_norm)
-    place_norm, added_country = maybe_add_country_from_city(place_norm)
+    with stage("normalize"):
+        name_norm = normalize_conf_name(name_source)
+        name_norm = strip_proceedings_noise(name_norm)
+        name_norm = ensure_keep_full_name_for_as_part_of(conf_string, name_norm)
+        name_norm = maybe_add_acronym_year_from_raw(conf_string, name_norm)
+        name_norm = maybe_keep_parenthesized_acronym_from_raw(conf_string, name_norm)
+
+        place_source = raw_place.replace(";", ",") if raw_place else raw_place
+        place_norm = normalize_place(place_source)
+        place_norm = normalize_us_place(place_norm)
+    with stage("geonames"):
+        place_norm, added_country = maybe_add_country_from_city(place_norm)
 
     if INCLUDE_NOTE:
         note = str(obj.get("note", "") or "")
@@ -251,5 +264,4 @@ def parse_with_llm(conf_string: str, show_stream: bool = True):
         "conf_dates": conf_dates,
         "note": note,
     }
-    _llm_cache[conf_string] = result
     return result
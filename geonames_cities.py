@@ -1,7 +1,13 @@
 # confmeta/geonames_cities.py
 import csv
+import threading
 from pathlib import Path
 
+from .config import GEONAMES_CITIES_PATH
+
+_city_country = None
+_lock = threading.Lock()
+
 def load_city_country(path: str):
     """
     Load GeoNames cities file and return:
@@ -25,3 +31,16 @@ def load_city_country(path: str):
 
     return city_map
 
+
+
+def get_city_country():
+    """
+    The GeoNames city map for GEONAMES_CITIES_PATH, loaded on first use and
+    shared by all parsers.
+    """
+    global _city_country
+    if _city_country is None:
+        with _lock:
+            if _city_country is None:
+                _city_country = load_city_country(GEONAMES_CITIES_PATH)
+    return _city_country
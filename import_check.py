@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Import-time regression check.
+
+Imports each light module in a fresh interpreter with `-X importtime` and
+fails when it pulls in a heavy dependency (duckdb, pandas, numpy, requests)
+or when its cumulative import time exceeds the budget. Heavy modules and the
+GeoNames file must only load on first use.
+
+    python -m confmeta.import_check
+    python -m confmeta.import_check --budget-ms 100 --top 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE = __package__ or Path(__file__).resolve().parent.name
+
+# Modules that CLI entry points, workers and helpers import eagerly
+LIGHT_MODULES = (
+    "",
+    "config",
+    "regex_utils",
+    "validate",
+    "metrics",
+    "progress",
+    "breaker",
+    "transport",
+    "prompt_rules",
+    "llm_parse",
+    "fast_llm_parse",
+    "cascade",
+    "routing",
+    "parsers",
+    "llm_series",
+    "templates",
+    "shards",
+    "pipeline",
+)
+HEAVY = ("duckdb", "pandas", "numpy", "requests")
+DEFAULT_BUDGET_MS = 150.0
+
+
+def import_profile(module):
+    """
+    Import `module` in a fresh interpreter; returns a list of
+    (name, self_us, cumulative_us) in the order -X importtime reports them.
+    """
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(root), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip()[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cum_us)))
+    return entries
+
+
+def check_module(module, budget_ms=DEFAULT_BUDGET_MS):
+    entries = import_profile(module)
+    cumulative = next((cum for name, _, cum in entries if name == module), 0)
+    heavy = sorted({name.split(".")[0] for name, _, _ in entries if name.split(".")[0] in HEAVY})
+    problems = []
+    if heavy:
+        problems.append("pulls in " + ", ".join(heavy))
+    if cumulative / 1000 > budget_ms:
+        problems.append(f"{cumulative / 1000:.0f} ms > {budget_ms:.0f} ms budget")
+    return {"module": module, "ms": cumulative / 1000, "entries": entries, "problems": problems}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="confmeta import-time check")
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=0, help="show the N slowest imports per module")
+    args = ap.parse_args(argv)
+
+    failed = 0
+    for name in LIGHT_MODULES:
+        module = f"{PACKAGE}.{name}" if name else PACKAGE
+        res = check_module(module, args.budget_ms)
+        status = "FAIL " + "; ".join(res["problems"]) if res["problems"] else "ok"
+        print(f"{module:32s} {res['ms']:8.1f} ms  {status}")
+        if args.top:
+            for n, self_us, _ in sorted(res["entries"], key=lambda e: e[1], reverse=True)[:args.top]:
+                print(f"    {self_us / 1000:8.1f} ms self  {n}")
+        failed += bool(res["problems"])
+
+    if failed:
+        print(f"{failed} module(s) failed the import check")
+        sys.exit(1)
+    print("Import check passed.")
+
+
+if __name__ == "__main__":
+    main()
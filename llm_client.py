@@ -0,0 +1,157 @@
+"""
+Shared Ollama client: one pooled requests.Session per process.
+
+  generate(payload)  POST /api/generate over the pooled session; keep_alive
+                     is added so the model stays loaded between gaps
+  health()           GET /api/tags: is the server up, is MODEL available
+  warm_up()          empty generate request that loads MODEL into memory
+  embed(texts)       POST /api/embed: one vector per text (EMBED_MODEL)
+  preflight()        health + warm-up before a run (all MODEL_POOL models
+                     when routing)
+
+build_payload() puts sampling parameters (temperature, num_predict, ...)
+under "options", where Ollama reads them.
+"""
+import threading
+import time
+
+from .config import (
+    OLLAMA_URL,
+    MODEL,
+    OLLAMA_KEEP_ALIVE,
+    LLM_POOL_SIZE,
+    EMBED_MODEL,
+)
+
+
+def model_served(model, served):
+    """"llama3" matches "llama3:latest"; "llama3:8b" must match exactly."""
+    wanted = model if ":" in model else f"{model}:latest"
+    return wanted in served or model in served
+
+
+def build_payload(prompt, stream=True, model=MODEL, **options):
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+    if options:
+        payload["options"] = options
+    return payload
+
+
+class OllamaClient:
+    def __init__(self, generate_url=OLLAMA_URL, model=MODEL, pool_size=LLM_POOL_SIZE):
+        self.generate_url = generate_url
+        self.base_url = generate_url.rsplit("/api/", 1)[0]
+        self.model = model
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    s.mount("http://", adapter)
+                    s.mount("https://", adapter)
+                    self._session = s
+        return self._session
+
+    def generate(self, payload, stream=None, timeout=None):
+        """Raw response of POST /api/generate (raise_for_status applied)."""
+        if stream is None:
+            stream = payload.get("stream", True)
+        if "keep_alive" not in payload:
+            payload = {**payload, "keep_alive": OLLAMA_KEEP_ALIVE}
+        resp = self.session.post(self.generate_url, json=payload, stream=stream, timeout=timeout)
+        resp.raise_for_status()
+        return resp
+
+    def health(self, timeout=5):
+        """{"ok", "models", "model_available", "error"} from GET /api/tags."""
+        try:
+            resp = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+            resp.raise_for_status()
+            models = [m.get("name", "") for m in resp.json().get("models", [])]
+        except Exception as e:
+            return {"ok": False, "models": [], "model_available": False, "error": str(e)}
+        return {
+            "ok": True,
+            "models": models,
+            "model_available": model_served(self.model, models),
+            "error": None,
+        }
+
+    def warm_up(self, timeout=300, model=None):
+        """Load the model (empty prompt); returns seconds taken."""
+        t0 = time.perf_counter()
+        self.generate(
+            {"model": model or self.model, "prompt": "", "stream": False},
+            timeout=timeout,
+        ).json()
+        return time.perf_counter() - t0
+
+    def embed(self, texts, model=EMBED_MODEL, timeout=120):
+        """Embedding vectors (lists of floats) of texts, in order."""
+        resp = self.session.post(
+            f"{self.base_url}/api/embed",
+            json={"model": model, "input": list(texts), "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
+
+
+def preflight(log=print, warm=True, models=None):
+    """
+    Check the endpoint before a run. Raises RuntimeError when the server is
+    up but a model (MODEL, or each of `models`) is missing; an unreachable
+    server is only reported (rows are deferred by the circuit breaker and
+    retried at the end).
+    """
+    client = get_client()
+    models = list(models or [client.model])
+    h = client.health()
+    if not h["ok"]:
+        log(f"LLM health check failed ({client.base_url}): {h['error']}")
+        return h
+    missing = [m for m in models if not model_served(m, h["models"])]
+    if missing:
+        raise RuntimeError(
+            f"model(s) {', '.join(map(repr, missing))} not available at {client.base_url}; "
+            f"served: {', '.join(h['models']) or 'none'} (ollama pull {missing[0]})"
+        )
+    if warm:
+        h["warm_up_s"] = 0.0
+        for model in models:
+            seconds = client.warm_up(model=model)
+            h["warm_up_s"] += seconds
+            log(f"LLM ready: {model} loaded in {seconds:.1f}s (keep_alive {OLLAMA_KEEP_ALIVE})")
+    return h
@@ -33,6 +33,20 @@ def find_series_candidates(con, conf_name: str, max_candidates: int = MAX_SERIES
     return con.execute(query, params).fetchall()
 
 
+def add_vector_candidates(conf_name: str, candidates, max_candidates: int = MAX_SERIES_CANDIDATES):
+    """
+    candidates plus embedding-index hits for differently worded names
+    ("Int. Conf. on ..."), at most max_candidates in total.
+    """
+    room = max_candidates - len(candidates)
+    if room <= 0:
+        return candidates
+    from .series_vectors import vector_candidates
+
+    seen = {c[1] for c in candidates}
+    return candidates + [c for c in vector_candidates(conf_name) if c[1] not in seen][:room]
+
+
 def choose_series_with_llm(conf_name: str, conf_dates: str, candidates):
     if not candidates:
         return (None, None, None, "")
@@ -0,0 +1,265 @@
+"""
+Lightweight per-run metrics: wall time per pipeline stage and Ollama eval
+statistics, persisted to the pipeline_runs DuckDB table and a
+Prometheus-style text file.
+
+Usage:
+    run = start_run(parser_mode="cascade")
+    with stage("fetch"):
+        ...
+    record_ollama_stats(done_obj)  # final Ollama response object
+    finish_run(con)
+"""
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import LLM_OPTIONS, METRICS_PROM_PATH
+
+STAGES = ("fetch", "heuristics", "llm", "normalize", "geonames", "write", "series")
+
+OLLAMA_FIELDS = ("prompt_eval_count", "eval_count", "eval_duration", "load_duration",
+                 "prompt_eval_duration", "total_duration")
+
+
+class RunMetrics:
+    def __init__(self, **meta):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.finished_at = None
+        self.meta = dict(meta)
+        self.stage_seconds = {s: 0.0 for s in STAGES}
+        self.stage_calls = {s: 0 for s in STAGES}
+        self.counters = {"rows": 0, "llm_rows": 0, "llm_calls": 0}
+        self.ollama = {k: 0 for k in OLLAMA_FIELDS}
+        self.prompt_eval_max = 0  # largest prompt of the run, in tokens
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_ollama(self, data):
+        with self._lock:
+            self.counters["llm_calls"] += 1
+            if data.get("done_reason") == "length":  # cut off at num_predict
+                self.counters["llm_truncated"] = self.counters.get("llm_truncated", 0) + 1
+            prompt_tokens = data.get("prompt_eval_count") or 0
+            self.prompt_eval_max = max(self.prompt_eval_max, prompt_tokens)
+            # Ollama silently drops the start of a prompt that does not fit num_ctx
+            num_ctx = LLM_OPTIONS.get("num_ctx")
+            if num_ctx and prompt_tokens + LLM_OPTIONS.get("num_predict", 0) > num_ctx:
+                self.counters["llm_ctx_truncated"] = self.counters.get("llm_ctx_truncated", 0) + 1
+            for k in OLLAMA_FIELDS:
+                v = data.get(k)
+                if isinstance(v, (int, float)):
+                    self.ollama[k] += v
+
+    @property
+    def wall_s(self):
+        end = self.finished_at or time.time()
+        return end - self.started_at
+
+    def summary(self):
+        wall = self.wall_s
+        rows = self.counters["rows"]
+        eval_s = self.ollama["eval_duration"] / 1e9
+        return {
+            "run_id": self.run_id,
+            "wall_s": round(wall, 3),
+            "rows": rows,
+            "rows_per_s": round(rows / wall, 3) if wall else None,
+            "stages_s": {k: round(v, 3) for k, v in self.stage_seconds.items()},
+            "counters": dict(self.counters),
+            "ollama": dict(self.ollama),
+            "eval_tokens_per_s": round(self.ollama["eval_count"] / eval_s, 2) if eval_s else None,
+        }
+
+
+_current = RunMetrics()
+
+
+def current():
+    return _current
+
+
+def start_run(**meta):
+    global _current
+    _current = RunMetrics(**meta)
+    return _current
+
+
+# objects with enter(name) / exit(name), e.g. profiling.MemoryTracker
+_stage_hooks = []
+
+
+def add_stage_hook(hook):
+    _stage_hooks.append(hook)
+
+
+def remove_stage_hook(hook):
+    if hook in _stage_hooks:
+        _stage_hooks.remove(hook)
+
+
+@contextmanager
+def stage(name):
+    for hook in _stage_hooks:
+        hook.enter(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current.add_stage(name, time.perf_counter() - t0)
+        for hook in _stage_hooks:
+            hook.exit(name)
+
+
+def record_ollama_stats(data):
+    """Accumulate eval statistics from a final ("done") Ollama response."""
+    if data:
+        _current.add_ollama(data)
+
+
+# ---- persistence ------------------------------------------------------
+
+RUNS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id VARCHAR,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    parser_mode VARCHAR,
+    model VARCHAR,
+    rows BIGINT,
+    llm_rows BIGINT,
+    llm_calls BIGINT,
+    wall_s DOUBLE,
+    rows_per_s DOUBLE,
+    fetch_s DOUBLE,
+    heuristics_s DOUBLE,
+    llm_s DOUBLE,
+    normalize_s DOUBLE,
+    geonames_s DOUBLE,
+    write_s DOUBLE,
+    series_s DOUBLE,
+    prompt_eval_count BIGINT,
+    eval_count BIGINT,
+    eval_duration_s DOUBLE,
+    prompt_eval_duration_s DOUBLE,
+    load_duration_s DOUBLE,
+    extra_json VARCHAR
+)
+"""
+
+
+def ensure_run_table(con):
+    con.execute(RUNS_TABLE_DDL)
+    # tables created before a stage column existed get it appended
+    for stage_name in STAGES:
+        con.execute(f"ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS {stage_name}_s DOUBLE")
+
+
+def write_run_table(con, run):
+    s = run.summary()
+    ensure_run_table(con)
+    columns = [
+        "run_id", "started_at", "finished_at", "parser_mode", "model", "rows", "llm_rows",
+        "llm_calls", "wall_s", "rows_per_s", *(f"{k}_s" for k in STAGES), "prompt_eval_count",
+        "eval_count", "eval_duration_s", "prompt_eval_duration_s", "load_duration_s", "extra_json",
+    ]
+    values = ["?", "to_timestamp(?)", "to_timestamp(?)"] + ["?"] * (len(columns) - 3)
+    con.execute(
+        f"INSERT INTO pipeline_runs ({', '.join(columns)}) VALUES ({', '.join(values)})",
+        [
+            run.run_id,
+            run.started_at,
+            run.finished_at or time.time(),
+            run.meta.get("parser_mode"),
+            run.meta.get("model"),
+            s["rows"],
+            run.counters.get("llm_rows", 0),
+            run.counters.get("llm_calls", 0),
+            s["wall_s"],
+            s["rows_per_s"],
+            *(run.stage_seconds.get(k, 0.0) for k in STAGES),
+            run.ollama["prompt_eval_count"],
+            run.ollama["eval_count"],
+            run.ollama["eval_duration"] / 1e9,
+            run.ollama["prompt_eval_duration"] / 1e9,
+            run.ollama["load_duration"] / 1e9,
+            json.dumps({"meta": run.meta, "counters": run.counters}, default=str),
+        ],
+    )
+
+
+def format_prometheus(run):
+    s = run.summary()
+    labels = f'run_id="{run.run_id}",parser_mode="{run.meta.get("parser_mode", "")}"'
+    lines = [
+        "# HELP confmeta_run_info Last pipeline run.",
+        "# TYPE confmeta_run_info gauge",
+        f"confmeta_run_info{{{labels}}} 1",
+        "# HELP confmeta_rows_total Rows processed in the last run.",
+        "# TYPE confmeta_rows_total gauge",
+        f"confmeta_rows_total {s['rows']}",
+        "# HELP confmeta_rows_per_second Throughput of the last run.",
+        "# TYPE confmeta_rows_per_second gauge",
+        f"confmeta_rows_per_second {s['rows_per_s'] or 0}",
+        "# HELP confmeta_run_seconds Wall time of the last run.",
+        "# TYPE confmeta_run_seconds gauge",
+        f"confmeta_run_seconds {s['wall_s']}",
+        "# HELP confmeta_stage_seconds Wall time per stage in the last run.",
+        "# TYPE confmeta_stage_seconds gauge",
+    ]
+    for name, sec in run.stage_seconds.items():
+        lines.append(f'confmeta_stage_seconds{{stage="{name}"}} {sec:.6f}')
+    lines += [
+        "# HELP confmeta_counter Run counters (rows, llm_rows, llm_calls, ...).",
+        "# TYPE confmeta_counter gauge",
+    ]
+    for name, v in run.counters.items():
+        lines.append(f'confmeta_counter{{name="{name}"}} {v}')
+    lines += [
+        "# HELP confmeta_ollama Summed Ollama eval statistics (durations in ns).",
+        "# TYPE confmeta_ollama gauge",
+    ]
+    for name, v in run.ollama.items():
+        lines.append(f'confmeta_ollama{{field="{name}"}} {v}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(run, path=METRICS_PROM_PATH):
+    path = Path(path).expanduser()
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(format_prometheus(run), encoding="utf-8")
+    tmp.replace(path)
+
+
+def finish_run(con=None, prom_path=METRICS_PROM_PATH):
+    """Stamp the current run as finished and persist it."""
+    run = _current
+    run.finished_at = time.time()
+    if con is not None:
+        write_run_table(con, run)
+    if prom_path:
+        write_prometheus(run, prom_path)
+    return run
+
+
+def format_run_report(run=None):
+    run = run or _current
+    s = run.summary()
+    stages = " ".join(f"{k}={v:.2f}s" for k, v in run.stage_seconds.items())
+    return (
+        f"Run {run.run_id}: {s['rows']} rows in {s['wall_s']:.1f}s "
+        f"({s['rows_per_s']} rows/s) | {stages} | "
+        f"llm_calls={run.counters['llm_calls']} eval_tokens={run.ollama['eval_count']}"
+    )
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of the CPU-bound normalization helpers.
+
+Each case runs one function over a corpus built from the golden fixture
+(raw strings, parsed names, places and date ranges, plus abbreviated, lower-case
+and US-state variants) and reports
+
+  ns/op         best of MICROBENCH_REPEATS timed passes (gc disabled)
+  peak B/op     mean tracemalloc peak of a single call above its start
+  retained/op   memory blocks still allocated after a pass (caches, leaks)
+
+Results are compared with a stored baseline; a case fails when ns/op or
+peak B/op grew by more than MICROBENCH_THRESHOLD. Baselines are per
+machine: save one on the machine that runs the check.
+
+    python -m confmeta.microbench --save-baseline
+    python -m confmeta.microbench                    # exit 1 on regression
+    python -m confmeta.microbench --cases normalize_conf_name --threshold 0.5
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from .config import (
+    MICROBENCH_BASELINE_PATH,
+    MICROBENCH_THRESHOLD,
+    MICROBENCH_REPEATS,
+    MICROBENCH_MIN_TIME_S,
+)
+
+US_PLACE_VARIANTS = (
+    "Boston, MA",
+    "Seattle, Washington",
+    "Austin, Texas, United States",
+    "Portland, OR, US",
+    "Santa Fe, New Mexico",
+    "Honolulu, HI, United States of America",
+    "Chicago, IL, USA",
+)
+
+ABBREV_VARIANTS = (
+    "Proc. Int. Conf. on {}",
+    "Intl. Conf. {}",
+    "{} Symp.",
+    "Int. Worksh. on {}",
+)
+
+
+def build_corpus(golden=None):
+    """{input kind: [str, ...]} from the golden fixture plus fixed variants."""
+    from .stub_ollama import load_golden
+
+    golden = golden if golden is not None else load_golden()
+    raws = [r["conference"] for r in golden]
+    names = [r["expected"]["conf_name"] for r in golden if r["expected"].get("conf_name")]
+    places = [r["expected"]["conf_place"] for r in golden if r["expected"].get("conf_place")]
+    dates = [r["expected"]["conf_dates"] for r in golden if r["expected"].get("conf_dates")]
+
+    abbreviated = [v.format(n) for n in names for v in ABBREV_VARIANTS]
+    return {
+        "raw": raws + abbreviated,
+        "name": names + [n.lower() for n in names] + [n.upper() for n in names] + abbreviated,
+        "place": places + list(US_PLACE_VARIANTS) + [p.upper() for p in places],
+        "city": [p.split(",")[0].strip() for p in places] + [p.upper() for p in places],
+        "dates": dates + ["2019 / 2019", "2024-08 / 2024-08", "2004-07-19", "n/a"],
+    }
+
+
+def write_geonames_fixture(path, corpus, filler=20000):
+    """
+    GeoNames-format file (tab separated, asciiname in column 1, ISO-2 code in
+    column 8) with the corpus cities plus `filler` synthetic rows.
+    """
+    seen = set()
+    with open(path, "w", encoding="utf-8") as f:
+        for i, place in enumerate(corpus["place"]):
+            parts = [p.strip() for p in place.split(",")]
+            city = parts[0]
+            if city.lower() in seen:
+                continue
+            seen.add(city.lower())
+            country = parts[-1] if len(parts[-1]) == 2 else "XX"
+            f.write(f"{i}\t{city}\t{city}\t\t0\t0\tP\tPPL\t{country}\n")
+        for i in range(filler):
+            f.write(f"{100000 + i}\tTown {i}\tTown {i}\t\t0\t0\tP\tPPL\tC{i % 7}\n")
+    return path
+
+
+def make_cases(corpus, geonames_path):
+    """[(name, fn, inputs)]; fn takes one input."""
+    from . import geonames_cities
+    from .llm_parse import maybe_add_country_from_city
+    from .regex_utils import (
+        normalize_conf_name,
+        expand_abbreviations,
+        extract_conf_order,
+        normalize_us_place,
+        derive_dates_from_conf_dates,
+    )
+
+    # share the benchmark map through the usual lazy singleton
+    geonames_cities._city_country = geonames_cities.load_city_country(geonames_path)
+    return [
+        ("normalize_conf_name", normalize_conf_name, corpus["name"]),
+        ("expand_abbreviations", expand_abbreviations, corpus["raw"]),
+        ("extract_conf_order", extract_conf_order, corpus["raw"] + corpus["name"]),
+        ("normalize_us_place", normalize_us_place, corpus["place"]),
+        ("derive_dates_from_conf_dates", derive_dates_from_conf_dates, corpus["dates"]),
+        ("maybe_add_country_from_city", maybe_add_country_from_city, corpus["city"] + corpus["place"]),
+        ("load_city_country", geonames_cities.load_city_country, [geonames_path]),
+    ]
+
+
+def _time_pass(fn, inputs, loops):
+    t0 = time.perf_counter_ns()
+    for _ in range(loops):
+        for x in inputs:
+            fn(x)
+    return time.perf_counter_ns() - t0
+
+
+def time_case(fn, inputs, repeats=MICROBENCH_REPEATS, min_time_s=MICROBENCH_MIN_TIME_S):
+    """Best ns/op over `repeats` passes of `loops` rounds each (calibrated to min_time_s)."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _time_pass(fn, inputs, 1)  # warm caches (re, dicts)
+        loops = 1
+        while _time_pass(fn, inputs, loops) < min_time_s * 1e9 and loops < 1 << 20:
+            loops *= 2
+        best = min(_time_pass(fn, inputs, loops) for _ in range(repeats))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best / (loops * len(inputs)), loops
+
+
+def measure_memory(fn, inputs):
+    """(mean per-call tracemalloc peak in bytes, retained blocks per call)."""
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        total_peak = 0
+        for x in inputs:
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            fn(x)
+            _, peak = tracemalloc.get_traced_memory()
+            total_peak += peak - start
+    finally:
+        tracemalloc.stop()
+    gc.collect()
+    retained = sys.getallocatedblocks() - blocks_before
+    return total_peak / len(inputs), retained / len(inputs)
+
+
+def run_cases(cases, repeats=MICROBENCH_REPEATS, min_time_s=MICROBENCH_MIN_TIME_S, log=print):
+    results = {}
+    for name, fn, inputs in cases:
+        ns, loops = time_case(fn, inputs, repeats, min_time_s)
+        peak, retained = measure_memory(fn, inputs)
+        results[name] = {
+            "ns_per_op": round(ns, 1),
+            "peak_bytes_per_op": round(peak, 1),
+            "retained_blocks_per_op": round(retained, 2),
+            "inputs": len(inputs),
+            "loops": loops,
+        }
+        log(f"  {name:30s} {ns:12.0f} ns/op {peak:10.0f} B/op peak {retained:8.2f} blocks retained")
+    return results
+
+
+def compare(results, baseline, threshold=MICROBENCH_THRESHOLD):
+    """-> list of (case, metric, baseline value, current value, ratio) past the threshold."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("ns_per_op", "peak_bytes_per_op"):
+            b, c = base.get(metric), cur.get(metric)
+            if not b or c is None:
+                continue
+            ratio = c / b
+            if ratio > 1 + threshold:
+                regressions.append((name, metric, b, c, ratio))
+    return regressions
+
+
+def load_baseline(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """Store results as the baseline; cases not in results keep their stored numbers."""
+    from .benchmark import _git_commit
+
+    old = load_baseline(path) or {}
+    data = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": {**old.get("cases", {}), **results},
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="confmeta normalization microbenchmarks")
+    ap.add_argument("--baseline", default=str(MICROBENCH_BASELINE_PATH))
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--threshold", type=float, default=MICROBENCH_THRESHOLD,
+                    help="allowed relative slowdown before a case fails (0.25 = 25%%)")
+    ap.add_argument("--repeats", type=int, default=MICROBENCH_REPEATS)
+    ap.add_argument("--min-time", type=float, default=MICROBENCH_MIN_TIME_S,
+                    help="minimum seconds per timed pass")
+    ap.add_argument("--cases", nargs="+", help="run only these cases")
+    ap.add_argument("--out", help="also write this run's results to a JSON file")
+    args = ap.parse_args(argv)
+
+    corpus = build_corpus()
+    fd, geonames_path = tempfile.mkstemp(prefix="confmeta_geonames_", suffix=".txt")
+    os.close(fd)
+    try:
+        write_geonames_fixture(geonames_path, corpus)
+        cases = make_cases(corpus, geonames_path)
+        if args.cases:
+            unknown = set(args.cases) - {name for name, _, _ in cases}
+            if unknown:
+                ap.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+            cases = [c for c in cases if c[0] in args.cases]
+        print(f"Microbenchmarks ({args.repeats} repeats, python {platform.python_version()}):")
+        results = run_cases(cases, args.repeats, args.min_time)
+    finally:
+        os.unlink(geonames_path)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return
+    regressions = compare(results, baseline.get("cases", {}), args.threshold)
+    print(f"Compared with baseline of {baseline.get('created_at')} (commit {baseline.get('commit')}):")
+    for name, metric, b, c, ratio in regressions:
+        print(f"  REGRESSION {name}: {metric} {b:.0f} -> {c:.0f} ({ratio - 1:+.0%})")
+    if regressions:
+        print(f"{len(regressions)} regression(s) past {args.threshold:.0%}")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Near-duplicate clustering of raw conference strings with MinHash/LSH.
+
+Strings that differ only in punctuation, casing, separators or the order of
+place and date get the same token set. Candidates are found with banded LSH
+over MinHash signatures, then accepted only if their Jaccard similarity is
+high enough, their numbers (days, years) and months agree exactly and their
+token sets differ only by STOPWORDS, so "ICC 2011, Tokyo" never reuses the
+parse of "ICC 2011, Kyoto". Every cluster is parsed once, through its
+representative (the string covering the most records).
+"""
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from .config import NEAR_DUP_NUM_PERM, NEAR_DUP_BANDS, NEAR_DUP_THRESHOLD
+from .regex_utils import HAS_MONTH, expand_abbreviations
+
+_MERSENNE = (1 << 61) - 1
+_rng = np.random.RandomState(20240131)
+_A = _rng.randint(1, 1 << 31, size=NEAR_DUP_NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NEAR_DUP_NUM_PERM).astype(np.uint64)
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+NUMBER_RE = re.compile(r"\d+")
+
+# the only words (after abbreviation expansion) a member may add or drop
+STOPWORDS = frozenset({
+    "a", "an", "and", "at", "for", "in", "of", "on", "the", "to",
+    "de", "des", "du", "et", "la", "le", "und", "der", "die", "för", "och", "i", "på",
+})
+
+
+def shingles(text: str):
+    """Order-insensitive token set of the abbreviation-expanded, lowercased string."""
+    t = expand_abbreviations(str(text or "")).lower()
+    return frozenset(TOKEN_RE.findall(t))
+
+
+def date_key(text: str):
+    """Numbers (without leading zeros) and month names; must match exactly to reuse a parse."""
+    t = str(text or "")
+    numbers = Counter(str(int(n)) for n in NUMBER_RE.findall(t))
+    months = frozenset(m.group(0)[:3].lower() for m in HAS_MONTH.finditer(t))
+    return (frozenset(numbers.items()), months)
+
+
+def minhash(tokens):
+    if not tokens:
+        return None
+    h = np.fromiter(
+        (zlib.crc32(tok.encode("utf-8")) for tok in tokens),
+        dtype=np.uint64,
+        count=len(tokens),
+    )
+    # (a * h + b) mod p, min over tokens, per permutation
+    sig = (np.outer(_A, h) + _B[:, None]) % _MERSENNE
+    return sig.min(axis=1)
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        p = self.parent.setdefault(x, x)
+        if p != x:
+            p = self.parent[x] = self.find(p)
+        return p
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def cluster_near_duplicates(strings, counts=None, threshold=NEAR_DUP_THRESHOLD, bands=NEAR_DUP_BANDS):
+    """
+    strings: iterable of distinct raw strings; counts: {string: n_records}.
+    Returns {member: representative} for members that can reuse the
+    representative's parse (representatives themselves are not in the map).
+    """
+    strings = list(dict.fromkeys(s for s in strings if s))
+    counts = counts or {}
+    rows_per_band = NEAR_DUP_NUM_PERM // bands
+
+    toks = {s: shingles(s) for s in strings}
+    buckets = {}
+    for s in strings:
+        sig = minhash(toks[s])
+        if sig is None:
+            continue
+        for b in range(bands):
+            band = sig[b * rows_per_band:(b + 1) * rows_per_band].tobytes()
+            buckets.setdefault((b, band), []).append(s)
+
+    uf = _UnionFind()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # all pairs in small buckets, star around the first member in huge ones
+        heads = members if len(members) <= 50 else members[:1]
+        for i, a in enumerate(heads):
+            for b in members[i + 1:]:
+                if jaccard(toks[a], toks[b]) >= threshold:
+                    uf.union(a, b)
+
+    clusters = {}
+    for s in strings:
+        clusters.setdefault(uf.find(s), []).append(s)
+
+    alias = {}
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        rep = max(members, key=lambda s: (counts.get(s, 1), -len(s), s))
+        rep_dates = date_key(rep)
+        for m in members:
+            if m == rep:
+                continue
+            # verification against the representative, not just the chain
+            if (
+                date_key(m) == rep_dates
+                and (toks[m] ^ toks[rep]) <= STOPWORDS
+                and jaccard(toks[m], toks[rep]) >= threshold
+            ):
+                alias[m] = rep
+    return alias
+
+
+def with_near_dup(parse_fn, alias):
+    """Wrap a parse function so cluster members reuse their representative's parse."""
+    if not alias:
+        return parse_fn
+
+    def parse(conf_string, show_stream=True):
+        rep = alias.get(conf_string)
+        if rep is None:
+            return parse_fn(conf_string, show_stream=show_stream)
+        parsed = dict(parse_fn(rep, show_stream=show_stream))
+        extra = "near-duplicate parse reused"
+        parsed["note"] = f"{parsed['note']}; {extra}" if parsed.get("note") else extra
+        return parsed
+
+    return parse
@@ -0,0 +1,55 @@
+PARSER_MODES = ("full", "fast", "cascade", "routed")
+
+
+def get_parser(mode: str):
+    """
+    Return the parse function for a parser mode:
+      full    -> llm_parse.parse_with_llm (long rulebook prompt)
+      fast    -> fast_llm_parse.parse_with_llm (INSTRUCTION_FAST)
+      cascade -> cascade.parse_with_cascade (fast, escalate on failed checks)
+      routed  -> routing.parse_with_routing (full prompt, model by difficulty)
+    """
+    if mode == "full":
+        from .llm_parse import parse_with_llm
+        return parse_with_llm
+    if mode == "fast":
+        from .fast_llm_parse import parse_with_llm
+        return parse_with_llm
+    if mode == "cascade":
+        from .cascade import parse_with_cascade
+        return parse_with_cascade
+    if mode == "routed":
+        from .routing import parse_with_routing
+        return parse_with_routing
+    raise ValueError(f"unknown parser mode {mode!r}; expected one of {PARSER_MODES}")
+
+
+def drain_raw_outputs():
+    """
+    Collect and clear the raw LLM answers recorded by llm_parse and
+    fast_llm_parse (only modules that were imported), as a list of dicts
+    with conference, parser, model, prompt_version, raw_text.
+    """
+    import sys
+
+    records = []
+    for name in ("llm_parse", "fast_llm_parse"):
+        mod = sys.modules.get(f"{__package__}.{name}")
+        if mod is None:
+            continue
+        outputs = mod._raw_outputs
+        mod._raw_outputs = {}
+        for conference, rec in outputs.items():
+            records.append({"conference": conference, **rec})
+    return records
+
+
+def get_normalizer(parser: str):
+    """normalize_llm_text of the parser module that produced a stored answer."""
+    if parser == "full":
+        from .llm_parse import normalize_llm_text
+        return normalize_llm_text
+    if parser == "fast":
+        from .fast_llm_parse import normalize_llm_text
+        return normalize_llm_text
+    raise ValueError(f"unknown stored parser {parser!r}")
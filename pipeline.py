@@ -1,7 +1,22 @@
 #!/usr/bin/env python3
-import pandas as pd
-from .config import MAX_ROWS, SHOW_EVERY
-from .db_io import connect, fetch_conferences, write_parsed_table
+import argparse
+from .config import (
+    MAX_ROWS,
+    SHOW_EVERY,
+    PARSER_MODE,
+    MODEL,
+    QUIET,
+    ROW_LOG_PATH,
+    STREAM_SAMPLE_EVERY,
+    NEAR_DUP,
+    TEMPLATES,
+    LLM_TRANSPORT,
+    STAGED,
+    PROFILE_DIR,
+    LLM_OPTIONS,
+    TUNE_PROFILE,
+    TUNE_PROFILE_PATH,
+)
 from .regex_utils import (
     looks_like_conference_string,
     looks_like_has_date,
@@ -9,8 +24,11 @@ from .regex_utils import (
     extract_conf_order,
     normalize_conf_name,
 )
-from .llm_parse import parse_with_llm
-from .llm_series import find_series_candidates, choose_series_with_llm
+from .parsers import get_parser, drain_raw_outputs
+from .metrics import stage, start_run, finish_run, format_run_report
+from .progress import ProgressLine, RowLog
+from .shards import connect_shard_store, parse_shard, shard_table, shard_parquet
+from .breaker import BREAKER, is_llm_unavailable, retry_deferred
 
 
 def _to_iso(y, m, d):
@@ -19,111 +37,497 @@ def _to_iso(y, m, d):
     return f"{y:04d}-{m:02d}-{d:02d}"
 
 
-def main():
-    con = connect()
-    df = fetch_conferences(con, MAX_ROWS)
+def needs_llm(raw) -> bool:
+    return looks_like_conference_string(raw) and looks_like_has_date(raw)
+
+
+def heuristic_parse(raw, note="no date detected or skipped by heuristic"):
+    return {
+        "conf_name": normalize_conf_name(raw),
+        "conf_place": "",
+        "conf_dates": "",
+        "note": note,
+    }
+
+
+def build_row(pid, name_seq, raw, parsed):
+    """
+    Turn a parsed dict (conf_name, conf_place, conf_dates, note) into an
+    output row for names_conference_parsed.
+    """
+    # derive granular dates from conf_dates string
+    b_day, b_month, b_year, e_day, e_month, e_year = derive_dates_from_conf_dates(
+        parsed["conf_dates"]
+    )
+
+    # conf_series_* are filled by the series_link stage (join on conf_name)
+    return {
+        "pid": pid,
+        "name_seq": name_seq,
+        "raw_conference": raw,
+        "conf_name": parsed["conf_name"],
+        "conf_place": parsed["conf_place"],
+        "conf_dates": parsed["conf_dates"],
+        "conf_start_date": _to_iso(b_year, b_month, b_day),
+        "conf_end_date": _to_iso(e_year, e_month, e_day),
+        "conf_year_start": b_year,
+        "conf_year_end": e_year,
+        "conf_order": extract_conf_order(parsed["conf_name"]),
+        "conf_series_slug": None,
+        "conf_series_stream_iri": None,
+        "conf_series_name": None,
+        "conf_series_match_reason": "series link pending",
+        "note": parsed["note"],
+    }
+
+
+def print_parsed(out_row):
+    print(
+        "PARSED:",
+        f"name='{out_row['conf_name']}' | "
+        f"place='{out_row['conf_place']}' | "
+        f"dates='{out_row['conf_dates']}' | "
+        f"start='{out_row['conf_start_date']}' | "
+        f"end='{out_row['conf_end_date']}' | "
+        f"order={out_row['conf_order']}",
+    )
+
+    if out_row.get("note"):
+        print("NOTE:", out_row["note"])
+
+    print("DBLP: linked in the series_link stage")
+    print()
+    print()
+    print()
+
+
+DEFERRED_NOTE = "deferred: LLM unavailable"
+
+
+def near_dup_parser(parse_fn, raws, run, counts=None, log=print):
+    """Cluster the LLM-bound strings and reuse one parse per cluster."""
+    from .near_dup import cluster_near_duplicates, with_near_dup
+
+    if counts is None:
+        import pandas as pd
+        counts = pd.Series(list(raws)).value_counts().to_dict()
+    with stage("heuristics"):
+        candidates = [r for r in counts if needs_llm(r)]
+        alias = cluster_near_duplicates(candidates, counts)
+    run.incr("near_dup_aliases", len(alias))
+    run.incr("near_dup_candidates", len(candidates))
+    if alias:
+        log(
+            f"Near-duplicates: {len(alias)} of {len(candidates)} distinct LLM strings "
+            f"reuse a representative's parse"
+        )
+    return with_near_dup(parse_fn, alias)
+
+
+def template_parser(parse_fn, log=print):
+    """Parse strings matching a trusted learned template without the LLM."""
+    from .templates import TemplateStore, with_templates
+    from .parsers import get_normalizer
+
+    store = TemplateStore.load()
+    if not len(store):
+        return parse_fn, None
+    from .geonames_cities import get_city_country
+
+    trusted = sum(t.trusted() for t in store.templates())
+    log(f"Templates: {trusted} trusted of {len(store)} learned")
+    return with_templates(parse_fn, store, get_normalizer("full"), get_city_country()), store
+
+
+def template_summary(store, run):
+    if store is None:
+        return None
+    from .templates import format_report
+
+    run.counters["template_hits"] = store.hits
+    return format_report(store, top=10)
+
+
+def parse_raw(raw, parse_fn, run, show_stream=False, quiet=False, use_llm=None):
+    """
+    Heuristics, then the LLM parser for strings that need it.
+    Returns (parsed, used_llm, deferred); deferred rows carry a heuristic
+    parse and should be retried once the LLM endpoint is back.
+    use_llm: needs_llm(raw) when already computed by a prefilter stage.
+    """
+    if use_llm is None:
+        with stage("heuristics"):
+            use_llm = needs_llm(raw)
+    if not use_llm:
+        return heuristic_parse(raw), False, False
+
+    run.incr("llm_rows")
+    if show_stream:
+        print("LLM output (streaming):")
+    try:
+        return parse_fn(raw, show_stream=show_stream), True, False
+    except Exception as e:
+        if is_llm_unavailable(e):
+            # Endpoint down: keep a heuristic row now, retry at the end
+            run.incr("llm_deferred")
+            return heuristic_parse(raw, note=f"{DEFERRED_NOTE}: {e}"), True, True
+        # Log the error and fall back so the pipeline can continue
+        if not quiet:
+            print(f"LLM error for {raw!r}: {e}")
+        run.incr("llm_errors")
+        return heuristic_parse(raw, note=f"LLM error: {e}"), True, False
+
+
+def retry_deferred_rows(rows, deferred, parse_fn, run):
+    """Re-parse rows deferred while the LLM circuit was open, in place."""
+    raws = [rows[idx]["raw_conference"] for idx in deferred]
+    print(
+        f"Retrying {len(deferred)} deferred rows ({len(set(raws))} distinct strings); "
+        f"circuit tripped {BREAKER.trips} times"
+    )
+    parsed_by_raw, errors, pending = retry_deferred(raws, parse_fn)
+    for idx in deferred:
+        old = rows[idx]
+        raw = old["raw_conference"]
+        if raw in parsed_by_raw:
+            parsed = parsed_by_raw[raw]
+            run.incr("llm_retry_recovered")
+        elif raw in errors:
+            parsed = heuristic_parse(raw, note=f"LLM error: {errors[raw]}")
+        else:
+            continue  # keep the heuristic row and its "deferred" note
+        with stage("normalize"):
+            rows[idx] = build_row(old["pid"], old["name_seq"], raw, parsed)
+    print(
+        f"Retry pass: {run.counters.get('llm_retry_recovered', 0)} recovered, "
+        f"{len(errors)} errors, {len(pending)} strings still unavailable"
+    )
+
+
+def finish_outputs(args, con, run, target, templates, linker=None, relink=(), store=None):
+    """
+    Shared end of a run: series links, raw LLM answers, run metrics and
+    reports. relink: rows whose conf_name changed after they were first
+    submitted to the linker (deferred rows re-parsed at the end). store:
+    per-shard DuckDB file for the side tables when con is read-only.
+    """
+    quiet = args.quiet
+    out = store or con
+    if linker:
+        from .series_link import apply_links, format_counts
+        for row in relink:
+            linker.submit(row["conf_name"], row["conf_dates"])
+        print(f"Series linking: {format_counts(linker.close())}")
+        if isinstance(target, str):
+            apply_links(con, target)
+        else:
+            print("Series columns not joined into Parquet shards; run series_link after the merge")
+
+    from .db_io import write_raw_outputs
+
+    n_raw = write_raw_outputs(out, drain_raw_outputs())
+    if n_raw:
+        print(f"Stored {n_raw} raw LLM answers in 'llm_raw_outputs'")
+    routing_report = None
+    if PARSER_MODE == "routed":
+        from .routing import ROUTING_TABLE, drain_decisions, format_routing_report, write_decisions
+        decisions = drain_decisions()
+        if write_decisions(out, decisions, run.run_id):
+            print(f"Stored {len(decisions)} routing decisions in '{ROUTING_TABLE}'")
+        routing_report = format_routing_report(decisions)
+
+    template_report = template_summary(templates, run)
+    finish_run(out)
+    con.close()
+    if store is not None:
+        store.close()
+    print(format_run_report(run))
+    if template_report:
+        print(template_report)
+    if PARSER_MODE == "cascade":
+        from .cascade import format_cascade_report
+        print(format_cascade_report())
+    if routing_report:
+        print(routing_report)
+    if PARSER_MODE in ("full", "cascade", "routed"):
+        from .prompt_rules import format_prompt_report
+        print(format_prompt_report())
+    if quiet:
+        print(f"Per-row details in {args.row_log}")
+    if args.budget_seconds is not None or args.budget_tokens is not None:
+        print(f"\nDone. Upserted parsed data into '{target}'.")
+    elif args.shard:
+        print(f"\nDone. Wrote shard to '{target}'. Merge with: python -m confmeta.shards merge")
+    else:
+        print("\nDone. Wrote parsed data to 'names_conference_parsed' and CSV.")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Parse DiVA conference strings")
+    ap.add_argument(
+        "--quiet",
+        action="store_true",
+        default=QUIET,
+        help=f"progress line only; per-row details go to {ROW_LOG_PATH}",
+    )
+    ap.add_argument("--row-log", default=ROW_LOG_PATH)
+    ap.add_argument(
+        "--stream-every",
+        type=int,
+        default=STREAM_SAMPLE_EVERY,
+        help="in quiet mode, stream LLM tokens for every N-th row (0 = never)",
+    )
+    ap.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help=f"rows to process (default: sample of {MAX_ROWS}; whole shard with --shard)",
+    )
+    ap.add_argument("--shard", type=parse_shard, help="process shard i of N, e.g. 0/4")
+    ap.add_argument(
+        "--shard-out",
+        choices=("table", "parquet"),
+        default="table",
+        help="write the shard to a per-shard table or Parquet file",
+    )
+    ap.add_argument("--out-dir", default=".", help="directory for shard Parquet files")
+    ap.add_argument(
+        "--budget-seconds",
+        type=float,
+        help="budgeted run: parse distinct strings by record coverage until this much wall time is spent",
+    )
+    ap.add_argument(
+        "--budget-tokens",
+        type=int,
+        help="budgeted run: stop after this many Ollama prompt + eval tokens",
+    )
+    ap.add_argument(
+        "--staged",
+        action="store_true",
+        default=STAGED,
+        help="run fetch/prefilter/parse/normalize/write as threaded stages with bounded queues",
+    )
+    ap.add_argument(
+        "--profile",
+        choices=("cprofile", "sample"),
+        help="profile the run: deterministic cProfile or a low-overhead stack sampler",
+    )
+    ap.add_argument("--profile-dir", default=PROFILE_DIR, help="directory for profile outputs")
+    ap.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="estimate LLM calls, tokens and wall time of the pass without calling the LLM",
+    )
+    ap.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="skip the LLM health check and model warm-up before the run",
+    )
+    ap.add_argument(
+        "--link-series",
+        action="store_true",
+        help="link distinct conf_name values to dblp series in a background thread",
+    )
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.profile:
+        return run_pipeline(args)
+
+    from .metrics import current
+    from .profiling import Profiler
+
+    profiler = Profiler(args.profile, "pipeline", out_dir=args.profile_dir).start()
+    try:
+        run_pipeline(args)
+    finally:
+        run = current()
+        profiler.stop(run.run_id, meta={"run": run.meta, "summary": run.summary()})
+
+
+def run_pipeline(args):
+    # heavy dependencies load here, not on import (--help, build_row users)
+    import pandas as pd
+    from .db_io import (
+        connect,
+        fetch_conferences,
+        write_parsed_table,
+        write_parquet,
+    )
+    from .budget import Budget, run_budgeted
+
+    if args.dry_run:
+        from .estimate import estimate, format_estimate
+        # read-only: sizing shards while other processes hold the DB
+        con = connect(read_only=True)
+        try:
+            print(format_estimate(estimate(con, args.shard)))
+        finally:
+            con.close()
+        return
+
+    quiet = args.quiet
+
+    parse_with_llm = get_parser(PARSER_MODE)
+    if PARSER_MODE == "cascade":
+        from .cascade import reset_cascade_stats
+        reset_cascade_stats()
+    if PARSER_MODE == "routed":
+        from .routing import reset_routing
+        reset_routing()
+    from .prompt_rules import reset_prompt_stats
+    reset_prompt_stats()
+    run = start_run(
+        parser_mode=PARSER_MODE,
+        model=MODEL,
+        shard=f"{args.shard[0]}/{args.shard[1]}" if args.shard else None,
+    )
+    if TUNE_PROFILE:
+        run.meta["tuning"] = {"profile": TUNE_PROFILE_PATH, "created_at": TUNE_PROFILE.get("created_at"),
+                              "parallel": TUNE_PROFILE.get("parallel"), "options": dict(LLM_OPTIONS)}
+        print(f"Tuning profile {TUNE_PROFILE_PATH}: parallel {TUNE_PROFILE.get('parallel')}, options {LLM_OPTIONS}")
+
+    if LLM_TRANSPORT != "replay" and not args.no_preflight:
+        from .llm_client import preflight
+        models = None
+        if PARSER_MODE == "routed":
+            from .routing import pool_models
+            models = pool_models()
+        try:
+            run.meta["preflight"] = preflight(models=models)
+        except RuntimeError as e:
+            raise SystemExit(str(e))
+
+    templates = None
+    if TEMPLATES:
+        parse_with_llm, templates = template_parser(parse_with_llm)
+
+    budgeted = args.budget_seconds is not None or args.budget_tokens is not None
+    store = None
+    if args.shard and args.shard_out == "parquet" and not budgeted:
+        # other shard processes may have the DB open; side tables go to a per-shard file
+        con = connect(read_only=True)
+        store = connect_shard_store(args.out_dir, *args.shard)
+    else:
+        con = connect()
+    if budgeted:
+        budget = Budget(seconds=args.budget_seconds, tokens=args.budget_tokens)
+        if NEAR_DUP:
+            from .db_io import fetch_distinct_conferences
+            distinct = fetch_distinct_conferences(con)
+            parse_with_llm = near_dup_parser(
+                parse_with_llm,
+                distinct["conference"],
+                run,
+                counts=dict(zip(distinct["conference"], distinct["n_records"])),
+            )
+        run.meta["budget"] = budget.describe()
+
+        def parse_string(raw):
+            parsed, _, deferred = parse_raw(raw, parse_with_llm, run, quiet=True)
+            return parsed, deferred
+
+        run_budgeted(con, parse_string, budget, run)
+        if args.link_series:
+            from .series_link import link_pending, apply_links, format_counts
+            print(f"Series linking: {format_counts(link_pending(con))}")
+            apply_links(con)
+        finish_outputs(args, con, run, "names_conference_parsed", templates)
+        return
+
+    linker = None
+    if args.link_series:
+        from .series_link import SeriesLinker
+        linker = SeriesLinker(con, store=store)
+
+    if args.staged:
+        from .stages import run_staged_pipeline
+        target, relink = run_staged_pipeline(args, con, parse_with_llm, run, linker=linker, store=store)
+        finish_outputs(args, con, run, target, templates, linker=linker, relink=relink, store=store)
+        return
+
+    if args.shard:
+        df = fetch_conferences(con, args.limit, shard=args.shard)
+    else:
+        df = fetch_conferences(con, args.limit or MAX_ROWS)
     total = len(df)
-    print(f"Fetched {total} conference rows for parsing")
+    shard_txt = f", shard {args.shard[0]}/{args.shard[1]}" if args.shard else ""
+    print(f"Fetched {total} conference rows for parsing (parser: {PARSER_MODE}{shard_txt})")
+
+    if NEAR_DUP:
+        parse_with_llm = near_dup_parser(parse_with_llm, df["conference"], run)
+
+    progress = ProgressLine(total) if quiet else None
+    row_log = RowLog(args.row_log) if quiet else None
 
     rows = []
+    deferred = []  # indexes into rows waiting for the retry pass
     for i, (_, row) in enumerate(df.iterrows(), start=1):
         raw = row["conference"]
         pid = int(row["pid"])
         name_seq = int(row["name_seq"])
 
-        show_stream = (i % SHOW_EVERY == 0)
-
-        print(f"\n=== {i}/{total} PID {pid} name_seq {name_seq} ===")
-        print("RAW:", raw)
-
-        if looks_like_conference_string(raw) and looks_like_has_date(raw):
-            if show_stream:
-                print("LLM output (streaming):")
-            try:
-                parsed = parse_with_llm(raw, show_stream=show_stream)
-            except Exception as e:
-                # Log the error and fall back so the pipeline can continue
-                print(f"LLM error for PID {pid} name_seq {name_seq}: {e}")
-                parsed = {
-                    "conf_name": normalize_conf_name(raw),
-                    "conf_place": "",
-                    "conf_dates": "",
-                    "note": f"LLM error: {e}",
-                }
+        if quiet:
+            show_stream = args.stream_every > 0 and i % args.stream_every == 0
         else:
-            parsed = {
-                "conf_name": normalize_conf_name(raw),
-                "conf_place": "",
-                "conf_dates": "",
-                "note": "no date detected or skipped by heuristic",
-            }
-
-        # derive granular dates from conf_dates string
-        b_day, b_month, b_year, e_day, e_month, e_year = derive_dates_from_conf_dates(
-            parsed["conf_dates"]
-        )
-        conf_start_date = _to_iso(b_year, b_month, b_day)
-        conf_end_date = _to_iso(e_year, e_month, e_day)
-        conf_year_start = b_year
-        conf_year_end = e_year
-
-        conf_order = extract_conf_order(parsed["conf_name"])
-
-        # dblp series matching temporarily disabled
-        series_slug = None
-        stream_iri = None
-        series_name = None
-        series_reason = "dblp lookup disabled"
-
-        print(
-            "PARSED:",
-            f"name='{parsed['conf_name']}' | "
-            f"place='{parsed['conf_place']}' | "
-            f"dates='{parsed['conf_dates']}' | "
-            f"start='{conf_start_date}' | "
-            f"end='{conf_end_date}' | "
-            f"order={conf_order}",
-        )
+            show_stream = (i % SHOW_EVERY == 0)
+            print(f"\n=== {i}/{total} PID {pid} name_seq {name_seq} ===")
+            print("RAW:", raw)
 
-        if parsed.get("note"):
-            print("NOTE:", parsed["note"])
-
-        print("DBLP: lookup disabled")
-        print()
-        print()
-        print()
-
-        rows.append(
-            {
-                "pid": pid,
-                "name_seq": name_seq,
-                "raw_conference": raw,
-                "conf_name": parsed["conf_name"],
-                "conf_place": parsed["conf_place"],
-                "conf_dates": parsed["conf_dates"],
-                "conf_start_date": conf_start_date,
-                "conf_end_date": conf_end_date,
-                "conf_year_start": conf_year_start,
-                "conf_year_end": conf_year_end,
-                "conf_order": conf_order,
-                "conf_series_slug": series_slug,
-                "conf_series_stream_iri": stream_iri,
-                "conf_series_name": series_name,
-                "conf_series_match_reason": series_reason,
-                "note": parsed["note"],
-            }
+        if show_stream and quiet and needs_llm(raw):
+            print(f"\n[{i}/{total}] RAW: {raw}")
+        parsed, use_llm, was_deferred = parse_raw(
+            raw, parse_with_llm, run, show_stream=show_stream, quiet=quiet
         )
+        if was_deferred:
+            deferred.append(len(rows))
 
-    out = pd.DataFrame(rows)
-    print("\nSample of parsed output:")
-    print(out.head(20).to_string(index=False))
+        with stage("normalize"):
+            out_row = build_row(pid, name_seq, raw, parsed)
+        run.incr("rows")
+        if linker and not was_deferred:
+            linker.submit(out_row["conf_name"], out_row["conf_dates"])
+
+        if quiet:
+            row_log.write({"i": i, "llm": use_llm, **out_row})
+            progress.update(extra=f"llm={run.counters['llm_rows']}")
+        else:
+            print_parsed(out_row)
 
-    write_parsed_table(con, out, "names_conference_parsed")
-    out.to_csv("names_conference_parsed_sample.csv", index=False)
+        rows.append(out_row)
 
-    con.close()
-    print("\nDone. Wrote parsed data to 'names_conference_parsed' and CSV.")
+    if quiet:
+        progress.close()
+        row_log.close()
+
+    if deferred:
+        retry_deferred_rows(rows, deferred, parse_with_llm, run)
+
+    out = pd.DataFrame(rows)
+    if not quiet:
+        print("\nSample of parsed output:")
+        print(out.head(20).to_string(index=False))
+
+    if args.shard and args.shard_out == "parquet":
+        target = shard_parquet(args.out_dir, *args.shard)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write_parquet(con, out, target)
+    elif args.shard:
+        target = shard_table(*args.shard)
+        write_parsed_table(con, out, target)
+    else:
+        target = "names_conference_parsed"
+        write_parsed_table(con, out, target)
+        out.to_csv("names_conference_parsed_sample.csv", index=False)
 
+    finish_outputs(
+        args, con, run, target, templates,
+        linker=linker,
+        relink=[rows[idx] for idx in deferred],
+        store=store,
+    )
 
 if __name__ == "__main__":
     main()
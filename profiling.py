@@ -0,0 +1,248 @@
+"""
+Profiling hooks for the pipeline and the dblp extractor.
+
+  cprofile  deterministic (cProfile), main thread only: <prefix>.pstats and
+            collapsed stacks rebuilt from the caller/callee edges (approximate)
+  sample    low-overhead sampler over all threads (use it with --staged):
+            collapsed stacks weighted by sample count
+
+Collapsed files ("frame;frame;frame value" per line) load directly in
+flamegraph.pl, speedscope or inferno. With PROFILE_TRACEMALLOC the peak
+traced memory of every stage goes to <prefix>.memory.json. All outputs share
+the prefix <tool>-<run_id>-<mode> and a <prefix>.meta.json with the run
+metadata, so profiles of different runs and commits can be compared.
+
+    python -m confmeta.pipeline --quiet --profile sample
+    python dblp/extract_conference_series.py --profile cprofile
+"""
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_S, PROFILE_TRACEMALLOC
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+def _frame_label(name, filename, lineno):
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class StackSampler:
+    """Samples the stacks of all other threads every `interval` seconds."""
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(_frame_label(code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return self.counts.items()
+
+
+def collapsed_from_pstats(stats, min_seconds=1e-5, max_depth=64):
+    """
+    Collapsed stacks (value in microseconds of self time) from cProfile
+    statistics. cProfile keeps only caller/callee edges, so time is split
+    across paths in proportion to the edge times.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    def label(func):
+        filename, lineno, name = func
+        return _frame_label(name, filename, lineno)
+
+    out = Counter()
+
+    def walk(func, weight, path, seen):
+        _, _, tt, ct, _ = stats[func]
+        if ct <= 0:
+            return
+        stack = path + [label(func)]
+        self_s = weight * tt / ct
+        if self_s >= min_seconds:
+            out[";".join(stack)] += int(self_s * 1e6)
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            if callee in seen:
+                continue
+            w = weight * edge_ct / ct
+            if w >= min_seconds:
+                walk(callee, w, stack, seen | {callee})
+
+    roots = [f for f, v in stats.items() if not v[4]]
+    for root in roots:
+        walk(root, stats[root][3], [], {root})
+    return out.items()
+
+
+class MemoryTracker:
+    """
+    Peak traced memory per stage (tracemalloc). Nested and concurrent stages
+    share the global peak counter: it is folded into every open stage
+    before each reset.
+    """
+
+    def __init__(self):
+        self.open = []  # [name, thread id, current at entry, peak seen]
+        self.peaks = {}  # name -> (peak above entry, absolute peak)
+        self._lock = threading.Lock()
+
+    def _fold(self):
+        _, peak = tracemalloc.get_traced_memory()
+        for entry in self.open:
+            entry[3] = max(entry[3], peak)
+        tracemalloc.reset_peak()
+
+    def enter(self, name):
+        with self._lock:
+            self._fold()
+            current, _ = tracemalloc.get_traced_memory()
+            self.open.append([name, threading.get_ident(), current, current])
+
+    def exit(self, name):
+        with self._lock:
+            self._fold()
+            tid = threading.get_ident()
+            for i in range(len(self.open) - 1, -1, -1):
+                if self.open[i][0] == name and self.open[i][1] == tid:
+                    _, _, start, peak = self.open.pop(i)
+                    above, absolute = self.peaks.get(name, (0, 0))
+                    self.peaks[name] = (max(above, peak - start), max(absolute, peak))
+                    break
+
+    def report(self):
+        return {
+            name: {"peak_above_entry_bytes": above, "peak_traced_bytes": absolute}
+            for name, (above, absolute) in sorted(self.peaks.items())
+        }
+
+
+class Profiler:
+    def __init__(self, mode, tool, out_dir=PROFILE_DIR, trace_memory=PROFILE_TRACEMALLOC):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.tool = tool
+        self.out_dir = Path(out_dir)
+        self.memory = MemoryTracker() if trace_memory else None
+        self._profile = None
+        self._sampler = None
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.time()
+        if self.memory is not None:
+            tracemalloc.start()
+            from .metrics import add_stage_hook
+            add_stage_hook(self.memory)
+        if self.mode == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler()
+            self._sampler.start()
+        return self
+
+    @contextmanager
+    def stage(self, name):
+        """Memory stage for code that does not run under metrics.stage."""
+        if self.memory is not None:
+            self.memory.enter(name)
+        try:
+            yield
+        finally:
+            if self.memory is not None:
+                self.memory.exit(name)
+
+    def stop(self, run_id, meta=None, log=print):
+        """Write all outputs; returns the common path prefix."""
+        wall = time.time() - self.started_at
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self.memory is not None:
+            from .metrics import remove_stage_hook
+            remove_stage_hook(self.memory)
+            tracemalloc.stop()
+
+        from .benchmark import _git_commit
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        prefix = self.out_dir / f"{self.tool}-{run_id}-{self.mode}"
+
+        if self._profile is not None:
+            import pstats
+            self._profile.dump_stats(f"{prefix}.pstats")
+            collapsed = collapsed_from_pstats(pstats.Stats(self._profile).stats)
+            unit = "microseconds"
+        else:
+            collapsed = self._sampler.collapsed()
+            unit = "samples"
+        with open(f"{prefix}.collapsed", "w", encoding="utf-8") as f:
+            for stack, value in sorted(collapsed):
+                if value > 0:
+                    f.write(f"{stack} {value}\n")
+
+        if self.memory is not None:
+            with open(f"{prefix}.memory.json", "w", encoding="utf-8") as f:
+                json.dump(self.memory.report(), f, indent=2)
+
+        info = {
+            "tool": self.tool,
+            "run_id": run_id,
+            "mode": self.mode,
+            "collapsed_unit": unit,
+            "sample_interval_s": PROFILE_SAMPLE_INTERVAL_S if self._sampler else None,
+            "samples": self._sampler.samples if self._sampler else None,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "wall_s": round(wall, 3),
+            "commit": _git_commit(),
+            "argv": sys.argv,
+            "python": platform.python_version(),
+            "host": platform.node(),
+            "tracemalloc": self.memory is not None,
+            **(meta or {}),
+        }
+        with open(f"{prefix}.meta.json", "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2, default=str)
+        log(f"Profile written to {prefix}.* ({self.mode}, {unit})")
+        return prefix
@@ -0,0 +1,72 @@
+"""
+Quiet-mode helpers: a single self-updating progress line and a buffered
+JSONL log for per-row details.
+"""
+import json
+import sys
+import time
+
+
+def _fmt_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class ProgressLine:
+    """Redraws 'done/total rows/s ETA' on stderr at most every `interval` seconds."""
+
+    def __init__(self, total, interval=0.5, stream=None):
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.started = time.perf_counter()
+        self.last_draw = 0.0
+        self.done = 0
+        self.extra = ""
+
+    def update(self, n=1, extra=None):
+        self.done += n
+        if extra is not None:
+            self.extra = extra
+        now = time.perf_counter()
+        if now - self.last_draw >= self.interval or self.done >= self.total:
+            self.last_draw = now
+            self.draw(now)
+
+    def draw(self, now=None):
+        now = now or time.perf_counter()
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else None
+        pct = 100.0 * self.done / self.total if self.total else 100.0
+        line = (
+            f"\r{self.done}/{self.total} ({pct:5.1f}%) "
+            f"{rate:6.2f} rows/s ETA {_fmt_eta(eta)}"
+        )
+        if self.extra:
+            line += f" | {self.extra}"
+        self.stream.write(line + "\033[K")
+        self.stream.flush()
+
+    def close(self):
+        self.draw()
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+class RowLog:
+    """Buffered JSONL writer for per-row details."""
+
+    def __init__(self, path, buffer_size=1 << 20):
+        self.path = path
+        self.f = open(path, "w", encoding="utf-8", buffering=buffer_size)
+
+    def write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        self.f.close()
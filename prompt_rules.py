@@ -0,0 +1,412 @@
+"""
+Feature-conditional assembly of the llm_parse rulebook prompt.
+
+The full instruction is split into sections. Sections tied to a rule are
+only included when the rule's cheap regex trigger fires on the raw string
+(acronym+year, "SC23:" prefixes, parenthesized acronyms, month dates,
+year-only dates, date-only strings, ASCII place names that may need
+diacritics). With every section included the text equals the original
+rulebook, so PROMPT_VERSION is unchanged; each stored raw answer carries
+the prompt_version of the instruction actually sent.
+
+    python -m confmeta.prompt_rules "SC23: The International Conference ..., Denver, CO, USA, November 12-17 2023"
+"""
+import re
+import sys
+
+from .regex_utils import (
+    HAS_MONTH,
+    HAS_YEAR,
+    ACRONYM_YEAR_RE,
+    PAREN_ACRO_RE,
+)
+
+from .metrics import current
+
+PROMPT_STATS = {"prompts": 0, "tokens": 0, "tokens_full": 0, "rules": {}}
+
+INTRO_TEXT = """
+You are cleaning conference metadata.
+
+You will receive ONE raw conference string, for example:
+"38th Annual ACM Symposium on User Interface Software and Technology, UIST 2025, Busan, Korea, September 28 - October 1, 2025"
+
+Your task is to extract:
+- conf_name
+- conf_place
+- conf_dates
+- note
+
+You must respond as a SINGLE JSON object:
+{
+  "conf_name": "...",
+  "conf_place": "...",
+  "conf_dates": "...",
+  "note": "..."
+}
+
+==================================================
+1. General principles
+==================================================
+
+- Use ONLY information present in the raw string.
+- Do NOT invent or guess conference names, locations, months, or days.
+- If something cannot be inferred, use an empty string for that field.
+"""
+
+DATE_ONLY_GENERAL_TEXT = """- If the string only contains a date range and no recognizable name or place:
+  - conf_name: ""
+  - conf_place: ""
+  - conf_dates: normalized date range
+"""
+
+NOTE_FIELD_TEXT = """
+The "note" field:
+- Very short explanation (max 20 words).
+- Summarize how you interpreted the string.
+
+"""
+
+SEPARATE_TEXT = """==================================================
+1.1 Separating name vs place
+==================================================
+
+- In many strings, the pattern is:
+  "[Conference name], [City][, Region][, Country], [dates]"
+- Anything after the main conference title that looks like a city/region/country
+  (e.g. "Stavanger Norway", "San Diego, United States", "Busan, Korea")
+  should go to conf_place, NOT conf_name.
+- Do NOT keep "City Country" at the end of conf_name if it obviously denotes location.
+- Example:
+  Raw: "Hydropower 15 in 83rd ICOLD Meeting, Stavanger Norway"
+  Good conf_name: "Hydropower 15 in 83rd ICOLD Meeting"
+  Good conf_place: "Stavanger, Norway"
+  conf_dates: ""  (no explicit dates in the string)
+
+"""
+
+NAME_BASE_TEXT = """==================================================
+2. conf_name rules
+==================================================
+
+2.1 What belongs in conf_name
+
+- Include the full conference name and series, including:
+  - Ordinal numbers: "12th", "38th", etc.
+  - Years that clearly belong to the event name.
+  - Acronyms and acronym+year patterns that refer to the specific edition.
+
+Examples:
+- "ATTCE 2001-Automotive and Transport Technology Congress and Exhibition"
+- "European Congress on Computational Methods in Applied Sciences and Engineering, ECCOMAS 2004"
+- "AMIF 2002, Applied Mathematics for Industrial Flow Problems, Third International Conference"
+- "International Conference on Fatigue Crack Path (FCP 2003)"
+- "12th IEEE/ACM International Symposium on Networks-on-Chip, NOCS 2018"
+
+In all these cases, the year and acronym are part of the NAME and must stay in conf_name.
+
+"""
+
+ACRONYM_YEAR_TEXT = """- If an acronym+year clearly refers to the conference edition (e.g. "HRI 2025", "UIST 2025", "DIS 2019", "ICASSP 2008"):
+  - Keep the whole pattern in conf_name, not just the acronym.
+
+Example:
+Input:
+"20th Annual ACM/IEEE International Conference on Human-Robot Interaction, HRI 2025, Melbourne, Australia, ..."
+Good conf_name:
+"20th Annual ACM/IEEE International Conference on Human-Robot Interaction, HRI 2025"
+
+Example:
+Input:
+"2020 IEEE International Conference on Communications, ICC 2020; Convention Centre Dublin, Dublin; Ireland..."
+Good conf_name:
+"2020 IEEE International Conference on Communications, ICC 2020"
+
+Example:
+Input:
+"2019 ACM Conference on Designing Interactive Systems, DIS 2019; San Diego; United States; 23 June 2019 through 28 June 2019"
+Good conf_name:
+"2019 ACM Conference on Designing Interactive Systems, DIS 2019"
+
+"""
+
+COLON_PREFIX_TEXT = """- If the conference name starts with an abbreviation followed by a colon:
+  - Keep that abbreviation and the colon in conf_name.
+
+Example:
+Input:
+"SC23: The International Conference for High Performance Computing, Networking, Storage, and Analysis, Denver, CO, USA, November 12-17 2023"
+Good conf_name:
+"SC23: The International Conference for High Performance Computing, Networking, Storage, and Analysis"
+
+"""
+
+LEADING_YEAR_TEXT = """- If the conference name starts with a year that clearly belongs to the event:
+  - Keep that year in conf_name, even if dates are also in conf_dates.
+  Example: "2019 ACM Conference on X"
+
+"""
+
+PAREN_ACRONYM_TEXT = """2.2 Acronyms in parentheses
+
+- If an acronym appears in parentheses immediately after the full name:
+  - Keep the full pattern in conf_name.
+
+Example:
+Input:
+"2011 American Control Conference (ACC) on O'Farrell Street, San Francisco, CA"
+Good conf_name:
+"2011 American Control Conference (ACC)"
+
+- Acronyms in parentheses with or without year (e.g. "(IEEE PIMRC)") should be kept in conf_name, not dropped.
+
+"""
+
+DATES_NOT_IN_NAME_TEXT = """2.3 What must NOT be in conf_name
+
+- conf_name must NOT contain explicit date expressions:
+  - Days, months, date ranges, or standalone years used only as dates.
+  - Examples: "27 April 2004", "April 27-29, 2004", "2004-04-27".
+- These belong only in conf_dates. If such dates appear, remove them from conf_name.
+
+"""
+
+CAPITALIZATION_TEXT = """2.4 Capitalization rules for conf_name
+
+- Preserve acronyms in uppercase EXACTLY as they appear: AIAA, IEEE, IFAC, EMAS, ATTCE, etc.
+- For other words, use title-style capitalization:
+  - Capitalize main words.
+  - Keep small connector words lowercase: and, of, on, in, for, to, the, a, an, at, by, with
+    (except when they are the first word or follow a colon).
+
+"""
+
+PLACE_TEXT = """==================================================
+3. conf_place rules
+==================================================
+
+3.1 What belongs in conf_place
+
+- City/region + country (if present).
+- Normalize capitalization:
+  - Use "Strasbourg, France" not "STRASBOURG, FRANCE".
+
+"""
+
+DIACRITICS_TEXT = """3.2 Diacritics
+
+- When obvious, correct ASCII city names to local spelling with diacritics, e.g.:
+  - "Jyvaskyla" -> "Jyväskylä"
+  - "Goteborg" -> "Göteborg"
+  - "Malmo" -> "Malmö"
+- Only add diacritics when you are confident; otherwise keep a safe ASCII form.
+
+"""
+
+DATES_HEADER_TEXT = """==================================================
+4. conf_dates rules
+==================================================
+
+Always normalize conf_dates using an ISO-like format.
+
+"""
+
+FULL_DATES_TEXT = """4.1 Full date range available
+
+- Format:
+  "YYYY-MM-DD / YYYY-MM-DD"
+Example:
+- Input: "APR 27-29, 2004"
+- conf_dates: "2004-04-27 / 2004-04-29"
+
+4.2 Single known day
+
+- Format:
+  "YYYY-MM-DD"
+
+4.3 Only month and year known (no specific days)
+
+- Format:
+  "YYYY-MM / YYYY-MM"
+- Do NOT invent days.
+
+"""
+
+YEAR_ONLY_TEXT = """4.4 Only a year known
+
+- If the ONLY date information in the raw string is a year (e.g. "IAVSD 2019",
+  "NOCS 2018") and there is NO explicit month or day anywhere:
+  - Treat this as a year-only case.
+  - conf_dates MUST be: "YYYY / YYYY"
+  - Example: year = 2019 -> conf_dates: "2019 / 2019"
+- IMPORTANT:
+  - Do NOT invent months or days.
+  - NEVER use patterns like "YYYY-01-01 / YYYY-12-31" when only a year is present.
+
+"""
+
+DATES_GENERAL_TEXT = """4.5 General rules
+
+- Use 4-digit years and 2-digit months/days where they are explicitly given.
+- Do NOT invent specific months or days when only a year is mentioned.
+- If no date information at all is available:
+  - conf_dates: ""
+
+"""
+
+MISSING_TEXT = """==================================================
+5. Missing information
+==================================================
+
+- If conf_name cannot be determined: use "".
+- If conf_place cannot be determined: use "".
+- If conf_dates cannot be determined: use "".
+
+"""
+
+DATE_ONLY_TEXT = """If the raw string only contains a date range and no recognizable name or place:
+- conf_name: ""
+- conf_place: ""
+- conf_dates: normalized date range as above.
+
+"""
+
+OUTPUT_TEXT = """==================================================
+6. Output format
+==================================================
+
+Respond ONLY as a single JSON object, for example:
+
+{
+  "conf_name": "2019 ACM Conference on Designing Interactive Systems, DIS 2019",
+  "conf_place": "San Diego, United States",
+  "conf_dates": "2019-06-23 / 2019-06-28",
+  "note": "Kept acronym+year in name; extracted city, country, and full date range."
+}
+"""
+
+SECTIONS = (
+    (None, INTRO_TEXT),
+    ("date_only", DATE_ONLY_GENERAL_TEXT),
+    (None, NOTE_FIELD_TEXT),
+    (None, SEPARATE_TEXT),
+    (None, NAME_BASE_TEXT),
+    ("acronym_year", ACRONYM_YEAR_TEXT),
+    ("colon_prefix", COLON_PREFIX_TEXT),
+    ("leading_year", LEADING_YEAR_TEXT),
+    ("paren_acronym", PAREN_ACRONYM_TEXT),
+    ("dates_in_string", DATES_NOT_IN_NAME_TEXT),
+    (None, CAPITALIZATION_TEXT),
+    (None, PLACE_TEXT),
+    ("diacritics", DIACRITICS_TEXT),
+    (None, DATES_HEADER_TEXT),
+    ("dates_in_string", FULL_DATES_TEXT),
+    ("year_only", YEAR_ONLY_TEXT),
+    (None, DATES_GENERAL_TEXT),
+    (None, MISSING_TEXT),
+    ("date_only", DATE_ONLY_TEXT),
+    (None, OUTPUT_TEXT),
+)
+
+
+COLON_PREFIX_RE = re.compile(r"^\W*[A-Za-z][\w&+\-]{1,15}\s*:")
+LEADING_YEAR_RE = re.compile(r"^\W*(?:19|20)\d{2}\b")
+PAREN_ANY_ACRO_RE = re.compile(r"\([^()]*\b[A-Z]{2,}\b[^()]*\)")
+NUMERIC_DATE_RE = re.compile(
+    r"\b(?:19|20)\d{2}-\d{1,2}-\d{1,2}\b|\b\d{1,2}[./]\d{1,2}[./](?:19|20)\d{2}\b"
+)
+DATE_FILLER_RE = re.compile(
+    r"\b(?:through|to|and|from|until|st|nd|rd|th)\b|\d+|[^\w\s]|_",
+    re.IGNORECASE,
+)
+# Countries whose city names are often written without their diacritics
+DIACRITIC_COUNTRY_RE = re.compile(
+    r"\b(?:Finland|Sweden|Norway|Denmark|Iceland|Germany|Austria|Switzerland|"
+    r"France|Belgium|Spain|Portugal|Czech|Czechia|Slovakia|Poland|Hungary|"
+    r"Romania|Croatia|Slovenia|Serbia|Turkey|Estonia|Latvia|Lithuania|Brazil|"
+    r"Mexico|Colombia|Chile|Peru|Argentina|Vietnam|Viet Nam)\b",
+    re.IGNORECASE,
+)
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def has_dates(raw):
+    return bool(HAS_MONTH.search(raw) or NUMERIC_DATE_RE.search(raw))
+
+
+def is_date_only(raw):
+    if not (HAS_YEAR.search(raw) or HAS_MONTH.search(raw)):
+        return False
+    rest = DATE_FILLER_RE.sub(" ", HAS_MONTH.sub(" ", raw))
+    return len(re.sub(r"\W", "", rest)) <= 2
+
+
+RULES = {
+    "acronym_year": lambda raw: bool(ACRONYM_YEAR_RE.search(raw)),
+    "colon_prefix": lambda raw: bool(COLON_PREFIX_RE.search(raw)),
+    "leading_year": lambda raw: bool(LEADING_YEAR_RE.search(raw)),
+    "paren_acronym": lambda raw: bool(PAREN_ACRO_RE.search(raw) or PAREN_ANY_ACRO_RE.search(raw)),
+    "dates_in_string": has_dates,
+    "year_only": lambda raw: bool(HAS_YEAR.search(raw)) and not has_dates(raw),
+    "diacritics": lambda raw: raw.isascii() and bool(DIACRITIC_COUNTRY_RE.search(raw)),
+    "date_only": is_date_only,
+}
+
+FULL_INSTRUCTION = "".join(text for _, text in SECTIONS)
+
+
+def count_tokens(text):
+    """Rough token estimate (words and punctuation), enough to compare prompts."""
+    return len(TOKEN_RE.findall(text))
+
+
+FULL_TOKENS = count_tokens(FULL_INSTRUCTION)
+
+
+def triggered_rules(raw):
+    raw = str(raw or "")
+    return [name for name, trigger in RULES.items() if trigger(raw)]
+
+
+def assemble_instruction(raw):
+    """-> (instruction, rule names included) for one raw string."""
+    rules = set(triggered_rules(raw))
+    text = "".join(t for rule, t in SECTIONS if rule is None or rule in rules)
+    return text, sorted(rules)
+
+
+def record_prompt(instruction, rules):
+    tokens = count_tokens(instruction)
+    current().incr("prompt_instruction_tokens", tokens)
+    PROMPT_STATS["prompts"] += 1
+    PROMPT_STATS["tokens"] += tokens
+    PROMPT_STATS["tokens_full"] += FULL_TOKENS
+    for name in rules:
+        PROMPT_STATS["rules"][name] = PROMPT_STATS["rules"].get(name, 0) + 1
+
+
+def reset_prompt_stats():
+    PROMPT_STATS["prompts"] = 0
+    PROMPT_STATS["tokens"] = 0
+    PROMPT_STATS["tokens_full"] = 0
+    PROMPT_STATS["rules"] = {}
+
+
+def format_prompt_report():
+    n = PROMPT_STATS["prompts"]
+    if not n:
+        return "Prompt assembly: no full-rulebook prompts"
+    saved = 1 - PROMPT_STATS["tokens"] / PROMPT_STATS["tokens_full"]
+    rules = ", ".join(f"{k}={v}" for k, v in sorted(PROMPT_STATS["rules"].items()))
+    return (
+        f"Prompt assembly: {n} prompts, ~{PROMPT_STATS['tokens'] / n:.0f} instruction tokens "
+        f"per prompt vs ~{FULL_TOKENS} full ({saved:.1%} saved); rules: {rules or 'none'}"
+    )
+
+
+if __name__ == "__main__":
+    raw = " ".join(sys.argv[1:])
+    instruction, rules = assemble_instruction(raw)
+    print(instruction)
+    print(f"rules: {', '.join(rules) or 'none'}")
+    print(f"~{count_tokens(instruction)} instruction tokens (full rulebook ~{FULL_TOKENS})")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Re-run only the normalization chain over stored raw LLM answers.
+
+    python -m confmeta.renormalize
+
+After a rule change in regex_utils (ACRONYM_OVERRIDES, normalize_us_place,
+the proceedings regexes, ...) this rebuilds names_conference_parsed from
+llm_raw_outputs in CPU time, without calling the LLM. Rows parsed by the
+heuristic path alone are re-normalized too. Stored series links
+(conf_series_links) are joined back in; names a rule change renamed stay
+pending until series_link runs.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from .db_io import connect, fetch_latest_raw_outputs, table_exists, upsert_parsed_rows
+from .metrics import stage, start_run, finish_run, format_run_report
+from .parsers import get_normalizer
+from .series_link import LINKS_TABLE, apply_links, pending_names
+
+PARSED_TABLE = "names_conference_parsed"
+
+
+def renormalize(con, table_name=PARSED_TABLE, log=print):
+    from .pipeline import build_row, heuristic_parse, needs_llm
+
+    if not table_exists(con, "llm_raw_outputs"):
+        raise RuntimeError("no llm_raw_outputs table; run the pipeline first")
+
+    stored = fetch_latest_raw_outputs(con)
+    parsed_by_raw = {}
+    with stage("normalize"):
+        for _, rec in stored.iterrows():
+            normalize = get_normalizer(rec["parser"])
+            parsed_by_raw[rec["conference"]] = normalize(rec["conference"], rec["raw_text"])
+
+    rows_df = con.execute(f"""
+        SELECT pid, name_seq, raw_conference, note FROM {table_name}
+    """).fetch_df()
+
+    rows = []
+    skipped = 0
+    with stage("normalize"):
+        for _, r in rows_df.iterrows():
+            raw = r["raw_conference"]
+            parsed = parsed_by_raw.get(raw)
+            if parsed is None:
+                if needs_llm(raw):
+                    skipped += 1  # LLM row without a stored answer: keep as is
+                    continue
+                parsed = heuristic_parse(raw)
+            rows.append(build_row(int(r["pid"]), int(r["name_seq"]), raw, parsed))
+
+    if rows:
+        upsert_parsed_rows(con, pd.DataFrame(rows), table_name)
+    log(
+        f"Re-normalized {len(rows)} rows from {len(parsed_by_raw)} stored answers; "
+        f"{skipped} LLM rows had no stored answer"
+    )
+    if rows and table_exists(con, LINKS_TABLE):
+        # build_row resets the series columns; restore the stored links
+        apply_links(con, table_name)
+        log(f"Re-applied series links; {len(pending_names(con, table_name))} names still pending "
+            f"(python -m confmeta.series_link)")
+    return len(rows), skipped
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Re-normalize stored LLM answers")
+    ap.add_argument("--table", default=PARSED_TABLE)
+    args = ap.parse_args(argv)
+
+    run = start_run(parser_mode="renormalize")
+    con = connect()
+    t0 = time.perf_counter()
+    n, _ = renormalize(con, args.table)
+    run.incr("rows", n)
+    finish_run(con)
+    con.close()
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
+    print(format_run_report(run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Difficulty-based model routing (PARSER_MODE = "routed").
+
+A cheap score from signals of the raw string (length, separators, "as part
+of", parentheses, several years, non-ASCII text) picks the model: the first
+MODEL_POOL entry whose max_score covers the score, so short clean strings go
+to a small model and hard ones to MODEL. The prompt is the llm_parse
+rulebook for every model.
+
+Each LLM decision (score, signals, model, latency, failed validate checks)
+is stored in llm_routing at the end of a run; the report groups them by
+model and score to tune the max_score thresholds.
+
+    python -m confmeta.routing score "ICC 2011, Kyoto, Japan"
+    python -m confmeta.routing report [--run-id ID]
+"""
+import argparse
+import json
+import threading
+import time
+
+from .config import MODEL_POOL
+from .metrics import current, stage
+from .regex_utils import AS_PART_OF_RE, HAS_YEAR
+
+ROUTING_TABLE = "llm_routing"
+
+SEPARATORS = (",", ";", " - ", "|", " / ")
+
+# signal -> points added to the difficulty score
+WEIGHTS = {
+    "long": 1,          # > 80 characters
+    "very_long": 1,     # > 160 characters (on top of "long")
+    "separators": 1,    # more than 3 separators
+    "as_part_of": 2,
+    "parentheses": 1,
+    "multiple_years": 1,
+    "non_ascii": 1,
+}
+
+_decisions = []
+_lock = threading.Lock()
+
+
+def signals(raw):
+    raw = str(raw or "")
+    years = {m.group(0) for m in HAS_YEAR.finditer(raw)}
+    return {
+        "long": len(raw) > 80,
+        "very_long": len(raw) > 160,
+        "separators": sum(raw.count(sep) for sep in SEPARATORS) > 3,
+        "as_part_of": bool(AS_PART_OF_RE.search(raw)),
+        "parentheses": "(" in raw,
+        "multiple_years": len(years) > 1,
+        "non_ascii": not raw.isascii(),
+    }
+
+
+def difficulty(raw):
+    """-> (score, names of the signals that fired)."""
+    fired = [name for name, on in signals(raw).items() if on]
+    return sum(WEIGHTS[name] for name in fired), fired
+
+
+def choose_model(score, pool=MODEL_POOL):
+    for entry in pool:
+        if entry["max_score"] is None or score <= entry["max_score"]:
+            return entry["model"]
+    return pool[-1]["model"]
+
+
+def pool_models(pool=MODEL_POOL):
+    return list(dict.fromkeys(entry["model"] for entry in pool))
+
+
+def parse_with_routing(conf_string: str, show_stream: bool = True):
+    """
+    llm_parse.parse_with_llm with the model chosen by difficulty.
+    Returns the same dict shape.
+    """
+    from . import llm_parse
+    from .validate import validate_parsed
+
+    score, fired = difficulty(conf_string)
+    model = choose_model(score)
+    key = conf_string if model == llm_parse.MODEL else (model, conf_string)
+    cached = key in llm_parse._llm_cache
+    if show_stream:
+        print(f"[routing] score {score} ({', '.join(fired) or 'clean'}) -> {model}")
+
+    t0 = time.perf_counter()
+    parsed = llm_parse.parse_with_llm(conf_string, show_stream=show_stream, model=model)
+    latency = time.perf_counter() - t0
+    failures = validate_parsed(conf_string, parsed)
+
+    current().incr(f"routed_{model}")
+    with _lock:
+        _decisions.append({
+            "conference": conf_string,
+            "score": score,
+            "signals": ",".join(fired),
+            "model": model,
+            "cached": cached,
+            "latency_s": latency,
+            "failed_checks": ",".join(failures),
+        })
+    return parsed
+
+
+def reset_routing():
+    with _lock:
+        _decisions.clear()
+
+
+def drain_decisions():
+    with _lock:
+        out = list(_decisions)
+        _decisions.clear()
+    return out
+
+
+def model_stats(decisions):
+    """{model: {rows, llm_rows, llm_s, rows_per_s, check_pass_rate, mean_score}}."""
+    stats = {}
+    for d in decisions:
+        s = stats.setdefault(d["model"], {"rows": 0, "llm_rows": 0, "llm_s": 0.0, "passed": 0, "score_sum": 0})
+        s["rows"] += 1
+        s["passed"] += not d["failed_checks"]
+        s["score_sum"] += d["score"]
+        if not d["cached"]:
+            s["llm_rows"] += 1
+            s["llm_s"] += d["latency_s"]
+    out = {}
+    for model, s in stats.items():
+        out[model] = {
+            "rows": s["rows"],
+            "llm_rows": s["llm_rows"],
+            "llm_s": round(s["llm_s"], 3),
+            "rows_per_s": round(s["llm_rows"] / s["llm_s"], 2) if s["llm_s"] else None,
+            "check_pass_rate": round(s["passed"] / s["rows"], 4),
+            "mean_score": round(s["score_sum"] / s["rows"], 2),
+        }
+    return out
+
+
+def format_routing_report(decisions):
+    lines = ["Routing (model: rows, uncached LLM rows/s, validate pass rate, mean score):"]
+    for model, s in sorted(model_stats(decisions).items()):
+        rate = f"{s['rows_per_s']:.2f}/s" if s["rows_per_s"] else "-"
+        lines.append(
+            f"  {model:20s} {s['rows']:6d} rows  {rate:>10s}  "
+            f"pass {s['check_pass_rate']:.1%}  score {s['mean_score']}"
+        )
+    return "\n".join(lines)
+
+
+ROUTING_DDL = f"""
+CREATE TABLE IF NOT EXISTS {ROUTING_TABLE} (
+    run_id VARCHAR,
+    conference VARCHAR,
+    score INTEGER,
+    signals VARCHAR,
+    model VARCHAR,
+    cached BOOLEAN,
+    latency_s DOUBLE,
+    failed_checks VARCHAR,
+    created_at TIMESTAMP
+)
+"""
+
+
+def write_decisions(con, decisions, run_id):
+    if not decisions:
+        return 0
+    with stage("write"):
+        con.execute(ROUTING_DDL)
+        con.executemany(
+            f"INSERT INTO {ROUTING_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, now())",
+            [
+                (run_id, d["conference"], d["score"], d["signals"], d["model"],
+                 d["cached"], d["latency_s"], d["failed_checks"])
+                for d in decisions
+            ],
+        )
+    return len(decisions)
+
+
+def score_report(con, run_id=None):
+    """Stored decisions grouped by (score, model): rows, mean latency, validate pass rate."""
+    where = "WHERE run_id = ?" if run_id else ""
+    return con.execute(f"""
+        SELECT score, model, count(*) AS rows,
+               avg(latency_s) FILTER (WHERE NOT cached) AS mean_latency_s,
+               avg(CASE WHEN failed_checks = '' THEN 1.0 ELSE 0.0 END) AS pass_rate
+        FROM {ROUTING_TABLE} {where}
+        GROUP BY score, model
+        ORDER BY score, model
+    """, [run_id] if run_id else []).fetchall()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Difficulty-based model routing")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_score = sub.add_parser("score", help="score strings and show the chosen model")
+    p_score.add_argument("strings", nargs="+")
+    p_report = sub.add_parser("report", help="stored decisions by score and model")
+    p_report.add_argument("--run-id")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "score":
+        for raw in args.strings:
+            score, fired = difficulty(raw)
+            print(json.dumps({"score": score, "signals": fired, "model": choose_model(score), "raw": raw}))
+        return
+
+    from .db_io import connect, table_exists
+
+    con = connect()
+    try:
+        if not table_exists(con, ROUTING_TABLE):
+            print(f"No '{ROUTING_TABLE}' table yet; run the pipeline with PARSER_MODE = \"routed\".")
+            return
+        pool = ", ".join(f"{e['model']}<={e['max_score']}" for e in MODEL_POOL)
+        print(f"Pool: {pool}")
+        print(f"{'score':>5s} {'model':20s} {'rows':>7s} {'latency_s':>10s} {'pass':>7s}")
+        for score, model, rows, latency, pass_rate in score_report(con, args.run_id):
+            lat = f"{latency:.3f}" if latency is not None else "-"
+            print(f"{score:5d} {model:20s} {rows:7d} {lat:>10s} {pass_rate:7.1%}")
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+dblp series linking as a separate stage over distinct normalized names.
+
+Each distinct conf_name is linked once and stored in conf_series_links;
+the conf_series_* columns of names_conference_parsed are then filled by a
+join. Names already in conf_series_links are skipped, so the stage is
+incremental. Deterministic paths come first (an "ACRONYM 2022" hit in the
+dblp edition index, exact acronym slug, a single candidate whose name is
+contained in conf_name); the LLM re-ranks only the remaining ambiguous
+candidate lists.
+
+The edition index is dblp_conference_editions (one row per proceedings
+volume, written by dblp/extract_conference_series.py), held in memory as a
+{(acronym, year): series} dict.
+
+    python -m confmeta.series_link --load-editions dblp/dblp_conference_editions.csv
+    python -m confmeta.series_link            # link new names, then join
+    python -m confmeta.pipeline --link-series # link in a thread while parsing
+"""
+import argparse
+import queue
+import re
+import threading
+
+from .config import SERIES_LINK_BATCH, SERIES_VECTORS
+from .metrics import current, stage
+from .regex_utils import ACRONYM_YEAR_RE
+
+LINKS_TABLE = "conf_series_links"
+PARSED_TABLE = "names_conference_parsed"
+SERIES_TABLE = "dblp_conference_series"
+EDITIONS_TABLE = "dblp_conference_editions"
+
+LINKS_DDL = f"""
+CREATE TABLE IF NOT EXISTS {LINKS_TABLE} (
+    conf_name VARCHAR PRIMARY KEY,
+    conf_series_slug VARCHAR,
+    conf_series_stream_iri VARCHAR,
+    conf_series_name VARCHAR,
+    conf_series_match_reason VARCHAR,
+    linked_at TIMESTAMP
+)
+"""
+
+SERIES_COLUMNS = (
+    "conf_series_slug",
+    "conf_series_stream_iri",
+    "conf_series_name",
+    "conf_series_match_reason",
+)
+
+ACRONYM_RE = re.compile(r"\b[A-Z]{3,}\b")
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+def _acronym(conf_name):
+    tokens = ACRONYM_RE.findall(conf_name)
+    return tokens[-1] if tokens else ""
+
+
+def load_editions(con, csv_path):
+    """(Re)create dblp_conference_editions from the extractor's CSV; returns row count."""
+    path = str(csv_path).replace("'", "''")
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {EDITIONS_TABLE} AS
+        SELECT * FROM read_csv('{path}', delim=';', header=true, all_varchar=true)
+    """)
+    reset_edition_index()
+    return con.execute(f"SELECT count(*) FROM {EDITIONS_TABLE}").fetchone()[0]
+
+
+_edition_index = None
+_edition_lock = threading.Lock()
+
+
+def reset_edition_index():
+    global _edition_index
+    _edition_index = None
+
+
+def edition_index(con):
+    """
+    {(ACRONYM, "year"): [(slug, stream_iri, series_name, edition_iri), ...]},
+    built once per process; empty when the editions table was not loaded.
+    """
+    global _edition_index
+    if _edition_index is None:
+        with _edition_lock:
+            if _edition_index is None:
+                from .db_io import table_exists
+
+                index = {}
+                if table_exists(con, EDITIONS_TABLE):
+                    series_join = (
+                        f"LEFT JOIN {SERIES_TABLE} s ON s.stream_iri = e.stream_iri"
+                        if table_exists(con, SERIES_TABLE) else ""
+                    )
+                    series_name = "s.series_name" if series_join else "NULL"
+                    rows = con.execute(f"""
+                        SELECT upper(e.acronym), CAST(e.year AS VARCHAR), e.series_slug,
+                               e.stream_iri, {series_name}, e.edition_iri
+                        FROM {EDITIONS_TABLE} e {series_join}
+                    """).fetchall()
+                    for acronym, year, slug, iri, name, edition in rows:
+                        index.setdefault((acronym, year), []).append((slug, iri, name, edition))
+                _edition_index = index
+    return _edition_index
+
+
+def lookup_edition(con, conf_name):
+    """(slug, stream_iri, series_name, edition_iri) for an unambiguous "ACRONYM year" hit, else None."""
+    index = edition_index(con)
+    if not index:
+        return None
+    for m in ACRONYM_YEAR_RE.finditer(conf_name):
+        hits = index.get((m.group(1), m.group(2)))
+        if hits and len({h[1] for h in hits}) == 1:
+            return hits[0]
+    return None
+
+
+def resolve_candidates(conf_name, candidates):
+    """Deterministic pick: a unique exact-acronym slug, or a single contained name; else None."""
+    acronym = _acronym(conf_name).lower()
+    exact = [c for c in candidates if acronym and str(c[0]).lower() == acronym]
+    if len(exact) == 1:
+        slug, iri, name = exact[0]
+        return slug, iri, name, f"exact acronym slug '{slug}'", "exact_acronym"
+
+    if len(candidates) == 1:
+        slug, iri, name = candidates[0]
+        bare = YEAR_RE.sub("", str(name or "")).strip(" ,").lower()
+        if bare and bare in conf_name.lower():
+            return slug, iri, name, "only candidate, name contained", "name_contained"
+    return None
+
+
+def link_name(con, conf_name, conf_dates=""):
+    """
+    -> (slug, stream_iri, series_name, reason, path); path is one of
+    "edition", "no_candidates", "exact_acronym", "name_contained", "llm".
+    Vector candidates are added only when the ILIKE candidates do not
+    resolve deterministically.
+    """
+    from .llm_series import add_vector_candidates, find_series_candidates, choose_series_with_llm
+
+    edition = lookup_edition(con, conf_name)
+    if edition is not None:
+        slug, iri, name, edition_iri = edition
+        return slug, iri, name, f"dblp edition {edition_iri}", "edition"
+
+    candidates = find_series_candidates(con, conf_name)
+    resolved = resolve_candidates(conf_name, candidates)
+    if resolved is None and SERIES_VECTORS:
+        candidates = add_vector_candidates(conf_name, candidates)
+        resolved = resolve_candidates(conf_name, candidates)
+    if resolved is not None:
+        return resolved
+    if not candidates:
+        return None, None, None, "no candidates", "no_candidates"
+
+    slug, iri, name, reason = choose_series_with_llm(conf_name, conf_dates, candidates)
+    return slug, iri, name, f"llm: {reason}" if reason else "llm", "llm"
+
+
+def ensure_links_table(con):
+    con.execute(LINKS_DDL)
+
+
+def linked_names(con):
+    ensure_links_table(con)
+    return {r[0] for r in con.execute(f"SELECT conf_name FROM {LINKS_TABLE}").fetchall()}
+
+
+def pending_names(con, parsed_table=PARSED_TABLE):
+    """Distinct conf_name of parsed_table without a stored link, most frequent first."""
+    ensure_links_table(con)
+    return con.execute(f"""
+        SELECT p.conf_name, any_value(p.conf_dates) AS conf_dates
+        FROM {parsed_table} p
+        WHERE p.conf_name IS NOT NULL AND p.conf_name <> ''
+          AND NOT EXISTS (SELECT 1 FROM {LINKS_TABLE} l WHERE l.conf_name = p.conf_name)
+        GROUP BY p.conf_name
+        ORDER BY count(*) DESC, p.conf_name
+    """).fetchall()
+
+
+def write_links(con, links):
+    """links: list of (conf_name, slug, iri, series_name, reason)."""
+    if not links:
+        return 0
+    ensure_links_table(con)
+    with stage("write"):
+        con.executemany(
+            f"INSERT OR REPLACE INTO {LINKS_TABLE} VALUES (?, ?, ?, ?, ?, now())",
+            links,
+        )
+    return len(links)
+
+
+def apply_links(con, parsed_table=PARSED_TABLE):
+    """Fill the conf_series_* columns of parsed_table from conf_series_links."""
+    ensure_links_table(con)
+    with stage("write"):
+        # all-NULL columns written from pandas may not be VARCHAR yet
+        for col in SERIES_COLUMNS:
+            con.execute(f"ALTER TABLE {parsed_table} ALTER {col} TYPE VARCHAR")
+        con.execute(f"""
+            UPDATE {parsed_table} AS p SET
+                conf_series_slug = l.conf_series_slug,
+                conf_series_stream_iri = l.conf_series_stream_iri,
+                conf_series_name = l.conf_series_name,
+                conf_series_match_reason = l.conf_series_match_reason
+            FROM {LINKS_TABLE} l
+            WHERE p.conf_name = l.conf_name
+        """)
+
+
+def link_pending(con, parsed_table=PARSED_TABLE, limit=None, log=print):
+    """Link every name of parsed_table not linked yet; returns {path: count}."""
+    from .breaker import is_llm_unavailable
+
+    todo = pending_names(con, parsed_table)
+    if limit:
+        todo = todo[:limit]
+    log(f"Series linking: {len(todo)} new distinct names")
+    counts = {}
+    batch = []
+    for conf_name, conf_dates in todo:
+        try:
+            with stage("series"):
+                slug, iri, name, reason, path = link_name(con, conf_name, conf_dates or "")
+        except Exception as e:
+            if is_llm_unavailable(e):
+                log(f"Series linking stopped, LLM unavailable: {e}")
+                break
+            log(f"Series linking error for {conf_name!r}: {e}")
+            counts["error"] = counts.get("error", 0) + 1
+            continue
+        counts[path] = counts.get(path, 0) + 1
+        batch.append((conf_name, slug, iri, name, reason))
+        if len(batch) >= SERIES_LINK_BATCH:
+            write_links(con, batch)
+            batch = []
+    write_links(con, batch)
+    return counts
+
+
+class SeriesLinker:
+    """
+    Links names submitted by the parsing loop in a background thread, on its
+    own DuckDB cursor. Names already stored (or already submitted) are skipped.
+    store: writable connection for the links when con is read-only.
+    """
+
+    def __init__(self, con, log=print, store=None):
+        from .db_io import table_exists
+
+        self.con = con.cursor()
+        self.store = store.cursor() if store is not None else self.con
+        self.log = log
+        self.counts = {}
+        self.seen = linked_names(self.store)
+        if store is not None and table_exists(self.con, LINKS_TABLE):
+            self.seen |= {r[0] for r in self.con.execute(f"SELECT conf_name FROM {LINKS_TABLE}").fetchall()}
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="series-linker", daemon=True)
+        self.thread.start()
+
+    def submit(self, conf_name, conf_dates=""):
+        if conf_name and conf_name not in self.seen:
+            self.seen.add(conf_name)
+            self.queue.put((conf_name, conf_dates or ""))
+
+    def _run(self):
+        from .breaker import is_llm_unavailable
+
+        run = current()
+        batch = []
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            conf_name, conf_dates = item
+            try:
+                with stage("series"):
+                    slug, iri, name, reason, path = link_name(self.con, conf_name, conf_dates)
+            except Exception as e:
+                # not stored: the next run (or series_link CLI) picks it up again
+                path = "deferred" if is_llm_unavailable(e) else "error"
+                self.counts[path] = self.counts.get(path, 0) + 1
+                continue
+            self.counts[path] = self.counts.get(path, 0) + 1
+            run.incr(f"series_{path}")
+            batch.append((conf_name, slug, iri, name, reason))
+            if len(batch) >= SERIES_LINK_BATCH:
+                write_links(self.store, batch)
+                batch = []
+        write_links(self.store, batch)
+
+    def close(self):
+        """Wait for the queued names; returns {path: count}."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.store is not self.con:
+            self.store.close()
+        self.con.close()
+        return self.counts
+
+
+def format_counts(counts):
+    return ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) or "nothing to link"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Link distinct conf_name values to dblp series")
+    ap.add_argument("--table", default=PARSED_TABLE)
+    ap.add_argument("--limit", type=int, help="link at most this many new names")
+    ap.add_argument("--load-editions", metavar="CSV",
+                    help="load dblp_conference_editions from the extractor's CSV first")
+    args = ap.parse_args(argv)
+
+    from .db_io import connect
+
+    con = connect()
+    try:
+        if args.load_editions:
+            n = load_editions(con, args.load_editions)
+            print(f"Loaded {n} dblp editions into '{EDITIONS_TABLE}'.")
+        counts = link_pending(con, args.table, limit=args.limit)
+        apply_links(con, args.table)
+    finally:
+        con.close()
+    print(f"Series linking: {format_counts(counts)}")
+    print(f"Filled conf_series_* in '{args.table}' from '{LINKS_TABLE}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Embedding index of dblp series names for series candidate search.
+
+    python -m confmeta.series_vectors build [--csv dblp_conference_series.csv]
+    python -m confmeta.series_vectors query "Int. Conf. on Wind Engineering"
+
+build embeds every series_name of dblp_conference_series (the DuckDB table,
+or the extractor CSV) through the Ollama embedding endpoint (EMBED_MODEL),
+SERIES_EMBED_BATCH names per request, into SERIES_INDEX_DIR:
+
+  vectors.npy   float32 (n, dim), L2-normalized, memory-mapped on load
+  series.json   model, dim and (series_slug, stream_iri, series_name) per row
+
+A query embeds the conference name once (one embedding request, no
+generation) and scores it against the mapped matrix with one matrix-vector
+product. When the ILIKE candidates are empty or resolve neither by exact
+acronym nor by a single contained name, series_link adds the top
+SERIES_VECTOR_K hits above SERIES_VECTOR_MIN_SCORE, up to
+MAX_SERIES_CANDIDATES in total, which catches wordings such as
+"Int. Conf. on ..." that the lexical match misses.
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from .config import (
+    EMBED_MODEL,
+    SERIES_EMBED_BATCH,
+    SERIES_INDEX_DIR,
+    SERIES_VECTOR_K,
+    SERIES_VECTOR_MIN_SCORE,
+)
+from .metrics import current
+
+VECTORS_FILE = "vectors.npy"
+META_FILE = "series.json"
+
+_index = None
+_index_lock = threading.Lock()
+_index_loaded = False
+
+
+def load_series_rows(con=None, csv_path=None):
+    """[(series_slug, stream_iri, series_name)] with a non-empty name."""
+    if csv_path:
+        with open(csv_path, encoding="utf-8") as f:
+            rows = [
+                (r["series_slug"], r["stream_iri"], r["series_name"])
+                for r in csv.DictReader(f, delimiter=";")
+            ]
+    else:
+        rows = con.execute(
+            "SELECT series_slug, stream_iri, series_name FROM dblp_conference_series"
+        ).fetchall()
+    return [r for r in rows if r[2] and str(r[2]).strip()]
+
+
+def _normalized(vectors):
+    import numpy as np
+
+    v = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return v / norms
+
+
+def embed(texts, model=EMBED_MODEL):
+    """float32 (len(texts), dim), L2-normalized."""
+    from .llm_client import get_client
+
+    return _normalized(get_client().embed(texts, model=model))
+
+
+def build_index(rows, out_dir=SERIES_INDEX_DIR, model=EMBED_MODEL, batch=SERIES_EMBED_BATCH, log=print):
+    """Embed the series names of rows into out_dir; returns the matrix shape."""
+    import numpy as np
+
+    if not rows:
+        raise ValueError("no dblp series to embed")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out_dir / (VECTORS_FILE + ".tmp")
+
+    t0 = time.perf_counter()
+    names = [str(r[2]) for r in rows]
+    first = embed(names[:batch], model)
+    matrix = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(len(names), first.shape[1]))
+    matrix[:len(first)] = first
+    for start in range(len(first), len(names), batch):
+        chunk = embed(names[start:start + batch], model)
+        matrix[start:start + len(chunk)] = chunk
+        if (start // batch) % 20 == 0:
+            log(f"  embedded {start + len(chunk)}/{len(names)} series names")
+    matrix.flush()
+    shape = matrix.shape
+    del matrix
+
+    meta = {
+        "model": model,
+        "dim": shape[1],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "series": [list(r) for r in rows],
+    }
+    meta_tmp = out_dir / (META_FILE + ".tmp")
+    meta_tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, out_dir / VECTORS_FILE)
+    os.replace(meta_tmp, out_dir / META_FILE)
+    log(f"Embedded {shape[0]} series names ({shape[1]} dims, {model}) in {time.perf_counter() - t0:.1f}s")
+    return shape
+
+
+class SeriesIndex:
+    def __init__(self, path=SERIES_INDEX_DIR):
+        import numpy as np
+
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        self.model = meta["model"]
+        self.rows = [tuple(r) for r in meta["series"]]
+        self.vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        if self.vectors.shape[0] != len(self.rows):
+            raise ValueError(f"{path}: {self.vectors.shape[0]} vectors for {len(self.rows)} series")
+        self._query_cache = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search_many(self, texts, k=SERIES_VECTOR_K, min_score=SERIES_VECTOR_MIN_SCORE):
+        """Per text, [(slug, stream_iri, name, score)] best first."""
+        import numpy as np
+
+        missing = [t for t in dict.fromkeys(texts) if t not in self._query_cache]
+        if missing:
+            if len(self._query_cache) > 100_000:
+                self._query_cache.clear()
+            for t, v in zip(missing, embed(missing, self.model)):
+                self._query_cache[t] = v
+        queries = np.stack([self._query_cache[t] for t in texts])
+        scores = queries @ self.vectors.T  # (len(texts), n) cosine similarities
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        out = []
+        for row_scores, idx in zip(scores, top):
+            idx = idx[np.argsort(-row_scores[idx])]
+            out.append([
+                (*self.rows[i], float(row_scores[i]))
+                for i in idx
+                if row_scores[i] >= min_score
+            ])
+        return out
+
+    def search(self, text, k=SERIES_VECTOR_K, min_score=SERIES_VECTOR_MIN_SCORE):
+        return self.search_many([text], k, min_score)[0]
+
+
+def get_index(path=SERIES_INDEX_DIR):
+    """
+    The mapped index, loaded once; None when it was not built, was built for
+    another EMBED_MODEL or cannot be read (logged once).
+    """
+    global _index, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                index = None
+                if (Path(path) / META_FILE).exists():
+                    try:
+                        index = SeriesIndex(path)
+                    except (ImportError, OSError, ValueError, KeyError) as e:
+                        # JSONDecodeError is a ValueError; lexical candidates still work
+                        print(f"Series index {path} unreadable ({type(e).__name__}: {e}); "
+                              f"rebuild it to use vector candidates")
+                if index is not None:
+                    if index.model == EMBED_MODEL:
+                        _index = index
+                    else:
+                        print(f"Series index {path} was built with {index.model!r}, "
+                              f"not EMBED_MODEL {EMBED_MODEL!r}; rebuild it to use vector candidates")
+                _index_loaded = True
+    return _index
+
+
+def reset_index():
+    global _index, _index_loaded
+    with _index_lock:
+        _index, _index_loaded = None, False
+
+
+def vector_candidates(conf_name, k=SERIES_VECTOR_K, min_score=SERIES_VECTOR_MIN_SCORE):
+    """[(slug, stream_iri, name)] by embedding similarity; [] without an index or on errors."""
+    index = get_index()
+    if index is None or not conf_name:
+        return []
+    try:
+        hits = index.search(conf_name, k, min_score)
+    except Exception:
+        # lexical candidates still work; the embedding endpoint may be down
+        current().incr("series_vector_errors")
+        return []
+    current().incr("series_vector_queries")
+    return [hit[:3] for hit in hits]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Embedding index of dblp series names")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="embed all series names")
+    p_build.add_argument("--csv", help="read the extractor CSV instead of the DuckDB table")
+    p_build.add_argument("--out", default=SERIES_INDEX_DIR)
+    p_build.add_argument("--model", default=EMBED_MODEL)
+    p_build.add_argument("--batch", type=int, default=SERIES_EMBED_BATCH)
+    p_query = sub.add_parser("query", help="nearest series of conference names")
+    p_query.add_argument("names", nargs="+")
+    p_query.add_argument("-k", type=int, default=SERIES_VECTOR_K)
+    p_query.add_argument("--index", default=SERIES_INDEX_DIR)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        if args.csv:
+            rows = load_series_rows(csv_path=args.csv)
+        else:
+            from .db_io import connect
+
+            con = connect()
+            try:
+                rows = load_series_rows(con)
+            finally:
+                con.close()
+        build_index(rows, args.out, args.model, args.batch)
+        return
+
+    index = SeriesIndex(args.index)
+    for name, hits in zip(args.names, index.search_many(args.names, args.k, min_score=-1.0)):
+        print(name)
+        for slug, iri, series_name, score in hits:
+            print(f"  {score:6.3f}  {slug:16s} {series_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+Long-running parser service for ingestion jobs that clean strings as records
+arrive. GeoNames index, parse caches, templates and the pooled LLM session
+are loaded once and stay warm between requests.
+
+    python -m confmeta.service [--port 8765 | --socket /run/confmeta.sock] [--link]
+
+- POST /parse      {"strings": [...], "link": false} -> {"rows": [...]}
+                   heuristics + PARSER_MODE parser, row fields as in
+                   names_conference_parsed (series fields with "link": true)
+- POST /normalize  {"conference": raw, "answer": LLM JSON text, "parser": "full"}
+                   -> normalization chain of a stored LLM answer, no LLM call
+- POST /link       {"names": [...]} -> dblp series links (needs --link)
+- GET  /health     parser mode, model, uptime
+- GET  /metrics    per-endpoint latency percentiles, batching, run counters
+                   (?format=prometheus for the text format)
+
+Strings of concurrent requests are collected for SERVICE_BATCH_WAIT_MS (up
+to SERVICE_BATCH_MAX), deduplicated, also against strings already in
+flight, and parsed by STAGE_WORKERS["parse"] threads. DuckDB is opened only
+with --link, since an open connection locks the database file for the
+pipeline.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .config import (
+    LLM_TRANSPORT,
+    MODEL,
+    PARSER_MODE,
+    SERVICE_BATCH_MAX,
+    SERVICE_BATCH_WAIT_MS,
+    SERVICE_CACHE_MAX,
+    SERVICE_HOST,
+    SERVICE_LATENCY_WINDOW,
+    SERVICE_MAX_STRINGS,
+    SERVICE_PORT,
+    SERVICE_SOCKET,
+    STAGE_WORKERS,
+)
+from .benchmark import percentile
+from .metrics import format_prometheus, stage, start_run
+
+ROW_FIELDS = (
+    "raw_conference", "conf_name", "conf_place", "conf_dates", "conf_start_date",
+    "conf_end_date", "conf_year_start", "conf_year_end", "conf_order", "note",
+)
+ENDPOINTS = ("parse", "normalize", "link")
+
+
+class LatencyStats:
+    """Request count, errors and percentiles over the most recent requests."""
+
+    def __init__(self, window=SERVICE_LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.items = 0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds, items=1, ok=True):
+        with self.lock:
+            self.count += 1
+            self.items += items
+            self.errors += not ok
+            self.recent.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            recent = list(self.recent)
+            out = {"requests": self.count, "errors": self.errors, "items": self.items}
+        for p in (50, 95, 99):
+            v = percentile(recent, p)
+            out[f"p{p}_ms"] = round(v * 1000, 3) if v is not None else None
+        out["max_ms"] = round(max(recent) * 1000, 3) if recent else None
+        return out
+
+
+class Batcher:
+    """
+    Collects keys submitted by concurrent requests for up to max_wait_s (or
+    max_batch keys) and runs fn once per distinct key on `workers` threads.
+    Keys already in flight are joined instead of run again.
+    """
+
+    def __init__(self, name, fn, workers=1, max_batch=SERVICE_BATCH_MAX,
+                 max_wait_s=SERVICE_BATCH_WAIT_MS / 1000.0):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max_wait_s
+        self.queue = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix=name)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.keys = 0
+        self.runs = 0
+        self.thread = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, keys):
+        futures = []
+        for key in keys:
+            fut = Future()
+            self.queue.put((key, fut))
+            futures.append(fut)
+        return futures
+
+    def map(self, keys):
+        return [fut.result() for fut in self.submit(keys)]
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait_s
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stop:
+                break
+
+    def _dispatch(self, batch):
+        new = []
+        with self._lock:
+            self.batches += 1
+            self.keys += len(batch)
+            for key, fut in batch:
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    self._inflight[key] = [fut]
+                    new.append(key)
+                else:
+                    waiting.append(fut)
+            self.runs += len(new)
+        for key in new:
+            self.pool.submit(self.fn, key).add_done_callback(
+                lambda done, key=key: self._resolve(key, done)
+            )
+
+    def _resolve(self, key, done):
+        with self._lock:
+            waiting = self._inflight.pop(key, [])
+        err = done.exception()
+        for fut in waiting:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(done.result())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "keys": self.keys,
+                "runs": self.runs,
+                "mean_batch": round(self.keys / self.batches, 2) if self.batches else None,
+                "dedup_rate": round(1 - self.runs / self.keys, 4) if self.keys else None,
+                "inflight": len(self._inflight),
+            }
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.pool.shutdown(wait=True)
+
+
+class ParserService:
+    def __init__(self, parser_mode=PARSER_MODE, link=False, preflight=True, log=print):
+        from .geonames_cities import get_city_country
+        from .parsers import get_parser
+        from .pipeline import template_parser
+
+        self.parser_mode = parser_mode
+        self.log = log
+        self.started_at = time.time()
+        self.run = start_run(parser_mode=parser_mode, model=MODEL, service=True)
+        self.latency = {name: LatencyStats() for name in ENDPOINTS}
+        self.cache_evictions = 0
+        self._trim_lock = threading.Lock()
+
+        t0 = time.perf_counter()
+        with stage("geonames"):
+            n_cities = len(get_city_country())
+        log(f"GeoNames index: {n_cities} city names ({time.perf_counter() - t0:.1f}s)")
+
+        if preflight and LLM_TRANSPORT != "replay":
+            from .llm_client import preflight as llm_preflight
+            models = None
+            if parser_mode == "routed":
+                from .routing import pool_models
+                models = pool_models()
+            self.run.meta["preflight"] = llm_preflight(log=log, models=models)
+
+        parse_fn = get_parser(parser_mode)
+        self.parse_fn, self.templates = template_parser(parse_fn, log=log)
+        self.parser = Batcher("parse", self._parse_one, workers=STAGE_WORKERS.get("parse", 1))
+
+        self.con = None
+        self.linker = None
+        self._local = threading.local()
+        if link:
+            from .db_io import connect, table_exists
+            from .series_link import SERIES_TABLE
+
+            self.con = connect()
+            if not table_exists(self.con, SERIES_TABLE):
+                self.con.close()
+                raise RuntimeError(f"--link needs the '{SERIES_TABLE}' table in the database")
+            self.linker = Batcher("link", self._link_one, workers=1)
+
+    # ---- work functions (run on batcher threads) ----------------------
+
+    def _parse_one(self, raw):
+        from .pipeline import build_row, parse_raw
+
+        parsed, used_llm, deferred = parse_raw(raw, self.parse_fn, self.run, quiet=True)
+        with stage("normalize"):
+            row = build_row(None, None, raw, parsed)
+        self.run.incr("rows")
+        self._trim()
+        out = {k: row[k] for k in ROW_FIELDS}
+        out["used_llm"] = used_llm
+        out["deferred"] = deferred
+        return out
+
+    def _link_one(self, conf_name):
+        from .series_link import link_name
+
+        # one DuckDB cursor per worker thread
+        cur = getattr(self._local, "cursor", None)
+        if cur is None:
+            cur = self._local.cursor = self.con.cursor()
+        with stage("series"):
+            slug, iri, name, reason, path = link_name(cur, conf_name)
+        self.run.incr(f"series_{path}")
+        return {
+            "conf_name": conf_name,
+            "conf_series_slug": slug,
+            "conf_series_stream_iri": iri,
+            "conf_series_name": name,
+            "conf_series_match_reason": reason,
+            "path": path,
+        }
+
+    def _trim(self):
+        """Bound the memory of a long-lived process: raw answers, routing decisions, caches."""
+        from . import fast_llm_parse, llm_parse
+        from .parsers import drain_raw_outputs
+
+        drain_raw_outputs()
+        if self.parser_mode == "routed":
+            from .routing import drain_decisions
+            drain_decisions()
+        for mod in (llm_parse, fast_llm_parse):
+            cache = mod._llm_cache
+            if len(cache) <= SERVICE_CACHE_MAX:
+                continue
+            # evict the oldest tenth, not the whole warm cache; the parsers
+            # read with a single get(), so an eviction is only a cache miss
+            with self._trim_lock:
+                excess = len(cache) - SERVICE_CACHE_MAX + SERVICE_CACHE_MAX // 10
+                for key in list(cache)[:max(0, excess)]:
+                    if cache.pop(key, None) is not None:
+                        self.cache_evictions += 1
+
+    # ---- endpoints ----------------------------------------------------
+
+    def parse(self, body):
+        strings = body.get("strings")
+        if strings is None and "conference" in body:
+            strings = [body["conference"]]
+        if not isinstance(strings, list) or not all(isinstance(s, str) for s in strings):
+            raise ValueError('expected {"strings": [str, ...]}')
+        if len(strings) > SERVICE_MAX_STRINGS:
+            raise ValueError(f"at most {SERVICE_MAX_STRINGS} strings per request")
+        rows = self.parser.map(strings)
+        if body.get("link"):
+            links = self.link({"names": [r["conf_name"] for r in rows]})["links"]
+            rows = [{**row, **{k: v for k, v in ln.items() if k != "conf_name"}} for row, ln in zip(rows, links)]
+        return {"rows": rows}
+
+    def normalize(self, body):
+        from .parsers import get_normalizer
+
+        raw = body.get("conference")
+        answer = body.get("answer")
+        if not isinstance(raw, str) or answer is None:
+            raise ValueError('expected {"conference": str, "answer": LLM JSON text or object}')
+        if not isinstance(answer, str):
+            answer = json.dumps(answer, ensure_ascii=False)
+        with stage("normalize"):
+            parsed = get_normalizer(body.get("parser", "full"))(raw, answer)
+        return {"parsed": parsed}
+
+    def link(self, body):
+        if self.linker is None:
+            raise ValueError("series linking is disabled; start the service with --link")
+        names = body.get("names")
+        if not isinstance(names, list) or not all(isinstance(s, str) for s in names):
+            raise ValueError('expected {"names": [str, ...]}')
+        if len(names) > SERVICE_MAX_STRINGS:
+            raise ValueError(f"at most {SERVICE_MAX_STRINGS} names per request")
+        return {"links": self.linker.map(names)}
+
+    def health(self):
+        return {
+            "ok": True,
+            "parser_mode": self.parser_mode,
+            "model": MODEL,
+            "series_linking": self.linker is not None,
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+
+    def metrics(self):
+        from . import fast_llm_parse, llm_parse
+
+        return {
+            **self.health(),
+            "endpoints": {name: s.snapshot() for name, s in self.latency.items()},
+            "batching": {
+                "parse": self.parser.stats(),
+                **({"link": self.linker.stats()} if self.linker else {}),
+            },
+            "cache": {
+                "llm_parse": len(llm_parse._llm_cache),
+                "fast_llm_parse": len(fast_llm_parse._llm_cache),
+                "evictions": self.cache_evictions,
+                "template_hits": self.templates.hits if self.templates is not None else None,
+            },
+            "run": self.run.summary(),
+        }
+
+    def prometheus(self):
+        lines = [
+            "# HELP confmeta_service_requests Requests per endpoint since start.",
+            "# TYPE confmeta_service_requests counter",
+        ]
+        snaps = {name: s.snapshot() for name, s in self.latency.items()}
+        for name, s in snaps.items():
+            lines.append(f'confmeta_service_requests{{endpoint="{name}"}} {s["requests"]}')
+            lines.append(f'confmeta_service_requests{{endpoint="{name}",status="error"}} {s["errors"]}')
+        lines += [
+            "# HELP confmeta_service_latency_ms Request latency over the recent window.",
+            "# TYPE confmeta_service_latency_ms gauge",
+        ]
+        for name, s in snaps.items():
+            for p in (50, 95, 99):
+                if s[f"p{p}_ms"] is not None:
+                    lines.append(
+                        f'confmeta_service_latency_ms{{endpoint="{name}",quantile="0.{p}"}} {s[f"p{p}_ms"]}'
+                    )
+        lines += [
+            "# HELP confmeta_service_batch Batcher totals (batches, keys, runs).",
+            "# TYPE confmeta_service_batch counter",
+        ]
+        batchers = {"parse": self.parser, "link": self.linker}
+        for name, b in batchers.items():
+            if b is not None:
+                st = b.stats()
+                for k in ("batches", "keys", "runs"):
+                    lines.append(f'confmeta_service_batch{{batcher="{name}",field="{k}"}} {st[k]}')
+        return format_prometheus(self.run) + "\n".join(lines) + "\n"
+
+    def close(self):
+        self.parser.close()
+        if self.linker is not None:
+            self.linker.close()
+        if self.con is not None:
+            self.con.close()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None  # set by make_server
+    protocol_version = "HTTP/1.1"  # keep-alive for pooled clients
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, obj, status=200):
+        self._send(json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8"), "application/json", status)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(self.service.health())
+        elif url.path == "/metrics":
+            if parse_qs(url.query).get("format") == ["prometheus"]:
+                self._send(self.service.prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+            else:
+                self._send_json(self.service.metrics())
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        name = urlparse(self.path).path.strip("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length)
+        if name not in ENDPOINTS:
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        t0 = time.perf_counter()
+        status, items = 200, 0
+        try:
+            body = json.loads(raw_body or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("expected a JSON object")
+            result = getattr(self.service, name)(body)
+            items = len(next(iter(result.values()))) if name != "normalize" else 1
+        except ValueError as e:  # also bad JSON (JSONDecodeError)
+            status, result = 400, {"error": str(e)}
+        except Exception as e:
+            status, result = 500, {"error": f"{type(e).__name__}: {e}"}
+        self.service.latency[name].add(time.perf_counter() - t0, items=items, ok=status == 200)
+        self._send_json(result, status=status)
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=SERVICE_SOCKET):
+    """Build (not start) the HTTP server; TCP, or a Unix socket when socket_path is set."""
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="confmeta parser service")
+    ap.add_argument("--host", default=SERVICE_HOST)
+    ap.add_argument("--port", type=int, default=SERVICE_PORT)
+    ap.add_argument("--socket", default=SERVICE_SOCKET, help="listen on this Unix socket instead of TCP")
+    ap.add_argument("--mode", default=PARSER_MODE, help="parser mode (default PARSER_MODE)")
+    ap.add_argument("--link", action="store_true", help="enable /link (opens the DuckDB database)")
+    ap.add_argument("--no-preflight", action="store_true", help="skip the LLM health check and warm-up")
+    args = ap.parse_args(argv)
+
+    try:
+        service = ParserService(args.mode, link=args.link, preflight=not args.no_preflight)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    server = make_server(service, args.host, args.port, args.socket)
+    where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{server.server_address[1]}"
+    print(f"confmeta service ({args.mode}) listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Shard helpers and the merge step.
+
+Run shards (on one or several machines, each with its own Ollama):
+    python -m confmeta.pipeline --shard 0/4 --shard-out parquet --out-dir shards/
+    ...
+    python -m confmeta.pipeline --shard 3/4 --shard-out parquet --out-dir shards/
+
+Merge (checks that no (pid, name_seq) is duplicated or missing):
+    python -m confmeta.shards merge --n 4 --parquet-dir shards/
+
+Parquet shards open the source DB read-only, so several of them can run
+against one DuckDB file. Each writes its run metrics, raw LLM answers,
+routing decisions and series links to its own confmeta.shard-i-of-N.duckdb
+next to the Parquet file; the merge appends those to the source DB.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+PARSED_TABLE = "names_conference_parsed"
+
+
+def parse_shard(spec: str):
+    """'i/N' -> (i, N) with 0 <= i < N."""
+    try:
+        i_str, n_str = spec.split("/")
+        i, n = int(i_str), int(n_str)
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}")
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"shard index out of range: {spec!r}")
+    return i, n
+
+
+def shard_table(i, n, base=PARSED_TABLE):
+    return f"{base}_shard_{i}_of_{n}"
+
+
+def shard_parquet(out_dir, i, n, base=PARSED_TABLE):
+    return Path(out_dir) / f"{base}.shard-{i}-of-{n}.parquet"
+
+
+def shard_store(out_dir, i, n):
+    """Per-shard DuckDB file for the side tables of a Parquet shard."""
+    return Path(out_dir) / f"confmeta.shard-{i}-of-{n}.duckdb"
+
+
+def connect_shard_store(out_dir, i, n):
+    import duckdb
+
+    path = shard_store(out_dir, i, n)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return duckdb.connect(str(path))
+
+
+def _shard_sources(con, n, parquet_dir):
+    """SQL relation per shard; raises if a shard is missing."""
+    sources = []
+    missing = []
+    for i in range(n):
+        if parquet_dir:
+            path = shard_parquet(parquet_dir, i, n)
+            if not path.exists():
+                missing.append(str(path))
+                continue
+            escaped = str(path).replace("'", "''")
+            sources.append((i, f"read_parquet('{escaped}')"))
+        else:
+            table = shard_table(i, n)
+            exists = con.execute(
+                "SELECT count(*) FROM information_schema.tables WHERE table_name = ?",
+                [table],
+            ).fetchone()[0]
+            if not exists:
+                missing.append(table)
+                continue
+            sources.append((i, table))
+    if missing:
+        raise FileNotFoundError(f"missing shard outputs: {', '.join(missing)}")
+    return sources
+
+
+def merge_shards(con, n, parquet_dir=None, allow_missing=False, drop_shards=False):
+    """
+    Union all shard outputs into names_conference_parsed.
+    Returns a dict of check counts; raises ValueError when a check fails.
+    """
+    from .db_io import SHARD_HASH_SQL
+
+    sources = _shard_sources(con, n, parquet_dir)
+    union = " UNION ALL ".join(
+        f"SELECT *, {i} AS _shard FROM {src}" for i, src in sources
+    )
+    con.execute(f"CREATE OR REPLACE TEMP TABLE _merged AS {union}")
+
+    rows = con.execute("SELECT count(*) FROM _merged").fetchone()[0]
+    duplicates = con.execute("""
+        SELECT count(*) FROM (
+            SELECT pid, name_seq FROM _merged
+            GROUP BY pid, name_seq HAVING count(*) > 1
+        )
+    """).fetchone()[0]
+    misplaced = con.execute(f"""
+        SELECT count(*) FROM _merged
+        WHERE NOT ({SHARD_HASH_SQL.format(i="_shard", n=int(n))})
+    """).fetchone()[0]
+    missing = con.execute("""
+        SELECT count(*) FROM names_conference s
+        WHERE s.conference IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM _merged m
+              WHERE m.pid = s.pid AND m.name_seq = s.name_seq
+          )
+    """).fetchone()[0]
+
+    report = {
+        "shards": len(sources),
+        "rows": rows,
+        "duplicates": duplicates,
+        "misplaced": misplaced,
+        "missing": missing,
+    }
+    problems = []
+    if duplicates:
+        problems.append(f"{duplicates} duplicated (pid, name_seq)")
+    if misplaced:
+        problems.append(f"{misplaced} rows in the wrong shard")
+    if missing and not allow_missing:
+        problems.append(f"{missing} source rows missing")
+    if problems:
+        raise ValueError("shard merge failed: " + "; ".join(problems))
+
+    con.execute(f"DROP TABLE IF EXISTS {PARSED_TABLE}")
+    con.execute(f"CREATE TABLE {PARSED_TABLE} AS SELECT * EXCLUDE (_shard) FROM _merged")
+    con.execute("DROP TABLE _merged")
+    if drop_shards and not parquet_dir:
+        for _, table in sources:
+            con.execute(f"DROP TABLE IF EXISTS {table}")
+    return report
+
+
+def merge_shard_stores(con, n, parquet_dir):
+    """
+    Append the side tables of each shard store in parquet_dir to con.
+    Returns {table: rows}; shards without a store file are skipped.
+    """
+    from .db_io import RAW_OUTPUTS_DDL
+    from .metrics import ensure_run_table
+    from .routing import ROUTING_DDL, ROUTING_TABLE
+    from .series_link import LINKS_TABLE, ensure_links_table
+
+    ensure = {
+        "pipeline_runs": ensure_run_table,
+        "llm_raw_outputs": lambda c: c.execute(RAW_OUTPUTS_DDL),
+        ROUTING_TABLE: lambda c: c.execute(ROUTING_DDL),
+        LINKS_TABLE: ensure_links_table,
+    }
+    counts = {}
+    for i in range(n):
+        path = shard_store(parquet_dir, i, n)
+        if not path.exists():
+            continue
+        escaped = str(path).replace("'", "''")
+        con.execute(f"ATTACH '{escaped}' AS _shard_store (READ_ONLY)")
+        try:
+            for table, create in ensure.items():
+                present = con.execute(
+                    "SELECT count(*) FROM information_schema.tables "
+                    "WHERE table_catalog = '_shard_store' AND table_name = ?",
+                    [table],
+                ).fetchone()[0]
+                if not present:
+                    continue
+                create(con)
+                src = f"_shard_store.main.{table}"
+                if table == "llm_raw_outputs":
+                    # one answer per key, as in write_raw_outputs
+                    con.execute(f"""
+                        DELETE FROM {table} t
+                        WHERE EXISTS (
+                            SELECT 1 FROM {src} d
+                            WHERE d.conference = t.conference AND d.parser = t.parser
+                              AND d.model = t.model AND d.prompt_version = t.prompt_version
+                        )
+                    """)
+                verb = "INSERT OR REPLACE" if table == LINKS_TABLE else "INSERT"
+                con.execute(f"{verb} INTO {table} BY NAME SELECT * FROM {src}")
+                counts[table] = counts.get(table, 0) + con.execute(
+                    f"SELECT count(*) FROM {src}"
+                ).fetchone()[0]
+        finally:
+            con.execute("DETACH _shard_store")
+    return counts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="confmeta shard tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("merge", help="merge shard outputs into names_conference_parsed")
+    m.add_argument("--n", type=int, required=True, help="number of shards")
+    m.add_argument("--parquet-dir", help="read shard Parquet files instead of tables")
+    m.add_argument("--allow-missing", action="store_true",
+                   help="do not fail on source rows absent from every shard")
+    m.add_argument("--drop-shards", action="store_true", help="drop shard tables after merging")
+    args = ap.parse_args(argv)
+
+    from .db_io import connect
+
+    con = connect()
+    try:
+        report = merge_shards(
+            con,
+            args.n,
+            parquet_dir=args.parquet_dir,
+            allow_missing=args.allow_missing,
+            drop_shards=args.drop_shards,
+        )
+    except (ValueError, FileNotFoundError) as e:
+        print(e)
+        con.close()
+        sys.exit(1)
+    side = merge_shard_stores(con, args.n, args.parquet_dir) if args.parquet_dir else {}
+    con.close()
+    print(
+        f"Merged {report['shards']} shards: {report['rows']} rows, "
+        f"{report['duplicates']} duplicates, {report['missing']} missing "
+        f"-> {PARSED_TABLE}"
+    )
+    if side:
+        print("Merged shard stores: " + ", ".join(f"{t}={k}" for t, k in side.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Staged streaming pipeline: fetch -> prefilter -> parse -> normalize -> write,
+each stage on its own worker threads, connected by bounded queues.
+
+A full queue blocks its producer (backpressure), so at most
+STAGE_QUEUE_SIZE items wait between two stages and memory stays flat; the
+write stage appends batches of WRITE_BATCH_ROWS rows to DuckDB while later
+rows are still being parsed. Per stage the run report shows busy time,
+utilization (busy / (wall x workers)), queue depth and the time producers
+spent blocked on a full queue: the bottleneck is the stage with high
+utilization whose input queue is full.
+
+    python -m confmeta.pipeline --quiet --staged
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .config import (
+    MAX_ROWS,
+    NEAR_DUP,
+    PARSER_MODE,
+    STAGE_WORKERS,
+    STAGE_QUEUE_SIZE,
+    WRITE_BATCH_ROWS,
+)
+from .metrics import stage
+
+_DONE = object()
+
+
+class _Aborted(Exception):
+    pass
+
+
+class Stage:
+    """
+    fn(item) -> item for the next stage, or None to drop it.
+    on_close() runs once, after the last worker of the stage finished.
+    """
+
+    def __init__(self, name, fn, workers=1, on_close=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.on_close = on_close
+        self.items = 0
+        self.busy_s = 0.0
+        self.blocked_s = 0.0  # waiting on a full output queue
+        self._lock = threading.Lock()
+        self._alive = self.workers
+
+    def add(self, busy, blocked=0.0):
+        with self._lock:
+            self.items += 1
+            self.busy_s += busy
+            self.blocked_s += blocked
+
+    def worker_done(self):
+        with self._lock:
+            self._alive -= 1
+            return self._alive == 0
+
+
+class QueueStats:
+    def __init__(self, q):
+        self.q = q
+        self.max_depth = 0
+        self.depth_sum = 0
+        self.samples = 0
+
+    def sample(self):
+        d = self.q.qsize()
+        self.max_depth = max(self.max_depth, d)
+        self.depth_sum += d
+        self.samples += 1
+
+    @property
+    def mean_depth(self):
+        return self.depth_sum / self.samples if self.samples else 0.0
+
+
+class StagedRunner:
+    def __init__(self, stages, queue_size=STAGE_QUEUE_SIZE, sample_interval=0.1):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.sample_interval = sample_interval
+        # queues[i] feeds stages[i]
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.queue_stats = [QueueStats(q) for q in self.queues]
+        self.source_stage = Stage("fetch", None)
+        self.abort = threading.Event()
+        self.error = None
+        self.wall_s = 0.0
+
+    def _put(self, q, item):
+        """Blocking put that gives up when the run is aborted; returns seconds blocked."""
+        t0 = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return time.perf_counter() - t0
+            except queue.Full:
+                if self.abort.is_set():
+                    raise _Aborted()
+
+    def _get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self.abort.is_set():
+                    raise _Aborted()
+
+    def _fail(self, exc):
+        if self.error is None:
+            self.error = exc
+        self.abort.set()
+
+    def _feed(self, source):
+        st = self.source_stage
+        out = self.queues[0]
+        it = iter(source)
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                busy = time.perf_counter() - t0
+                st.add(busy, self._put(out, item))
+            self._put(out, _DONE)
+        except _Aborted:
+            pass
+        except Exception as e:
+            self._fail(e)
+
+    def _work(self, i):
+        st = self.stages[i]
+        q_in = self.queues[i]
+        q_out = self.queues[i + 1] if i + 1 < len(self.queues) else None
+        try:
+            while True:
+                item = self._get(q_in)
+                if item is _DONE:
+                    self._put(q_in, _DONE)  # let sibling workers see it too
+                    break
+                t0 = time.perf_counter()
+                out = st.fn(item)
+                busy = time.perf_counter() - t0
+                blocked = self._put(q_out, out) if q_out is not None and out is not None else 0.0
+                st.add(busy, blocked)
+        except _Aborted:
+            return
+        except Exception as e:
+            self._fail(e)
+            return
+        if st.worker_done():
+            try:
+                if st.on_close:
+                    st.on_close()
+                if q_out is not None:
+                    self._put(q_out, _DONE)
+            except _Aborted:
+                pass
+            except Exception as e:
+                self._fail(e)
+
+    def _monitor(self, stop):
+        while not stop.wait(self.sample_interval):
+            for qs in self.queue_stats:
+                qs.sample()
+
+    def run(self, source):
+        """Drive `source` (an iterable of items) through all stages; re-raises the first error."""
+        t0 = time.perf_counter()
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._feed, args=(source,), name="stage-fetch", daemon=True)]
+        for i, st in enumerate(self.stages):
+            for w in range(st.workers):
+                threads.append(
+                    threading.Thread(target=self._work, args=(i,), name=f"stage-{st.name}-{w}", daemon=True)
+                )
+        monitor = threading.Thread(target=self._monitor, args=(stop,), daemon=True)
+        monitor.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stop.set()
+        monitor.join()
+        self.wall_s = time.perf_counter() - t0
+        if self.error is not None:
+            raise self.error
+
+    def summary(self):
+        wall = self.wall_s or 1e-9
+        out = []
+        for st, qs in zip([self.source_stage] + self.stages, [None] + self.queue_stats):
+            out.append({
+                "stage": st.name,
+                "workers": st.workers,
+                "items": st.items,
+                "busy_s": round(st.busy_s, 3),
+                "utilization": round(st.busy_s / (wall * st.workers), 3),
+                "blocked_s": round(st.blocked_s, 3),
+                "queue_max": qs.max_depth if qs else None,
+                "queue_mean": round(qs.mean_depth, 1) if qs else None,
+            })
+        return out
+
+    def format_report(self):
+        lines = [
+            f"Stages (wall {self.wall_s:.1f}s, queue size {self.queue_size}):",
+            f"  {'stage':10s} {'workers':>7s} {'items':>8s} {'busy_s':>8s} {'util':>6s} "
+            f"{'in-queue max/mean':>18s} {'blocked_s':>9s}",
+        ]
+        for s in self.summary():
+            q = "-" if s["queue_max"] is None else f"{s['queue_max']}/{s['queue_mean']}"
+            lines.append(
+                f"  {s['stage']:10s} {s['workers']:7d} {s['items']:8d} {s['busy_s']:8.1f} "
+                f"{s['utilization']:6.1%} {q:>18s} {s['blocked_s']:9.1f}"
+            )
+        return "\n".join(lines)
+
+
+def run_staged_pipeline(args, con, parse_fn, run, linker=None, workers=STAGE_WORKERS, log=print, store=None):
+    """
+    Staged variant of the pipeline.main row loop. Writes to the same target
+    as the sequential path; returns (target, rows to re-submit to the linker).
+    store: writable connection for the work table when con is read-only.
+    """
+    import pandas as pd
+
+    from .db_io import (
+        conference_selection_sql,
+        iter_rows,
+        create_parsed_table,
+        append_rows,
+        upsert_parsed_rows,
+    )
+    from .breaker import retry_deferred
+    from .pipeline import (
+        needs_llm,
+        heuristic_parse,
+        parse_raw,
+        build_row,
+        near_dup_parser,
+    )
+    from .progress import ProgressLine, RowLog
+    from .shards import shard_table, shard_parquet
+
+    sql = conference_selection_sql(args.limit if args.shard else (args.limit or MAX_ROWS), args.shard)
+    if not args.shard:
+        # fix the random sample so counting and streaming see the same rows
+        # (a plain table: TEMP tables are not visible to other cursors)
+        with stage("fetch"):
+            con.execute(f"CREATE OR REPLACE TABLE _staged_selection AS {sql}")
+        sql = "SELECT pid, name_seq, conference FROM _staged_selection"
+    with stage("fetch"):
+        counts = dict(con.execute(
+            f"SELECT conference, count(*) FROM ({sql}) GROUP BY conference"
+        ).fetchall())
+    total = sum(counts.values())
+    shard_txt = f", shard {args.shard[0]}/{args.shard[1]}" if args.shard else ""
+    log(f"Streaming {total} conference rows through stages (parser: {PARSER_MODE}{shard_txt})")
+
+    if NEAR_DUP:
+        parse_fn = near_dup_parser(parse_fn, None, run, counts=counts, log=log)
+
+    parquet_target = None
+    if args.shard and args.shard_out == "parquet":
+        parquet_target = shard_parquet(args.out_dir, *args.shard)
+        table = "_staged_output"
+    elif args.shard:
+        table = shard_table(*args.shard)
+    else:
+        table = "names_conference_parsed"
+    out = store or con
+    create_parsed_table(out, table)
+
+    writer = out.cursor()
+    progress = ProgressLine(total)
+    row_log = RowLog(args.row_log)
+    buffer = []
+    deferred = []  # (pid, name_seq, raw)
+    seq = [0]
+
+    def prefilter(item):
+        pid, name_seq, raw = item
+        with stage("heuristics"):
+            use_llm = needs_llm(raw)
+        return {"pid": int(pid), "name_seq": int(name_seq), "raw": raw, "use_llm": use_llm}
+
+    inflight = {}  # raw -> Future of (parsed, deferred), while a worker parses it
+    inflight_lock = threading.Lock()
+
+    def parse_once(raw):
+        """parse_raw, shared by the parse workers that see raw at the same time."""
+        with inflight_lock:
+            fut = inflight.get(raw)
+            owner = fut is None
+            if owner:
+                fut = inflight[raw] = Future()
+        if not owner:
+            run.incr("llm_rows")
+            run.incr("llm_inflight_shared")
+            parsed, was_deferred = fut.result()
+            return dict(parsed), was_deferred
+        try:
+            parsed, _, was_deferred = parse_raw(raw, parse_fn, run, quiet=True, use_llm=True)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result((parsed, was_deferred))
+        finally:
+            with inflight_lock:
+                del inflight[raw]
+        return parsed, was_deferred
+
+    def parse(item):
+        if item["use_llm"]:
+            parsed, was_deferred = parse_once(item["raw"])
+        else:
+            parsed, was_deferred = heuristic_parse(item["raw"]), False
+        item["parsed"] = parsed
+        item["deferred"] = was_deferred
+        return item
+
+    def normalize(item):
+        with stage("normalize"):
+            item["row"] = build_row(item["pid"], item["name_seq"], item["raw"], item["parsed"])
+        run.incr("rows")
+        return item
+
+    def flush():
+        if buffer:
+            append_rows(writer, pd.DataFrame(buffer), table)
+            buffer.clear()
+
+    def write(item):
+        row = item["row"]
+        seq[0] += 1
+        buffer.append(row)
+        if item["deferred"]:
+            deferred.append((row["pid"], row["name_seq"], row["raw_conference"]))
+        elif linker:
+            linker.submit(row["conf_name"], row["conf_dates"])
+        row_log.write({"i": seq[0], "llm": item["use_llm"], **row})
+        progress.update(extra=f"llm={run.counters['llm_rows']}")
+        if len(buffer) >= WRITE_BATCH_ROWS:
+            flush()
+        return None
+
+    runner = StagedRunner([
+        Stage("prefilter", prefilter, workers.get("prefilter", 1)),
+        Stage("parse", parse, workers.get("parse", 1)),
+        Stage("normalize", normalize, workers.get("normalize", 1)),
+        Stage("write", write, 1, on_close=flush),
+    ])
+    try:
+        runner.run(iter_rows(con, sql))
+    finally:
+        progress.close()
+        row_log.close()
+    if not args.shard:
+        con.execute("DROP TABLE IF EXISTS _staged_selection")
+    run.meta["stages"] = runner.summary()
+    log(runner.format_report())
+
+    relink = []
+    if deferred:
+        raws = [raw for _, _, raw in deferred]
+        log(f"Retrying {len(deferred)} deferred rows ({len(set(raws))} distinct strings)")
+        parsed_by_raw, errors, pending = retry_deferred(raws, parse_fn, log=log)
+        fixed = []
+        for pid, name_seq, raw in deferred:
+            if raw in parsed_by_raw:
+                run.incr("llm_retry_recovered")
+                parsed = parsed_by_raw[raw]
+            elif raw in errors:
+                parsed = heuristic_parse(raw, note=f"LLM error: {errors[raw]}")
+            else:
+                continue
+            with stage("normalize"):
+                fixed.append(build_row(pid, name_seq, raw, parsed))
+        if fixed:
+            upsert_parsed_rows(writer, pd.DataFrame(fixed), table)
+        relink = fixed
+        log(
+            f"Retry pass: {run.counters.get('llm_retry_recovered', 0)} recovered, "
+            f"{len(errors)} errors, {len(pending)} strings still unavailable"
+        )
+    writer.close()
+
+    if parquet_target is not None:
+        parquet_target.parent.mkdir(parents=True, exist_ok=True)
+        path = str(parquet_target).replace("'", "''")
+        with stage("write"):
+            out.execute(f"COPY {table} TO '{path}' (FORMAT PARQUET)")
+            out.execute(f"DROP TABLE {table}")
+        return parquet_target, relink
+    if not args.shard:
+        con.execute(f"SELECT * FROM {table}").fetch_df().to_csv(
+            "names_conference_parsed_sample.csv", index=False
+        )
+    return table, relink
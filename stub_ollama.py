@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the Ollama HTTP API, for benchmarks and offline runs.
+
+- POST /api/generate  (stream true/false) answers conference-parsing prompts
+  from the golden fixture set, series prompts with chosen_index = null.
+- POST /api/embed     deterministic hashed character-trigram vectors
+                      (EMBED_DIM), so lexically close names are close.
+- GET  /api/tags      lists the served model names (--models, for routed runs).
+- GET  /stub/stats    request counters.
+
+Latency per request is latency_ms (+ uniform jitter_ms); streamed answers
+spread it over the chunks. --parallel N serves at most N generate requests
+at a time (like OLLAMA_NUM_PARALLEL) and options.num_predict cuts answers at
+about 4 characters per token, so the tuner sees truncation offline.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+GOLDEN_PATH = Path(__file__).parent / "fixtures" / "golden_conferences.jsonl"
+
+RAW_MARKER = "Raw conference string:\n"
+EMBED_DIM = 256
+
+
+def load_golden(path=GOLDEN_PATH):
+    records = []
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def extract_raw(prompt: str):
+    i = prompt.rfind(RAW_MARKER)
+    if i == -1:
+        return None
+    raw = prompt[i + len(RAW_MARKER):]
+    j = raw.rfind("\n\nJSON:")
+    return raw[:j] if j != -1 else raw.strip()
+
+
+class StubState:
+    def __init__(self, answers, latency_ms=0.0, jitter_ms=0.0, models=("llama3:8b",), parallel=0):
+        self.answers = answers
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.models = list(models)
+        self.slots = threading.Semaphore(parallel) if parallel else None
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.generate_requests = 0
+
+    def count(self, path):
+        with self.lock:
+            self.requests += 1
+            if path == "/api/generate":
+                self.generate_requests += 1
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.generate_requests = 0
+
+    def slot(self):
+        return self.slots if self.slots is not None else nullcontext()
+
+    def delay(self):
+        ms = self.latency_ms + random.uniform(0, self.jitter_ms)
+        return max(ms, 0.0) / 1000.0
+
+    def answer(self, prompt: str):
+        raw = extract_raw(prompt)
+        if raw is None:
+            # dblp series re-ranking prompt
+            return json.dumps({"chosen_index": None, "reason": "stub server"})
+        obj = self.answers.get(raw)
+        if obj is None:
+            obj = {"conf_name": raw, "conf_place": "", "conf_dates": ""}
+        obj = dict(obj)
+        obj.setdefault("note", "stub answer")
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def stub_embedding(text, dim=EMBED_DIM):
+    """L2-normalized counts of hashed character trigrams of " text "."""
+    vec = [0.0] * dim
+    t = f" {' '.join(str(text).lower().split())} "
+    for i in range(len(t) - 2):
+        vec[zlib.crc32(t[i:i + 3].encode("utf-8")) % dim] += 1.0
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def _done_stats(prompt: str, text: str, seconds: float, truncated=False):
+    ns = int(seconds * 1e9)
+    return {
+        "done": True,
+        "done_reason": "length" if truncated else "stop",
+        "total_duration": ns,
+        "load_duration": 0,
+        "prompt_eval_count": max(1, len(prompt) // 4),
+        "prompt_eval_duration": ns // 10,
+        "eval_count": max(1, len(text) // 4),
+        "eval_duration": ns - ns // 10,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None  # set by make_server
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.state.count(self.path)
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": m} for m in self.state.models]})
+        elif self.path == "/stub/stats":
+            self._send_json({
+                "requests": self.state.requests,
+                "generate_requests": self.state.generate_requests,
+            })
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        self.state.count(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/api/embed":
+            texts = payload.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+            self._send_json({
+                "model": payload.get("model", ""),
+                "embeddings": [stub_embedding(t) for t in texts],
+            })
+            return
+        if self.path != "/api/generate":
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        prompt = payload.get("prompt", "")
+        model = payload.get("model", "")
+        text = self.state.answer(prompt) if prompt else ""
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        truncated = bool(num_predict and num_predict > 0 and len(text) > num_predict * 4)
+        if truncated:
+            text = text[:num_predict * 4]
+        with self.state.slot():
+            self._generate(payload, prompt, model, text, self.state.delay(), truncated)
+
+    def _generate(self, payload, prompt, model, text, delay, truncated):
+        if not payload.get("stream", True):
+            time.sleep(delay)
+            obj = {"model": model, "response": text}
+            obj.update(_done_stats(prompt, text, delay, truncated))
+            self._send_json(obj)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        per_chunk = delay / len(chunks)
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            line = json.dumps({"model": model, "response": chunk, "done": False})
+            self.wfile.write(line.encode("utf-8") + b"\n")
+        final = {"model": model, "response": ""}
+        final.update(_done_stats(prompt, text, delay, truncated))
+        self.wfile.write(json.dumps(final).encode("utf-8") + b"\n")
+
+
+def make_server(host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, golden_path=GOLDEN_PATH,
+                models=None, parallel=0):
+    """
+    Build (not start) a stub server. port=0 picks a free port;
+    the generate URL is f"http://{host}:{server.server_address[1]}/api/generate".
+    """
+    answers = {
+        rec["conference"]: rec["llm"]
+        for rec in load_golden(golden_path)
+        if rec.get("llm")
+    }
+    state = StubState(answers, latency_ms=latency_ms, jitter_ms=jitter_ms, parallel=parallel)
+    if models:
+        state.models = list(models)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_in_thread(**kwargs):
+    server = make_server(**kwargs)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/api/generate"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stub Ollama server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--models", nargs="+", help="model names listed by /api/tags")
+    ap.add_argument("--parallel", type=int, default=0, help="generate requests served at once (0 = no limit)")
+    args = ap.parse_args()
+
+    server = make_server(
+        args.host, args.port, args.latency_ms, args.jitter_ms, models=args.models, parallel=args.parallel
+    )
+    print(f"Stub Ollama listening on http://{args.host}:{args.port}/api/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Synthetic names_conference DuckDB for scale tests without kth_metadata.duckdb.
+
+Distinct strings are generated in Python from templates modelled on the
+golden fixture (series names and acronyms from the dblp series CSV, cities
+from the GeoNames file, several date formats, "as part of" and proceedings
+prefixes) plus noise: HTML tags, long digit runs, bare acronyms, over-long
+strings, stray whitespace. Rows are then expanded in DuckDB: row i draws
+string floor(distinct * u^skew) for a hash-uniform u, so a few strings cover
+many records, as in the real table.
+
+    python -m confmeta.synthetic --rows 1000000 --out synth.duckdb
+    CONFMETA_DB_PATH=synth.duckdb python -m confmeta.pipeline --dry-run
+"""
+import argparse
+import csv
+import random
+import time
+from pathlib import Path
+
+from .config import GEONAMES_CITIES_PATH
+from .regex_utils import US_STATE_FULL_TO_ABBR
+
+DEFAULT_DISTINCT = 0.3  # distinct strings per row
+DEFAULT_SKEW = 2.0      # 1 = uniform reuse; higher = more mass on few strings
+DEFAULT_NOISE = 0.05    # share of distinct strings that are noise
+DEFAULT_NULLS = 0.005   # share of rows with conference NULL
+NAMES_PER_PID = 3
+CHUNK = 200_000
+
+SERIES_FALLBACK = [
+    ("ICC", "IEEE International Conference on Communications"),
+    ("ICASSP", "IEEE International Conference on Acoustics, Speech and Signal Processing"),
+    ("HRI", "ACM/IEEE International Conference on Human-Robot Interaction"),
+    ("DIS", "ACM Conference on Designing Interactive Systems"),
+    ("NOCS", "IEEE/ACM International Symposium on Networks-on-Chip"),
+    ("UIST", "ACM Symposium on User Interface Software and Technology"),
+    ("CDC", "IEEE Conference on Decision and Control"),
+    ("ACC", "American Control Conference"),
+    ("ISPSD", "International Symposium on Power Semiconductor Devices"),
+    ("GlobalSIP", "IEEE Global Conference on Signal and Information Processing"),
+    ("NordiCHI", "Nordic Conference on Human-Computer Interaction"),
+    ("ICWE", "International Conference on Wind Engineering"),
+    ("ECCOMAS", "European Congress on Computational Methods in Applied Sciences and Engineering"),
+    ("SmartGridComm", "IEEE International Conference on Smart Grid Communications"),
+    ("ICML", "International Conference on Machine Learning"),
+    ("CHI", "ACM Conference on Human Factors in Computing Systems"),
+    ("INFOCOM", "IEEE International Conference on Computer Communications"),
+    ("ECC", "European Control Conference"),
+]
+
+CITIES_FALLBACK = [
+    ("Kyoto", "Japan"), ("Anchorage", "USA"), ("Singapore", "Singapore"),
+    ("Melbourne", "Australia"), ("San Diego", "USA"), ("Denver", "USA"),
+    ("Torino", "Italy"), ("Jyväskylä", "Finland"), ("Parma", "Italy"),
+    ("Stavanger", "Norway"), ("Gothenburg", "Sweden"), ("Göteborg", "Sweden"),
+    ("Sydney", "Australia"), ("Strasbourg", "France"), ("Reykjavik", "Iceland"),
+    ("Busan", "Korea"), ("Dublin", "Ireland"), ("Lisbon", "Portugal"),
+    ("Barcelona", "Spain"), ("Ottawa", "Canada"), ("Beijing", "China"),
+    ("Stockholm", "Sweden"), ("Montréal", "Canada"), ("München", "Germany"),
+]
+
+US_CITIES_FALLBACK = [("San Diego", "CA"), ("Denver", "CO"), ("Austin", "TX"),
+                      ("San Francisco", "CA"), ("New York", "NY"), ("Waikoloa", "HI"),
+                      ("Anchorage", "AK"), ("Boston", "MA"), ("Seattle", "WA")]
+
+US_STATE_NAMES = {abbr: full.title().replace(" Of ", " of ") for full, abbr in US_STATE_FULL_TO_ABBR.items()}
+
+# ISO-2 code (GeoNames country code column) -> country as written in DiVA strings;
+# countryInfo.txt next to the cities file adds the codes missing here
+COUNTRY_NAMES = {
+    "AR": "Argentina", "AT": "Austria", "AU": "Australia", "BE": "Belgium", "BR": "Brazil",
+    "CA": "Canada", "CH": "Switzerland", "CL": "Chile", "CN": "China", "CY": "Cyprus",
+    "CZ": "Czech Republic", "DE": "Germany", "DK": "Denmark", "EE": "Estonia", "EG": "Egypt",
+    "ES": "Spain", "FI": "Finland", "FR": "France", "GB": "UK", "GR": "Greece",
+    "HK": "Hong Kong", "HR": "Croatia", "HU": "Hungary", "ID": "Indonesia", "IE": "Ireland",
+    "IL": "Israel", "IN": "India", "IS": "Iceland", "IT": "Italy", "JP": "Japan",
+    "KR": "Korea", "LT": "Lithuania", "LU": "Luxembourg", "LV": "Latvia", "MA": "Morocco",
+    "MT": "Malta", "MX": "Mexico", "MY": "Malaysia", "NL": "The Netherlands", "NO": "Norway",
+    "NZ": "New Zealand", "PL": "Poland", "PT": "Portugal", "RO": "Romania", "RS": "Serbia",
+    "RU": "Russia", "SE": "Sweden", "SG": "Singapore", "SI": "Slovenia", "SK": "Slovakia",
+    "TH": "Thailand", "TR": "Turkey", "TW": "Taiwan", "UA": "Ukraine", "US": "USA",
+    "VN": "Vietnam", "ZA": "South Africa",
+}
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+
+ORDINAL_WORDS = ["First", "Second", "Third", "Fourth", "Fifth", "Sixth", "Seventh",
+                 "Eighth", "Ninth", "Tenth", "Eleventh", "Twelfth"]
+
+TOPICS = ["Machine Learning", "Signal Processing", "Computer Vision", "Wind Engineering",
+          "Software Engineering", "Power Electronics", "Formal Methods", "Robotics",
+          "Concrete Research", "Computational Mechanics", "Information Retrieval",
+          "Fatigue Crack Paths", "Agent-Oriented Software Engineering", "Coupled Problems"]
+
+
+def load_series(path=None, limit=20000):
+    """[(acronym, series name)] from dblp_conference_series.csv, else a built-in list."""
+    path = Path(path or Path(__file__).parent / "dblp_conference_series.csv")
+    if not path.exists():
+        return list(SERIES_FALLBACK)
+    out = []
+    with path.open(encoding="utf-8") as f:
+        for row in csv.DictReader(f, delimiter=";"):
+            name = (row.get("series_name") or "").strip()
+            slug = (row.get("series_slug") or "").strip()
+            if name and slug:
+                out.append((slug.upper(), name))
+            if len(out) >= limit:
+                break
+    return out or list(SERIES_FALLBACK)
+
+
+def load_country_names(cities_path=GEONAMES_CITIES_PATH):
+    """{ISO-2: country name}: COUNTRY_NAMES over GeoNames countryInfo.txt, if present."""
+    names = {}
+    info = Path(cities_path).expanduser().parent / "countryInfo.txt"
+    if info.exists():
+        with info.open(encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                row = line.rstrip("\n").split("\t")
+                if len(row) > 4 and row[0] and row[4]:
+                    names[row[0]] = row[4]
+    names.update(COUNTRY_NAMES)
+    return names
+
+
+def load_cities(path=GEONAMES_CITIES_PATH, limit=20000):
+    """
+    [(city, country name, admin1 code)] from the GeoNames file, else a
+    built-in list. Cities of countries without a known name are skipped.
+    """
+    path = Path(path).expanduser()
+    fallback = [(city, country, "") for city, country in CITIES_FALLBACK]
+    if not path.exists():
+        return fallback
+    countries = load_country_names(path)
+    out = []
+    with path.open(encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t"):
+            if len(row) >= 9 and row[1] and row[8] in countries:
+                out.append((row[1], countries[row[8]], row[10] if len(row) > 10 else ""))
+            if len(out) >= limit:
+                break
+    return out or fallback
+
+
+class Generator:
+    def __init__(self, series, cities, noise=DEFAULT_NOISE, seed=0):
+        self.series = series
+        self.cities = cities
+        self.noise = noise
+        # GeoNames admin1 of a US city is its state code
+        self.us_cities = [
+            (city, admin1) for city, country, admin1 in cities
+            if country == "USA" and admin1 in US_STATE_NAMES
+        ] or US_CITIES_FALLBACK
+        self.rnd = random.Random(seed)
+        self.seen = set()  # strings returned by distinct(), across calls
+        self.templates = [
+            (self._ieee_style, 5),
+            (self._us_place, 3),
+            (self._ordinal_workshop, 3),
+            (self._acronym_year, 3),
+            (self._paren_acronym, 2),
+            (self._proceedings, 2),
+            (self._as_part_of, 1),
+            (self._year_only, 1),
+            (self._no_date, 2),
+        ]
+        self._weights = [w for _, w in self.templates]
+
+    # ---- pieces -------------------------------------------------------
+
+    def _year(self):
+        return self.rnd.randint(1985, 2025)
+
+    def _place(self):
+        city, country, _ = self.rnd.choice(self.cities)
+        return f"{city}, {country}"
+
+    def _dates(self, year):
+        r = self.rnd
+        m = r.randint(1, 12)
+        d1 = r.randint(1, 24)
+        d2 = d1 + r.randint(1, 4)
+        month = MONTHS[m - 1]
+        style = r.randint(0, 5)
+        if style == 0:
+            return f"{d1} {month} {year} - {d2} {month} {year}"
+        if style == 1:
+            return f"{month} {d1}-{d2}, {year}"
+        if style == 2:
+            return f"{d1}-{d2} {month[:3]}. {year}"
+        if style == 3:
+            return f"{year}-{m:02d}-{d1:02d} / {year}-{m:02d}-{d2:02d}"
+        if style == 4:
+            return f"{d1}.-{d2}.{m:02d}.{year}"
+        return f"{month} {year}"
+
+    def _ordinal(self):
+        n = self.rnd.randint(1, 60)
+        if n <= len(ORDINAL_WORDS) and self.rnd.random() < 0.3:
+            return ORDINAL_WORDS[n - 1]
+        suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+        return f"{n}{suffix}"
+
+    # ---- templates ----------------------------------------------------
+
+    def _ieee_style(self):
+        acr, name = self.rnd.choice(self.series)
+        y = self._year()
+        return f"{y} {name}, {acr} {y}. {self._place()}. {self._dates(y)}"
+
+    def _us_place(self):
+        acr, _ = self.rnd.choice(self.series)
+        y = self._year()
+        city, abbr = self.rnd.choice(self.us_cities)
+        state = abbr if self.rnd.random() < 0.5 else US_STATE_NAMES[abbr]
+        return f"{acr} {y}, {city}, {state}, USA, {self._dates(y)}"
+
+    def _ordinal_workshop(self):
+        y = self._year()
+        kind = self.rnd.choice(["International Workshop", "Int. Conf.", "Symposium", "Annual Conference"])
+        return f"{self._ordinal()} {kind} on {self.rnd.choice(TOPICS)}, {self._place()}, {self._dates(y)}"
+
+    def _acronym_year(self):
+        acr, _ = self.rnd.choice(self.series)
+        y = self._year()
+        return f"{acr} {y} - {self._place()}, {self._dates(y)}"
+
+    def _paren_acronym(self):
+        acr, name = self.rnd.choice(self.series)
+        y = self._year()
+        return f"{self._ordinal()} {name} ({acr}), {self._place()}, {self._dates(y)}"
+
+    def _proceedings(self):
+        acr, name = self.rnd.choice(self.series)
+        y = self._year()
+        return f"Proceedings of the {name} {y}: {self._place()}, {self._dates(y)}"
+
+    def _as_part_of(self):
+        acr, _ = self.rnd.choice(self.series)
+        y = self._year()
+        return (f"{self._ordinal()} Workshop on {self.rnd.choice(TOPICS)} held as part of "
+                f"{acr} {y}, {self._place()}, {self._dates(y)}")
+
+    def _year_only(self):
+        acr, name = self.rnd.choice(self.series)
+        return f"{name}, {acr} {self._year()}, {self._place()}"
+
+    def _no_date(self):
+        return f"{self.rnd.choice(['Workshop', 'Conference', 'Symposium'])} on {self.rnd.choice(TOPICS)}"
+
+    # ---- noise --------------------------------------------------------
+
+    def _noisy(self, s):
+        r = self.rnd
+        kind = r.randint(0, 5)
+        if kind == 0:
+            return f"<p>{s.lower()}</p>"
+        if kind == 1:
+            return f"{s} ISBN {r.randint(10**9, 10**10 - 1)}"
+        if kind == 2:
+            return self.rnd.choice(self.series)[0]  # bare acronym, too short
+        if kind == 3:
+            return " ; ".join([s] * r.randint(4, 6))  # over MAX_LEN_FOR_LLM
+        if kind == 4:
+            return f"  {s.upper()}  "
+        return s.replace(", ", ",  ").replace(".", "")
+
+    def string(self):
+        fn = self.rnd.choices(self.templates, weights=self._weights)[0][0]
+        s = fn()
+        return self._noisy(s) if self.rnd.random() < self.noise else s
+
+    def distinct(self, n):
+        """
+        n strings not returned by an earlier call either (duplicates from the
+        templates are re-drawn), so build's chunks stay distinct.
+        """
+        out = []
+        attempts = 0
+        while len(out) < n and attempts < n * 20:
+            s = self.string()
+            attempts += 1
+            if s not in self.seen:
+                self.seen.add(s)
+                out.append(s)
+        return out
+
+
+def build(path, rows, distinct=DEFAULT_DISTINCT, skew=DEFAULT_SKEW, noise=DEFAULT_NOISE,
+          nulls=DEFAULT_NULLS, seed=0, series=None, cities=None, log=print):
+    """Write names_conference with `rows` rows into the DuckDB at `path`; returns stats."""
+    import duckdb
+    import pandas as pd
+
+    t0 = time.perf_counter()
+    gen = Generator(series or load_series(), cities or load_cities(), noise=noise, seed=seed)
+    n_distinct = max(1, int(rows * distinct))
+    con = duckdb.connect(str(path))
+    try:
+        con.execute("CREATE OR REPLACE TABLE _synth_strings (idx BIGINT, conference VARCHAR)")
+        done = 0
+        while done < n_distinct:
+            chunk = gen.distinct(min(CHUNK, n_distinct - done))
+            if not chunk:
+                break
+            df = pd.DataFrame({"idx": range(done, done + len(chunk)), "conference": chunk})
+            con.execute("INSERT INTO _synth_strings SELECT idx, conference FROM df")
+            done += len(chunk)
+            log(f"  {done:,}/{n_distinct:,} distinct strings")
+        n_distinct = done
+
+        # hash-uniform u in [0, 1) per row, deterministic for a seed
+        u = "((hash(i, {s}) % 1000000007) / 1000000007.0)"
+        con.execute(f"""
+            CREATE OR REPLACE TABLE names_conference AS
+            SELECT r.pid, r.name_seq, s.conference
+            FROM (
+                SELECT
+                    1000000 + i // {NAMES_PER_PID} AS pid,
+                    CAST(i % {NAMES_PER_PID} + 1 AS INTEGER) AS name_seq,
+                    CASE WHEN {u.format(s=seed + 1)} < {float(nulls)} THEN -1
+                         ELSE CAST(floor({n_distinct} * pow({u.format(s=seed)}, {float(skew)})) AS BIGINT)
+                    END AS idx
+                FROM range({int(rows)}) t(i)
+            ) r
+            LEFT JOIN _synth_strings s USING (idx)
+            ORDER BY r.pid, r.name_seq
+        """)
+        con.execute("DROP TABLE _synth_strings")
+        total, used, top = con.execute("""
+            SELECT count(*), count(DISTINCT conference),
+                   (SELECT max(c) FROM (SELECT count(*) AS c FROM names_conference
+                                        WHERE conference IS NOT NULL GROUP BY conference))
+            FROM names_conference
+        """).fetchone()
+    finally:
+        con.close()
+    return {
+        "rows": total,
+        "distinct_generated": n_distinct,
+        "distinct_used": used,
+        "top_string_rows": top,
+        "seconds": round(time.perf_counter() - t0, 1),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build a synthetic names_conference DuckDB")
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--out", default="synth_names_conference.duckdb")
+    ap.add_argument("--distinct", type=float, default=DEFAULT_DISTINCT, help="distinct strings per row")
+    ap.add_argument("--skew", type=float, default=DEFAULT_SKEW, help="duplicate skew (1 = uniform)")
+    ap.add_argument("--noise", type=float, default=DEFAULT_NOISE, help="share of noisy strings")
+    ap.add_argument("--nulls", type=float, default=DEFAULT_NULLS, help="share of NULL rows")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--series-csv", help="dblp_conference_series.csv (default: next to the package)")
+    ap.add_argument("--geonames", default=GEONAMES_CITIES_PATH)
+    args = ap.parse_args(argv)
+
+    series = load_series(args.series_csv)
+    cities = load_cities(args.geonames)
+    print(f"Generating {args.rows:,} rows into {args.out} "
+          f"({len(series):,} series, {len(cities):,} cities, seed {args.seed})")
+    stats = build(
+        args.out, args.rows, args.distinct, args.skew, args.noise, args.nulls, args.seed,
+        series=series, cities=cities,
+    )
+    print(
+        f"Wrote {stats['rows']:,} rows, {stats['distinct_used']:,} distinct strings used of "
+        f"{stats['distinct_generated']:,}; most frequent string on {stats['top_string_rows']:,} rows "
+        f"({stats['seconds']}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Template cache learned from past LLM answers.
+
+Once the LLM has split a raw string into name / place / dates, the raw string
+can be turned into a template such as
+
+    {NAME}, {CITY}, {PLACE}, {MON} {D}-{D}, {YYYY}
+
+Templates are indexed by a token-shape signature (separators and date tokens
+of the raw string). A new string whose signature and template regex match a
+trusted template is parsed deterministically and never sent to the LLM.
+Each template tracks how often it agrees with the LLM on strings it was
+checked against; only templates with enough support and agreement are used.
+
+    python -m confmeta.templates learn    # from llm_raw_outputs
+    python -m confmeta.templates report
+"""
+import argparse
+import json
+import re
+from pathlib import Path
+
+from .config import (
+    TEMPLATE_STORE_PATH,
+    TEMPLATE_MIN_SUPPORT,
+    TEMPLATE_MIN_AGREEMENT,
+)
+from .regex_utils import HAS_MONTH
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+SCAN_RE = re.compile(
+    r"(?P<ws>\s+)|(?P<word>[^\W\d_]+)|(?P<num>\d+)|(?P<punct>[^\w\s])",
+    re.UNICODE,
+)
+SIGNATURE_PUNCT = set(",;.-/()")
+
+MONTH_RX = r"(?:" + HAS_MONTH.pattern + r")\.?"
+SLOT_RX = {
+    "MON": MONTH_RX,
+    "D": r"\d{1,2}",
+    "YYYY": r"(?:19|20)\d{2}",
+    "CITY": r"[^\W\d_][^,;\d]*?",
+    "PLACE": r"[^\W\d_][^,;\d]*?",
+}
+
+
+def signature(raw: str) -> str:
+    """Separators and date-token shapes, words and whitespace dropped."""
+    out = []
+    for m in SCAN_RE.finditer(str(raw)):
+        kind = m.lastgroup
+        tok = m.group(0)
+        if kind == "num":
+            out.append("Y" if len(tok) == 4 and tok[:2] in ("19", "20") else "D" if len(tok) <= 2 else "N")
+        elif kind == "word" and HAS_MONTH.fullmatch(tok):
+            out.append("M")
+        elif kind == "punct" and tok in SIGNATURE_PUNCT:
+            out.append(tok)
+    return "".join(out)
+
+
+def extract_json_object(text: str):
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    for i, ch in enumerate(text[start:], start=start):
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                try:
+                    return json.loads(text[start:i + 1])
+                except json.JSONDecodeError:
+                    return None
+    return None
+
+
+def dates_from_slots(months, days, years):
+    """
+    Deterministic conf_dates from the date slots in text order, following the
+    prompt's formats. None when the combination is not handled.
+    """
+    if not years:
+        return "" if not months and not days else None
+    y1, y2 = years[0], years[-1]
+    if len(years) > 2:
+        return None
+    if not months:
+        if days or y1 != y2:
+            return None
+        return f"{y1} / {y1}"
+    if len(months) > 2 or len(days) > 2:
+        return None
+    m1, m2 = months[0], months[-1]
+    if not days:
+        return f"{y1}-{m1:02d} / {y2}-{m2:02d}"
+    if len(days) == 1:
+        if len(months) != 1 or y1 != y2:
+            return None
+        return f"{y1}-{m1:02d}-{days[0]:02d}"
+    d1, d2 = days
+    return f"{y1}-{m1:02d}-{d1:02d} / {y2}-{m2:02d}-{d2:02d}"
+
+
+def _month_num(tok):
+    return MONTHS.get(tok[:3].lower())
+
+
+class Template:
+    def __init__(self, signature, pattern, slots, place_sep=", ", support=0, checked=0, agreed=0):
+        self.signature = signature
+        self.pattern = pattern      # display form, e.g. "{NAME}, {CITY}, {MON} {D}, {YYYY}"
+        self.slots = slots          # slot types in order, excluding NAME
+        self.place_sep = place_sep
+        self.support = support
+        self.checked = checked
+        self.agreed = agreed
+        self._regex = None
+
+    @property
+    def key(self):
+        return self.pattern
+
+    @property
+    def agreement(self):
+        return self.agreed / self.checked if self.checked else None
+
+    def trusted(self, min_support=TEMPLATE_MIN_SUPPORT, min_agreement=TEMPLATE_MIN_AGREEMENT):
+        if self.support < min_support:
+            return False
+        return self.agreement is None or self.agreement >= min_agreement
+
+    @property
+    def regex(self):
+        if self._regex is None:
+            parts = ["^"]
+            i = 0
+            for m in re.finditer(r"\{(\w+)\}|(\s+)|([^{\s]+)", self.pattern):
+                if m.group(1):
+                    slot = m.group(1)
+                    if slot == "NAME":
+                        parts.append(r"(?P<NAME>.+?)")
+                    else:
+                        parts.append(f"(?P<s{i}>{SLOT_RX[slot]})")
+                        i += 1
+                elif m.group(2):
+                    parts.append(r"\s*")
+                else:
+                    parts.append(re.escape(m.group(3)))
+            parts.append(r"\s*$")
+            self._regex = re.compile("".join(parts), re.IGNORECASE)
+        return self._regex
+
+    def apply(self, raw, city_country=None):
+        """Parse `raw` with this template -> LLM-style dict, or None."""
+        m = self.regex.match(str(raw).strip())
+        if not m:
+            return None
+        name = m.group("NAME").strip(" ,;-")
+        places, months, days, years = [], [], [], []
+        for i, slot in enumerate(self.slots):
+            val = m.group(f"s{i}").strip()
+            if slot in ("CITY", "PLACE"):
+                if slot == "CITY" and city_country is not None and val.lower() not in city_country:
+                    return None
+                places.append(val)
+            elif slot == "MON":
+                months.append(_month_num(val))
+            elif slot == "D":
+                days.append(int(val))
+            elif slot == "YYYY":
+                years.append(int(val))
+        conf_dates = dates_from_slots(months, days, years)
+        if conf_dates is None or not name:
+            return None
+        return {
+            "conf_name": name,
+            "conf_place": self.place_sep.join(places),
+            "conf_dates": conf_dates,
+        }
+
+    def to_dict(self):
+        return {
+            "signature": self.signature,
+            "pattern": self.pattern,
+            "slots": self.slots,
+            "place_sep": self.place_sep,
+            "support": self.support,
+            "checked": self.checked,
+            "agreed": self.agreed,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**d)
+
+
+def induce_template(raw, obj, city_country=None):
+    """
+    Build a Template from a raw string and the LLM's (un-normalized) answer,
+    or None when the answer cannot be mapped back onto the raw string.
+    """
+    raw = str(raw).strip()
+    name = str(obj.get("conf_name", "") or "").strip()
+    place = str(obj.get("conf_place", "") or "")
+    if not name or not raw.lower().startswith(name.lower()):
+        return None
+
+    tail = raw[len(name):]
+    place_sep = "; " if ";" in place else ", "
+    place_parts = [p.strip() for p in re.split(r"[;,]", place) if p.strip()]
+
+    # mark place parts in the tail, in order
+    spans = []
+    pos = 0
+    low = tail.lower()
+    for p in place_parts:
+        m = re.compile(r"(?<!\w)" + re.escape(p.lower()) + r"(?!\w)").search(low, pos)
+        if not m:
+            return None
+        kind = "CITY" if city_country is not None and p.lower() in city_country else "PLACE"
+        spans.append((m.start(), m.end(), kind))
+        pos = m.end()
+
+    pattern = ["{NAME}"]
+    slots = []
+    i = 0
+    for start, end, kind in spans + [(len(tail), len(tail), None)]:
+        for m in SCAN_RE.finditer(tail[i:start]):
+            kind_tok, tok = m.lastgroup, m.group(0)
+            if kind_tok == "num":
+                if len(tok) == 4 and tok[:2] in ("19", "20"):
+                    slot = "YYYY"
+                elif len(tok) <= 2:
+                    slot = "D"
+                else:
+                    return None
+                pattern.append("{" + slot + "}")
+                slots.append(slot)
+            elif kind_tok == "word" and HAS_MONTH.fullmatch(tok):
+                pattern.append("{MON}")
+                slots.append("MON")
+            elif kind_tok == "ws":
+                pattern.append(" ")
+            else:
+                pattern.append(tok)
+        if kind:
+            pattern.append("{" + kind + "}")
+            slots.append(kind)
+        i = end
+
+    return Template(signature(raw), "".join(pattern), slots, place_sep=place_sep)
+
+
+def _same(a, b):
+    return {
+        k: str(a.get(k, "") or "").strip().lower() for k in ("conf_name", "conf_place", "conf_dates")
+    } == {
+        k: str(b.get(k, "") or "").strip().lower() for k in ("conf_name", "conf_place", "conf_dates")
+    }
+
+
+class TemplateStore:
+    def __init__(self, templates=None):
+        self.by_signature = {}
+        self.hits = 0
+        self.misses = 0
+        self.hits_by_template = {}
+        for t in templates or []:
+            self._add(t)
+
+    def _add(self, t):
+        self.by_signature.setdefault(t.signature, {})[t.key] = t
+
+    def __len__(self):
+        return sum(len(v) for v in self.by_signature.values())
+
+    def templates(self):
+        for group in self.by_signature.values():
+            yield from group.values()
+
+    def learn(self, raw, obj, city_country=None):
+        """
+        Check existing templates of the signature against the LLM answer
+        (agreement), then add support for the template induced from it.
+        """
+        sig = signature(raw)
+        for t in self.by_signature.get(sig, {}).values():
+            got = t.apply(raw, city_country)
+            if got is None:
+                continue
+            t.checked += 1
+            t.agreed += _same(got, obj)
+
+        induced = induce_template(raw, obj, city_country)
+        if induced is None:
+            return None
+        group = self.by_signature.setdefault(induced.signature, {})
+        t = group.get(induced.key)
+        if t is None:
+            t = group[induced.key] = induced
+        t.support += 1
+        return t
+
+    def match(self, raw, city_country=None):
+        """Deterministic parse by the best trusted template, or None."""
+        candidates = sorted(
+            (t for t in self.by_signature.get(signature(raw), {}).values() if t.trusted()),
+            key=lambda t: (t.agreement or 0.0, t.support),
+            reverse=True,
+        )
+        for t in candidates:
+            got = t.apply(raw, city_country)
+            if got is not None:
+                self.hits += 1
+                self.hits_by_template[t.key] = self.hits_by_template.get(t.key, 0) + 1
+                got["note"] = f"template: {t.pattern}"
+                return got
+        self.misses += 1
+        return None
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def save(self, path=TEMPLATE_STORE_PATH):
+        path = Path(path).expanduser()
+        data = [t.to_dict() for t in self.templates()]
+        path.write_text(json.dumps(data, indent=1, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path=TEMPLATE_STORE_PATH):
+        path = Path(path).expanduser()
+        if not path.exists():
+            return cls()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(Template.from_dict(d) for d in data)
+
+
+def with_templates(parse_fn, store, normalize_fn, city_country=None):
+    """
+    Wrap a parse function: strings matching a trusted template are parsed
+    deterministically (then run through normalize_fn like an LLM answer).
+    """
+    if not len(store):
+        return parse_fn
+
+    def parse(conf_string, show_stream=True):
+        obj = store.match(conf_string, city_country)
+        if obj is None:
+            return parse_fn(conf_string, show_stream=show_stream)
+        parsed = normalize_fn(conf_string, json.dumps(obj, ensure_ascii=False))
+        parsed["note"] = obj["note"]
+        return parsed
+
+    return parse
+
+
+def format_report(store, top=20):
+    lines = []
+    trusted = [t for t in store.templates() if t.trusted()]
+    lines.append(
+        f"{len(store)} templates, {len(trusted)} trusted "
+        f"(support >= {TEMPLATE_MIN_SUPPORT}, agreement >= {TEMPLATE_MIN_AGREEMENT:.0%})"
+    )
+    if store.hits or store.misses:
+        lines.append(f"hit rate this run: {store.hit_rate():.1%} ({store.hits} hits)")
+    ranked = sorted(store.templates(), key=lambda t: t.support, reverse=True)[:top]
+    for t in ranked:
+        agr = f"{t.agreement:.0%}" if t.agreement is not None else "n/a"
+        hits = store.hits_by_template.get(t.key, 0)
+        lines.append(
+            f"  support={t.support:5d} agreement={agr:>4s} ({t.checked} checked) "
+            f"hits={hits:5d} {'*' if t.trusted() else ' '} {t.pattern}"
+        )
+    return "\n".join(lines)
+
+
+def learn_from_db(con, store=None):
+    """Learn templates from every stored LLM answer in llm_raw_outputs."""
+    from .db_io import fetch_latest_raw_outputs
+    from .geonames_cities import get_city_country
+
+    store = store or TemplateStore()
+    city_country = get_city_country()
+    stored = fetch_latest_raw_outputs(con)
+    learned = 0
+    for _, rec in stored.iterrows():
+        obj = extract_json_object(rec["raw_text"])
+        if obj and store.learn(rec["conference"], obj, city_country) is not None:
+            learned += 1
+    return store, learned, len(stored)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="confmeta template cache")
+    ap.add_argument("cmd", choices=("learn", "report"))
+    ap.add_argument("--store", default=TEMPLATE_STORE_PATH)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "learn":
+        from .db_io import connect
+
+        con = connect()
+        store, learned, total = learn_from_db(con)
+        con.close()
+        store.save(args.store)
+        print(f"Learned from {learned} of {total} stored answers -> {args.store}")
+    else:
+        store = TemplateStore.load(args.store)
+    print(format_report(store))
+
+
+if __name__ == "__main__":
+    main()
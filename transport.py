@@ -0,0 +1,226 @@
+"""
+Transport layer under stream_llm_json.
+
+  live   -> POST to OLLAMA_URL over the pooled llm_client session
+  record -> live, and append (model + prompt + options hash -> response,
+            timing stats) to
+            LLM_RECORDING_PATH
+  replay -> serve recorded responses offline, sleeping the recorded
+            latency times LLM_REPLAY_LATENCY_SCALE (0 = no sleep)
+
+generate(payload) yields Ollama response objects ({"response": ..., "done": ...})
+for streamed and non-streamed payloads alike.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+from .breaker import BREAKER, is_breaker_failure
+from .config import (
+    LLM_TRANSPORT,
+    LLM_RECORDING_PATH,
+    LLM_REPLAY_LATENCY_SCALE,
+)
+
+TRANSPORT_MODES = ("live", "record", "replay")
+
+# Ollama timing/eval fields kept from the final ("done") response object
+STAT_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
+
+class ReplayMiss(RuntimeError):
+    """No recorded response for this prompt."""
+
+
+def prompt_key(model: str, prompt: str, options=None) -> str:
+    """Recording key; options (num_predict, num_ctx, ...) change the answer too."""
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    if options:
+        h.update(b"\0")
+        h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def payload_key(payload) -> str:
+    return prompt_key(payload.get("model", ""), payload.get("prompt", ""), payload.get("options"))
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def load_recording(path):
+    path = Path(path).expanduser()
+    entries = {}
+    if not path.exists():
+        return entries
+    with _open(path, "rt") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            entries[rec["key"]] = rec
+    return entries
+
+
+def _live(payload, timeout):
+    from .llm_client import get_client
+
+    stream = payload.get("stream", True)
+    BREAKER.before_call()
+    try:
+        resp = get_client().generate(payload, stream=stream, timeout=timeout)
+    except Exception as e:
+        if is_breaker_failure(e):
+            BREAKER.record_failure()
+        else:
+            BREAKER.record_success()  # endpoint answered, the request was bad
+        raise
+    BREAKER.record_success()
+    if not stream:
+        yield resp.json()
+        return
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        data = json.loads(line.decode("utf-8"))
+        yield data
+        if data.get("done"):
+            break
+
+
+class LiveTransport:
+    mode = "live"
+
+    def generate(self, payload, timeout=None):
+        return _live(payload, timeout)
+
+
+class RecordTransport:
+    mode = "record"
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        self.lock = threading.Lock()
+        self.seen = set(load_recording(self.path))
+
+    def generate(self, payload, timeout=None):
+        key = payload_key(payload)
+        t0 = time.perf_counter()
+        first = None
+        parts = []
+        chunks = 0
+        written = False
+        for data in _live(payload, timeout):
+            if first is None:
+                first = time.perf_counter() - t0
+            chunks += 1
+            parts.append(data.get("response", ""))
+            # write before handing out the final object: callers stop iterating on "done"
+            if data.get("done") or not payload.get("stream", True):
+                stats = {k: data[k] for k in STAT_FIELDS if k in data}
+                self._write(key, payload, parts, t0, first, chunks, stats)
+                written = True
+            yield data
+        if not written:
+            self._write(key, payload, parts, t0, first, chunks, {})
+
+    def _write(self, key, payload, parts, t0, first, chunks, stats):
+        elapsed = time.perf_counter() - t0
+        rec = {
+            "key": key,
+            "model": payload.get("model", ""),
+            "response": "".join(parts),
+            "elapsed_s": round(elapsed, 4),
+            "first_chunk_s": round(first or elapsed, 4),
+            "chunks": chunks,
+            "stats": stats,
+        }
+        with self.lock:
+            if key in self.seen:
+                return
+            self.seen.add(key)
+            with _open(self.path, "at") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+class ReplayTransport:
+    mode = "replay"
+
+    def __init__(self, path, latency_scale=1.0):
+        self.path = Path(path).expanduser()
+        self.latency_scale = latency_scale
+        self.entries = load_recording(self.path)
+
+    def generate(self, payload, timeout=None):
+        model = payload.get("model", "")
+        key = payload_key(payload)
+        rec = self.entries.get(key)
+        if rec is None:
+            raise ReplayMiss(f"no recorded response for prompt {key} in {self.path}")
+        return self._replay(rec, model, payload.get("stream", True))
+
+    def _replay(self, rec, model, stream):
+        scale = self.latency_scale
+        text = rec["response"]
+        final = {"model": model, "response": "", "done": True}
+        final.update(rec.get("stats", {}))
+
+        if not stream:
+            if scale:
+                time.sleep(rec["elapsed_s"] * scale)
+            final["response"] = text
+            yield final
+            return
+
+        n = max(1, rec.get("chunks", 1) - 1)
+        size = max(1, -(-len(text) // n))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        rest = max(0.0, rec["elapsed_s"] - rec["first_chunk_s"]) / max(1, len(pieces) - 1)
+        for i, piece in enumerate(pieces):
+            if scale:
+                time.sleep((rec["first_chunk_s"] if i == 0 else rest) * scale)
+            yield {"model": model, "response": piece, "done": False}
+        yield final
+
+
+_transport = None
+
+
+def get_transport():
+    """Process-wide transport selected by config.LLM_TRANSPORT."""
+    global _transport
+    if _transport is None:
+        if LLM_TRANSPORT == "live":
+            _transport = LiveTransport()
+        elif LLM_TRANSPORT == "record":
+            _transport = RecordTransport(LLM_RECORDING_PATH)
+        elif LLM_TRANSPORT == "replay":
+            _transport = ReplayTransport(LLM_RECORDING_PATH, LLM_REPLAY_LATENCY_SCALE)
+        else:
+            raise ValueError(
+                f"unknown LLM_TRANSPORT {LLM_TRANSPORT!r}; expected one of {TRANSPORT_MODES}"
+            )
+    return _transport
+
+
+def set_transport(transport):
+    """Override the process-wide transport (e.g. from a benchmark)."""
+    global _transport
+    _transport = transport
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Throughput tuning of the parse requests for this host.
+
+    python -m confmeta.tune                       # calibration sample from the DB
+    python -m confmeta.tune --stub --latency-ms 50 --stub-parallel 4
+
+Sweeps parse concurrency and the Ollama options num_predict, num_ctx and
+num_batch (TUNE_GRID in config.py) one parameter at a time, starting from
+the current settings (options not in LLM_OPTIONS keep the server default):
+each trial parses the calibration set with cold caches and measures rows/s,
+the share of rows failing the validate checks, the share of answers cut off
+at num_predict (done_reason "length") and the share of prompts that did not
+fit num_ctx. A value is kept when it is TUNE_MIN_GAIN faster and its loss
+rate stays within TUNE_MAX_FAILURE_DELTA of the best seen. Settings whose
+num_ctx is below the largest measured prompt plus num_predict are not tried.
+The winner is written to TUNE_PROFILE_PATH, which config.py applies to
+LLM_OPTIONS and the staged parse workers on the next run.
+
+Ollama reloads the model when num_ctx changes, so every trial starts with an
+untimed load request; server-side parallelism (OLLAMA_NUM_PARALLEL) is not
+changed here, only how many requests the client keeps in flight.
+"""
+import argparse
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .stub_ollama import load_golden, start_in_thread
+
+OPTION_KEYS = ("num_predict", "num_ctx", "num_batch")
+
+
+def calibration_strings(golden=False, sample=None):
+    """Distinct strings the heuristics send to the LLM (or the golden fixture set)."""
+    if golden:
+        return list(dict.fromkeys(rec["conference"] for rec in load_golden()))
+    from .config import TUNE_SAMPLE
+    from .db_io import connect
+    from .estimate import calibration_sample
+
+    con = connect()
+    try:
+        rows = calibration_sample(con, n=(sample or TUNE_SAMPLE) * 4)
+    finally:
+        con.close()
+    return [raw for raw, llm in rows if llm][:sample or TUNE_SAMPLE]
+
+
+def _clear_caches():
+    from . import fast_llm_parse, llm_parse
+    llm_parse._llm_cache.clear()
+    fast_llm_parse._llm_cache.clear()
+
+
+def _load_model(options, model=None):
+    """Untimed request so the model is (re)loaded with these options."""
+    from .llm_client import build_payload, get_client
+
+    payload = build_payload("", stream=False, **options)
+    if model:
+        payload["model"] = model
+    get_client().generate(payload, timeout=300).json()
+
+
+def run_trial(strings, parse, setting):
+    """Parse strings with setting {"parallel", **options}; -> trial dict."""
+    from .config import LLM_OPTIONS
+    from .metrics import start_run
+    from .validate import validate_parsed
+
+    saved = dict(LLM_OPTIONS)
+    LLM_OPTIONS.update({k: setting[k] for k in OPTION_KEYS if k in setting})
+    try:
+        _clear_caches()
+        _load_model(LLM_OPTIONS)
+        run = start_run(tuning=setting)
+
+        def one(raw):
+            try:
+                return validate_parsed(raw, parse(raw, show_stream=False)), None
+            except Exception as e:
+                return ["error"], f"{type(e).__name__}: {e}"
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=setting["parallel"]) as ex:
+            results = list(ex.map(one, strings))
+        wall = time.perf_counter() - t0
+    finally:
+        LLM_OPTIONS.clear()
+        LLM_OPTIONS.update(saved)
+
+    n = len(results)
+    failed = sum(1 for failures, _ in results if failures)
+    errors = [err for _, err in results if err]
+    calls = run.counters["llm_calls"]
+    return {
+        **setting,
+        "rows": n,
+        "wall_s": round(wall, 3),
+        "rows_per_s": round(n / wall, 2) if wall else None,
+        "failure_rate": round(failed / n, 4) if n else None,
+        "truncated_rate": round(run.counters.get("llm_truncated", 0) / calls, 4) if calls else 0.0,
+        "ctx_truncated_rate": round(run.counters.get("llm_ctx_truncated", 0) / calls, 4) if calls else 0.0,
+        "max_prompt_tokens": run.prompt_eval_max,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def _loss(t):
+    return t["failure_rate"] + t["truncated_rate"] + t["ctx_truncated_rate"]
+
+
+def fits_context(setting, max_prompt_tokens):
+    """num_ctx (when set) holds the largest prompt plus num_predict."""
+    num_ctx = setting.get("num_ctx")
+    return not num_ctx or num_ctx >= max_prompt_tokens + setting.get("num_predict", 0)
+
+
+def better(trial, best, max_delta, min_gain):
+    """min_gain faster with a loss rate within max_delta, or clearly fewer losses."""
+    if trial["errors"] > best["errors"]:
+        return False
+    if _loss(trial) > _loss(best) + max_delta:
+        return False
+    if _loss(best) > _loss(trial) + max_delta:
+        return True
+    return (trial["rows_per_s"] or 0) > (best["rows_per_s"] or 0) * (1 + min_gain)
+
+
+def sweep(strings, parse, start, grid, max_delta, min_gain, log=print):
+    """Coordinate sweep from `start`; -> (best trial, all trials)."""
+    trials = []
+    seen = {}
+
+    def trial(setting):
+        key = tuple(sorted(setting.items()))
+        if key not in seen:
+            res = run_trial(strings, parse, setting)
+            seen[key] = res
+            trials.append(res)
+            log(format_trial(res))
+        return seen[key]
+
+    best = trial(dict(start))
+    for param, values in grid.items():
+        for value in values:
+            if value == best.get(param):
+                continue
+            setting = {**{k: best[k] for k in ("parallel", *OPTION_KEYS) if k in best}, param: value}
+            max_prompt = max(t["max_prompt_tokens"] for t in trials)
+            if not fits_context(setting, max_prompt):
+                log(f"  skip {param}={value}: num_ctx {setting['num_ctx']} < {max_prompt} prompt tokens "
+                    f"+ num_predict {setting.get('num_predict', 0)}")
+                continue
+            res = trial(setting)
+            if better(res, best, max_delta, min_gain):
+                best = res
+    return best, trials
+
+
+def format_trial(t):
+    opts = " ".join(f"{k}={t[k]}" for k in OPTION_KEYS if k in t)
+    return (
+        f"  parallel={t['parallel']:<2d} {opts:40s} {t['rows_per_s']:8.2f} rows/s  "
+        f"failures {t['failure_rate']:.1%}  truncated {t['truncated_rate']:.1%}  "
+        f"ctx {t['ctx_truncated_rate']:.1%}  errors {t['errors']}"
+        + (f" ({t['first_error']})" if t["first_error"] else "")
+    )
+
+
+def write_profile(path, best, trials, meta):
+    profile = {
+        **meta,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": socket.gethostname(),
+        "parallel": best["parallel"],
+        "options": {k: best[k] for k in OPTION_KEYS if k in best},
+        "rows_per_s": best["rows_per_s"],
+        "failure_rate": best["failure_rate"],
+        "truncated_rate": best["truncated_rate"],
+        "ctx_truncated_rate": best["ctx_truncated_rate"],
+        "max_prompt_tokens": max(t["max_prompt_tokens"] for t in trials),
+        "trials": trials,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tune parse concurrency and Ollama options")
+    ap.add_argument("--sample", type=int, help="calibration strings from the DB (default TUNE_SAMPLE)")
+    ap.add_argument("--golden", action="store_true", help="calibrate on the golden fixture strings")
+    ap.add_argument("--mode", help="parser mode (default PARSER_MODE)")
+    ap.add_argument("--parallel", type=int, nargs="+", help="concurrency values to try")
+    for key in OPTION_KEYS:
+        ap.add_argument(f"--{key.replace('_', '-')}", type=int, nargs="+", dest=key, help=f"{key} values to try")
+    ap.add_argument("--max-failure-delta", type=float)
+    ap.add_argument("--min-gain", type=float, help="rows/s gain needed to keep a value (default TUNE_MIN_GAIN)")
+    ap.add_argument("--out", help="profile path (default TUNE_PROFILE_PATH; confmeta_tuning_stub.json with --stub)")
+    ap.add_argument("--stub", action="store_true", help="tune against an in-process stub server")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="stub latency per request")
+    ap.add_argument("--stub-parallel", type=int, default=4, help="requests the stub serves at once")
+    args = ap.parse_args(argv)
+
+    server = None
+    if args.stub:
+        server, url = start_in_thread(latency_ms=args.latency_ms, parallel=args.stub_parallel)
+        # Must be set before config is first imported
+        os.environ["CONFMETA_OLLAMA_URL"] = url
+        args.golden = True
+
+    from .config import (
+        LLM_OPTIONS,
+        MODEL,
+        OLLAMA_URL,
+        PARSER_MODE,
+        STAGE_WORKERS,
+        TUNE_GRID,
+        TUNE_MAX_FAILURE_DELTA,
+        TUNE_MIN_GAIN,
+        TUNE_PROFILE_PATH,
+    )
+    from .llm_client import get_client
+    from .parsers import get_parser
+
+    mode = args.mode or PARSER_MODE
+    grid = {k: getattr(args, k) or v for k, v in TUNE_GRID.items()}
+    max_delta = TUNE_MAX_FAILURE_DELTA if args.max_failure_delta is None else args.max_failure_delta
+    min_gain = TUNE_MIN_GAIN if args.min_gain is None else args.min_gain
+    # stub results must not replace the profile of the real endpoint
+    out = args.out or ("confmeta_tuning_stub.json" if args.stub else TUNE_PROFILE_PATH)
+    if not out:
+        raise SystemExit("No profile path: set CONFMETA_TUNE_PROFILE or pass --out")
+
+    # unset options start at the server default, not at the first grid value
+    start = {"parallel": STAGE_WORKERS.get("parse", 1)}
+    start.update({k: LLM_OPTIONS[k] for k in OPTION_KEYS if k in LLM_OPTIONS})
+
+    # one pooled connection per in-flight request
+    client = get_client()
+    client.close()
+    client.pool_size = max(client.pool_size, *grid["parallel"])
+
+    try:
+        strings = calibration_strings(args.golden, args.sample)
+        if not strings:
+            raise SystemExit("No calibration strings (no rows pass the LLM heuristics)")
+        print(f"Tuning {mode} parser at {OLLAMA_URL} ({MODEL}) on {len(strings)} strings")
+        best, trials = sweep(strings, get_parser(mode), start, grid, max_delta, min_gain)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    write_profile(out, best, trials, {"ollama_url": OLLAMA_URL, "model": MODEL, "parser_mode": mode})
+    print(f"Best:\n{format_trial(best)}")
+    if out == TUNE_PROFILE_PATH:
+        print(f"Wrote tuning profile to {out} (loaded by config.py on the next run)")
+    else:
+        print(f"Wrote tuning profile to {out}; use it with CONFMETA_TUNE_PROFILE={out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import re
+from .regex_utils import (
+    HAS_YEAR,
+    HAS_MONTH,
+    ISO_RANGE_RE,
+    ACRONYM_YEAR_RE,
+    looks_like_has_date,
+)
+
+# Day/month expressions that must never survive in conf_name, e.g.
+# "June 5-9", "5 June", "2011-06-05". A bare edition year ("ICC 2011") is fine.
+ISO_DATE_IN_NAME_RE = re.compile(r"\b(19|20)\d{2}-\d{2}\b")
+DAY_MONTH_RE = re.compile(
+    r"\b\d{1,2}(?:st|nd|rd|th)?\s*(?:-\s*\d{1,2}\s*)?(?:" + HAS_MONTH.pattern + ")",
+    re.IGNORECASE,
+)
+MONTH_DAY_RE = re.compile(
+    r"(?:" + HAS_MONTH.pattern + r")\.?\s+\d{1,2}\b",
+    re.IGNORECASE,
+)
+
+
+def years_in(text: str):
+    if not text:
+        return set()
+    return {int(m.group(0)) for m in HAS_YEAR.finditer(str(text))}
+
+
+def validate_parsed(raw: str, parsed: dict):
+    """
+    Cheap consistency checks of a parsed row against its raw string.
+    Returns a list of failed check names (empty list = looks fine).
+    """
+    failures = []
+    raw = str(raw or "")
+    name = str(parsed.get("conf_name", "") or "")
+    conf_dates = str(parsed.get("conf_dates", "") or "").strip()
+
+    # 1) conf_dates must be ISO-like (or empty when the raw has no date)
+    if conf_dates:
+        if not ISO_RANGE_RE.match(conf_dates):
+            failures.append("dates_format")
+    elif looks_like_has_date(raw):
+        failures.append("dates_missing")
+
+    # 2) every year in conf_dates must occur in the raw string
+    raw_years = years_in(raw)
+    date_years = years_in(conf_dates)
+    if date_years and not date_years <= raw_years:
+        failures.append("dates_year_mismatch")
+
+    # 3) acronym+year edition patterns ("ICC 2011") must be kept in the name
+    m = ACRONYM_YEAR_RE.search(raw)
+    if m and f"{m.group(1)} {m.group(2)}" not in name:
+        failures.append("acronym_year_dropped")
+
+    # 4) no day/month expressions in the name
+    if (
+        ISO_DATE_IN_NAME_RE.search(name)
+        or DAY_MONTH_RE.search(name)
+        or MONTH_DAY_RE.search(name)
+    ):
+        failures.append("date_in_name")
+
+    return failures